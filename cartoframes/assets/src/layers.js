@@ -5,6 +5,10 @@ import { displayError } from './errors/display';
 
 const factory = new SourceFactory();
 
+export function setLayerSources(sources) {
+  factory.setSources(sources);
+}
+
 export function initMapLayer(layer, layerIndex, numLayers, hasLegends, map, mapIndex) {
   const mapSource = factory.createSource(layer);
   const mapViz = new carto.Viz(layer.viz);
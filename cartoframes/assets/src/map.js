@@ -2,10 +2,11 @@ import { BASEMAPS, attributionControl, FIT_BOUNDS_SETTINGS } from './constants';
 import { displayError } from './errors/display';
 import { setInteractivity } from './map/interactivity';
 import { updateViewport, getBasecolorSettings, saveImage } from './utils';
-import { initMapLayer, getInteractiveLayers } from './layers';
+import { initMapLayer, getInteractiveLayers, setLayerSources } from './layers';
 
 export function setReady(settings) {
   try {
+    setLayerSources(settings.sources);
     return settings.maps ? initMaps(settings.maps) : initMap(settings);
   } catch (e) {
     displayError(e);
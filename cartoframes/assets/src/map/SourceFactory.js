@@ -1,16 +1,29 @@
 export default function SourceFactory() {
   const sourceTypes = { GeoJSON, Query, MVT };
+  const decodedSources = {};
+  let sources = {};
+
+  this.setSources = (layerSources) => {
+    sources = layerSources || {};
+  };
 
   this.createSource = (layer) => {
+    if (layer.source_id) {
+      // Shared sources are decoded once for all their layers
+      if (!(layer.source_id in decodedSources)) {
+        decodedSources[layer.source_id] = _decodeData(sources[layer.source_id], layer.encode_data);
+      }
+      return GeoJSON(layer, decodedSources[layer.source_id]);
+    }
+
     return sourceTypes[layer.type](layer);
   };
 }
 
-function GeoJSON(layer) {
+function GeoJSON(layer, data) {
   const options = JSON.parse(JSON.stringify(layer.options));
-  const data = _decodeJSONData(layer.data, layer.encode_data);
 
-  return new carto.source.GeoJSON(data, options);
+  return new carto.source.GeoJSON(data || _decodeData(layer.data, layer.encode_data), options);
 }
 
 function Query(layer) {
@@ -27,7 +40,11 @@ function Query(layer) {
 }
 
 function MVT(layer) {
-  return new carto.source.MVT(layer.data.file, JSON.parse(layer.data.metadata));
+  return new carto.source.MVT(layer.data.file, JSON.parse(layer.data.metadata), layer.data.options || {});
+}
+
+function _decodeData(data, encodeData) {
+  return encodeData === 'binary' ? _decodeBinaryData(data) : _decodeJSONData(data, encodeData);
 }
 
 function _decodeJSONData(data, encodeData) {
@@ -44,4 +61,111 @@ function _decodeJSONData(data, encodeData) {
       Please, disable the data compresion with encode_data=False in your Layer class.
     `);
   }
+}
+
+const _TYPED_ARRAYS = {
+  int8: Int8Array,
+  uint8: Uint8Array,
+  int16: Int16Array,
+  uint16: Uint16Array,
+  int32: Int32Array,
+  uint32: Uint32Array,
+  float32: Float32Array,
+  float64: Float64Array
+};
+
+function _decodeBinaryData(data) {
+  const bytes = pako.inflate(atob(data));
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const headerLength = view.getUint32(0, true);
+  const header = JSON.parse(new TextDecoder().decode(bytes.subarray(4, 4 + headerLength)));
+  const buffersOffset = bytes.byteOffset + 4 + headerLength + (-(4 + headerLength) & 7);
+  const array = (TypedArray, [offset, length]) => new TypedArray(bytes.buffer, buffersOffset + offset, length);
+
+  const geometry = header.geometry;
+  const types = array(Uint8Array, geometry.types);
+  const geometryParts = array(Uint32Array, geometry.geometryParts);
+  const partRings = array(Uint32Array, geometry.partRings);
+  const ringCoords = array(Uint32Array, geometry.ringCoords);
+  const coords = _decodeBinaryCoords(header.scale === null
+    ? array(Float64Array, geometry.coords)
+    : array(Int32Array, geometry.coords), header.scale);
+
+  const columns = header.columns.map((column) => ({
+    name: column.name,
+    values: column.buffer ? array(_TYPED_ARRAYS[column.type], column.buffer) : column.values,
+    categories: column.categories
+  }));
+
+  const ring = (index) => {
+    const positions = [];
+    for (let i = ringCoords[index]; i < ringCoords[index + 1]; i++) {
+      positions.push([coords[2 * i], coords[2 * i + 1]]);
+    }
+    return positions;
+  };
+  const part = (index) => {
+    const rings = [];
+    for (let i = partRings[index]; i < partRings[index + 1]; i++) {
+      rings.push(ring(i));
+    }
+    return rings;
+  };
+
+  const features = [];
+  for (let index = 0; index < header.count; index++) {
+    const parts = [];
+    for (let i = geometryParts[index]; i < geometryParts[index + 1]; i++) {
+      parts.push(part(i));
+    }
+
+    const properties = {};
+    columns.forEach((column) => {
+      const value = column.values[index];
+      if (column.categories) {
+        properties[column.name] = value < 0 ? null : column.categories[value];
+      } else {
+        properties[column.name] = Number.isNaN(value) ? null : value;
+      }
+    });
+
+    features.push({ type: 'Feature', geometry: _binaryGeometry(types[index], parts), properties });
+  }
+
+  return { type: 'FeatureCollection', features };
+}
+
+function _decodeBinaryCoords(values, scale) {
+  if (scale === null) {
+    return values;
+  }
+
+  // Scaled coordinates are stored as deltas of each axis
+  const coords = new Float64Array(values.length);
+  let x = 0;
+  let y = 0;
+  for (let i = 0; i < values.length; i += 2) {
+    x += values[i];
+    y += values[i + 1];
+    coords[i] = x / scale;
+    coords[i + 1] = y / scale;
+  }
+  return coords;
+}
+
+function _binaryGeometry(type, parts) {
+  switch (type) {
+    case 1:
+      return { type: 'Point', coordinates: parts[0][0][0] };
+    case 2:
+      return { type: 'MultiPoint', coordinates: parts.map((part) => part[0][0]) };
+    case 3:
+      return { type: 'LineString', coordinates: parts[0][0] };
+    case 4:
+      return { type: 'MultiLineString', coordinates: parts.map((part) => part[0]) };
+    case 5:
+      return { type: 'Polygon', coordinates: parts[0] };
+    default:
+      return { type: 'MultiPolygon', coordinates: parts };
+  }
 }
\ No newline at end of file
@@ -6,6 +6,7 @@ from .catalog.geography import Geography
 from .catalog.provider import Provider
 from .catalog.variable import Variable
 from .enrichment.enrichment import Enrichment
+from .enrichment.local_enrichment import LocalEnrichment
 from .catalog.entity import CatalogEntity, CatalogList
 from .catalog.subscriptions import Subscriptions
 from .catalog.subscription_info import SubscriptionInfo
@@ -19,6 +20,7 @@ __all__ = [
     'Provider',
     'Variable',
     'Enrichment',
+    'LocalEnrichment',
     'Subscriptions',
     'SubscriptionInfo',
     'CatalogEntity',
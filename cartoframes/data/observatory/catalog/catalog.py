@@ -5,8 +5,11 @@ from .provider import Provider
 from .dataset import Dataset
 from .geography import Geography
 from .subscriptions import Subscriptions
-from .repository.constants import (COUNTRY_FILTER, CATEGORY_FILTER, GEOGRAPHY_FILTER, GLOBAL_COUNTRY_FILTER,
-                                   PROVIDER_FILTER, PUBLIC_FILTER)
+from .repository.constants import (COUNTRY_FILTER, CATEGORY_FILTER, DATASET_FILTER, GEOGRAPHY_FILTER,
+                                   GLOBAL_COUNTRY_FILTER, PROVIDER_FILTER, PUBLIC_FILTER)
+from .repository.metadata_cache import get_metadata_cache
+from .coverage_index import reset_coverage_index
+from .catalog_index import DATASETS, GEOGRAPHIES, VARIABLES, get_catalog_index, reset_catalog_index, save_catalog_index
 
 from ....utils.logger import log
 from ....utils.utils import get_credentials
@@ -77,6 +80,16 @@ class Catalog:
     >>> Provider.get('mrli')
     <Provider.get('mrli')>
 
+    The metadata is cached locally, so exploring the Catalog again is fast. Use :py:meth:`Catalog.refresh`
+    to get the latest metadata.
+
+    With `local=True`, datasets and geographies are filtered in memory with an index of the whole Catalog,
+    built the first time and kept in a local snapshot for a day. The index is also used to search datasets,
+    geographies and variables by keywords with :py:meth:`Catalog.search`.
+
+    Args:
+        local (bool, optional): filter the datasets and geographies locally. Default is False.
+
     Examples:
         The preferred way of discover the available datasets in the Catalog is through nested filters
 
@@ -117,8 +130,9 @@ class Catalog:
     for more information.
 
     """
-    def __init__(self):
+    def __init__(self, local=False):
         self.filters = {}
+        self.local = local
 
     @property
     def countries(self):
@@ -173,6 +187,8 @@ class Catalog:
 
         """
         self._global_message()
+        if self.local:
+            return get_catalog_index().get(DATASETS, self.filters)
         return Dataset.get_all(self.filters)
 
     @property
@@ -187,6 +203,8 @@ class Catalog:
 
         """
         self._global_message()
+        if self.local:
+            return get_catalog_index().get(GEOGRAPHIES, self.filters)
         return Geography.get_all(self.filters)
 
     def country(self, country_id):
@@ -269,6 +287,55 @@ class Catalog:
         """Remove the current filters from this Catalog instance."""
         self.filters = {}
 
+    def refresh(self):
+        """Expire the catalog metadata cached locally. The metadata is cached by entity type for up to
+        a week, and this forces it to be revalidated against the Data Observatory the next time it is used.
+        """
+        get_metadata_cache().expire()
+        reset_catalog_index()
+        reset_coverage_index()
+
+    def search(self, text, entity_type=DATASETS):
+        """Search the entities of the Catalog with all the words of the text (or words starting with them)
+        in their name or description, applying the current filters, in a local index of the Catalog.
+
+        Variables are searched in the datasets matching the current filters, and they are indexed the
+        first time, so narrow the search with filters before.
+
+        Args:
+            text (str): keywords to search.
+            entity_type (str, optional): type of the entities to search: `datasets`, `geographies` or
+                `variables`. Default is `datasets`.
+
+        Returns:
+            :py:class:`CatalogList <cartoframes.data.observatory.entity.CatalogList>`
+
+        Raises:
+            ValueError: if the entity type is not valid.
+            CatalogError: if there's a problem when connecting to the catalog.
+
+        Examples:
+            >>> catalog = Catalog()
+            >>> catalog.country('usa').category('demographics').search('income')
+            [<Dataset.get('acs_sociodemogr_b758e778')>, ...]
+            >>> catalog.search('median household income', entity_type='variables')
+
+        """
+        if entity_type not in [DATASETS, GEOGRAPHIES, VARIABLES]:
+            raise ValueError('Entity type "{}" not valid. Valid types are: {}, {} and {}.'.format(
+                entity_type, DATASETS, GEOGRAPHIES, VARIABLES))
+
+        catalog_index = get_catalog_index()
+
+        if entity_type != VARIABLES:
+            return catalog_index.get(entity_type, self.filters, text)
+
+        dataset_ids = [dataset.id for dataset in catalog_index.get(DATASETS, self.filters)]
+        if catalog_index.add_variables(dataset_ids):
+            save_catalog_index()
+
+        return catalog_index.get(VARIABLES, {DATASET_FILTER: dataset_ids}, text)
+
     def subscriptions(self, credentials=None):
         """Get all the subscriptions in the Catalog. You'll get all the `Dataset` or `Geography` instances you have
         previously subscribed to.
@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import time
+import numpy
+import pandas
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .entity import CatalogList
+from .repository.constants import (CATEGORY_FILTER, COUNTRY_FILTER, DATASET_FILTER, GEOGRAPHY_FILTER,
+                                   PROVIDER_FILTER, PUBLIC_FILTER)
+from .repository.dataset_repo import get_dataset_repo
+from .repository.geography_repo import get_geography_repo
+from .repository.variable_repo import get_variable_repo
+from .repository.metadata_cache import DAY_IN_SECONDS
+from .repository.repo_client import MAX_WORKERS
+from ....utils.logger import log
+from ....utils.utils import USER_CONFIG_DIR, default_config_path
+
+DEFAULT_SNAPSHOT_FILENAME = 'catalog_index.json'
+SNAPSHOT_TTL = DAY_IN_SECONDS
+
+DATASETS = 'datasets'
+GEOGRAPHIES = 'geographies'
+VARIABLES = 'variables'
+
+_FILTER_FIELDS = {
+    COUNTRY_FILTER: 'country_id',
+    CATEGORY_FILTER: 'category_id',
+    PROVIDER_FILTER: 'provider_id',
+    PUBLIC_FILTER: 'is_public_data',
+    GEOGRAPHY_FILTER: 'geography_id',
+    DATASET_FILTER: 'dataset_id'
+}
+_INDEXED_FIELDS = ['id'] + list(_FILTER_FIELDS.values())
+_TEXT_FIELDS = ['name', 'description']
+_TOKEN_PATTERN = r'\w+'
+_NO_POSITIONS = numpy.array([], dtype='int64')
+
+_catalog_index = None
+
+
+class CatalogIndex:
+    """In-memory index of the datasets, geographies and variables of the catalog, to filter and search
+    them locally.
+
+    Each entity type is kept as a columnar `DataFrame` along with inverted indexes of the filter fields
+    (`country_id`, `category_id`, `provider_id`, `is_public_data`, `geography_id` and `dataset_id`) and of
+    the words of the names and descriptions. Variables are indexed on demand by dataset.
+
+    Args:
+        entities (dict): list of entity data dicts by entity type (`datasets`, `geographies`, `variables`).
+        built_at (float, optional): timestamp of the metadata indexed. Default is now.
+
+    """
+    def __init__(self, entities, built_at=None):
+        self.built_at = built_at or time.time()
+        self._entities = {entity_type: list(entities.get(entity_type) or [])
+                          for entity_type in [DATASETS, GEOGRAPHIES, VARIABLES]}
+        self._indexes = {entity_type: _EntityIndex(records) for entity_type, records in self._entities.items()}
+
+    @classmethod
+    def build(cls):
+        """Build the index of the datasets and geographies of the catalog."""
+        log.debug('Building the catalog index')
+        return cls({
+            DATASETS: [dataset.data for dataset in get_dataset_repo().get_all()],
+            GEOGRAPHIES: [geography.data for geography in get_geography_repo().get_all()]
+        })
+
+    @classmethod
+    def load(cls, filepath):
+        """Load an index from a snapshot saved with :py:meth:`save`."""
+        with open(filepath, 'r') as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        return cls(snapshot['entities'], snapshot['built_at'])
+
+    def save(self, filepath):
+        with open(filepath, 'w') as snapshot_file:
+            json.dump({'built_at': self.built_at, 'entities': self._entities}, snapshot_file)
+
+    def is_expired(self, ttl=SNAPSHOT_TTL):
+        return time.time() - self.built_at >= ttl
+
+    def table(self, entity_type):
+        """Return the `DataFrame` of the entities of a type."""
+        return self._indexes[entity_type].table
+
+    def get(self, entity_type, filters=None, text=None):
+        """Return the entities of a type matching the Catalog filters (`country`, `category`, `provider`,
+        `public`, `geography`, `dataset`), with a value or a list of values, and with all the words of
+        the text, or words starting with them, in their name or description.
+        """
+        filters = dict(filters or {})
+        positions = None
+
+        if entity_type == GEOGRAPHIES and CATEGORY_FILTER in filters:
+            # Geographies have no category: use the ones of the datasets with the category
+            datasets = self._indexes[DATASETS].positions(filters)
+            geography_ids = self._indexes[DATASETS].table['geography_id'].values[datasets]
+            positions = self._indexes[GEOGRAPHIES].positions_by_values('id', geography_ids)
+            del filters[CATEGORY_FILTER]
+
+        entity_index = self._indexes[entity_type]
+        positions = entity_index.positions(filters, text, positions)
+
+        entity_class = _get_entity_class(entity_type)
+        return CatalogList([entity_class(self._entities[entity_type][position]) for position in positions])
+
+    def add_variables(self, dataset_ids):
+        """Index the variables of the datasets given that are not indexed yet, fetching them concurrently."""
+        indexed_ids = set(self._indexes[VARIABLES].table.get('dataset_id', []))
+        pending_ids = [dataset_id for dataset_id in OrderedDict.fromkeys(dataset_ids) if dataset_id not in indexed_ids]
+
+        if not pending_ids:
+            return False
+
+        log.debug('Indexing the variables of %s datasets', len(pending_ids))
+        variable_repo = get_variable_repo()
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            variables = executor.map(lambda dataset_id: variable_repo.get_all({DATASET_FILTER: dataset_id}),
+                                     pending_ids)
+            for dataset_variables in variables:
+                self._entities[VARIABLES].extend(variable.data for variable in dataset_variables)
+
+        self._indexes[VARIABLES] = _EntityIndex(self._entities[VARIABLES])
+        return True
+
+
+class _EntityIndex:
+    """Table of the entities of a type with the inverted indexes of its fields and words."""
+
+    def __init__(self, records):
+        self.table = pandas.DataFrame.from_records(records) if records else pandas.DataFrame()
+        self.fields = {
+            field: _inverted_index(self.table[field].map(_normalize_value))
+            for field in _INDEXED_FIELDS if field in self.table
+        }
+        self.words = _words_index(self.table)
+
+    def positions(self, filters=None, text=None, positions=None):
+        if positions is None:
+            positions = numpy.arange(len(self.table))
+
+        for filter_name, value in (filters or {}).items():
+            field = _FILTER_FIELDS.get(filter_name, filter_name)
+            values = value if isinstance(value, list) else [value]
+            positions = numpy.intersect1d(positions, self.positions_by_values(field, values), assume_unique=True)
+
+        for word in _tokenize(text):
+            matches = [word_positions for indexed_word, word_positions in self.words.items()
+                       if indexed_word.startswith(word)]
+            word_positions = numpy.unique(numpy.concatenate(matches)) if matches else _NO_POSITIONS
+            positions = numpy.intersect1d(positions, word_positions, assume_unique=True)
+
+        return positions
+
+    def positions_by_values(self, field, values):
+        field_index = self.fields.get(field, {})
+        matches = [field_index[key] for key in {_normalize_value(value) for value in values} if key in field_index]
+        return numpy.unique(numpy.concatenate(matches)) if matches else _NO_POSITIONS
+
+
+def get_catalog_index(filepath=None):
+    """Return the catalog index of the process, loading it from the local snapshot if it has not expired,
+    or building and saving it otherwise.
+    """
+    global _catalog_index
+
+    if _catalog_index is None or _catalog_index.is_expired():
+        filepath = filepath or _snapshot_path()
+        _catalog_index = None
+
+        if os.path.exists(filepath):
+            try:
+                snapshot_index = CatalogIndex.load(filepath)
+                if not snapshot_index.is_expired():
+                    _catalog_index = snapshot_index
+            except (ValueError, KeyError) as e:
+                log.debug('Catalog index snapshot not valid: %s', e)
+
+        if _catalog_index is None:
+            _catalog_index = CatalogIndex.build()
+            _catalog_index.save(filepath)
+
+    return _catalog_index
+
+
+def save_catalog_index(filepath=None):
+    if _catalog_index is not None:
+        _catalog_index.save(filepath or _snapshot_path())
+
+
+def reset_catalog_index(filepath=None):
+    """Remove the catalog index of the process and its local snapshot."""
+    global _catalog_index
+    _catalog_index = None
+
+    filepath = filepath or _snapshot_path()
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+
+def _snapshot_path():
+    if not os.path.exists(USER_CONFIG_DIR):
+        os.makedirs(USER_CONFIG_DIR)
+    return default_config_path(DEFAULT_SNAPSHOT_FILENAME)
+
+
+def _get_entity_class(entity_type):
+    from .dataset import Dataset
+    from .geography import Geography
+    from .variable import Variable
+    return {DATASETS: Dataset, GEOGRAPHIES: Geography, VARIABLES: Variable}[entity_type]
+
+
+def _normalize_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value).lower()
+
+
+def _tokenize(text):
+    return re.findall(_TOKEN_PATTERN, text.lower()) if text else []
+
+
+def _inverted_index(series):
+    return {key: positions.astype('int64') for key, positions in series.groupby(series.values).indices.items()}
+
+
+def _words_index(table):
+    text_fields = [field for field in _TEXT_FIELDS if field in table]
+    if not text_fields:
+        return {}
+
+    texts = table[text_fields].fillna('').astype(str).agg(' '.join, axis=1)
+    words = texts.str.lower().str.findall(_TOKEN_PATTERN).explode().dropna()
+    pairs = pandas.DataFrame({'word': words.values, 'position': words.index.values}).drop_duplicates()
+    return {word: positions.astype('int64') for word, positions in
+            pairs.groupby('word')['position'].apply(numpy.asarray).items()}
@@ -0,0 +1,170 @@
+import os
+import time
+import sqlite3
+import numpy
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from geopandas import GeoSeries
+from shapely import wkb
+
+from .repository.geography_repo import get_geography_repo
+from .repository.metadata_cache import DAY_IN_SECONDS
+from ....utils.logger import log
+from ....utils.spatial_index import SpatialIndex
+from ....utils.utils import USER_CONFIG_DIR, default_config_path
+
+DEFAULT_STORE_FILENAME = 'coverage_index.sqlite'
+COVERAGE_TTL = DAY_IN_SECONDS
+# Tolerances (in degrees) of the coverage approximations checked before the exact coverage
+COVERAGE_TOLERANCES = [0.1, 0.01]
+
+_coverage_index = None
+
+
+class CoverageIndex:
+    """Spatial index of the coverage of the Data Observatory geographies.
+
+    Each coverage is kept exactly and simplified at several tolerances. The simplified coverages
+    are buffered by their tolerance before, so they always contain the exact one: a geometry not
+    intersecting a simplified coverage can't intersect the exact coverage. Queries prefilter the
+    coverages by bounding box with an STRtree, and then check the approximations from the coarsest
+    to the exact coverage, so the complex polygons are only intersected with the closest geometries.
+
+    Args:
+        ids (sequence): ids of the geographies.
+        coverages (sequence of shapely geometries): exact coverage of each geography.
+        levels (list, optional): simplified coverages by tolerance, from the coarsest. They are
+            computed from the exact coverages if not given.
+        built_at (float, optional): timestamp of the coverages indexed. Default is now.
+
+    """
+    def __init__(self, ids, coverages, levels=None, built_at=None):
+        self.ids = numpy.asarray(ids, dtype=object)
+        self.built_at = built_at or time.time()
+
+        coverages = GeoSeries(list(coverages))
+        if levels is None:
+            levels = [_approximate(coverages, tolerance) for tolerance in COVERAGE_TOLERANCES]
+        self.levels = [GeoSeries(list(level)) for level in levels] + [coverages]
+
+        self._index = SpatialIndex(self.levels[0].values)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def is_expired(self, ttl=COVERAGE_TTL):
+        return time.time() - self.built_at >= ttl
+
+    def query(self, geometries):
+        """Return the ids of the geographies whose coverage intersects any of the geometries given."""
+        geometries = GeoSeries(list(geometries))
+        positions, coverage_positions = self._index.query(geometries.values, predicate=None)
+        log.debug('%s coverage candidates by bounding box', len(positions))
+
+        for level in self.levels:
+            if len(positions) == 0:
+                break
+            intersects = GeoSeries(list(geometries.values[positions])).intersects(
+                GeoSeries(list(level.values[coverage_positions]))).values
+            positions, coverage_positions = positions[intersects], coverage_positions[intersects]
+
+        return list(OrderedDict.fromkeys(self.ids[numpy.sort(coverage_positions)]))
+
+
+class CoverageIndexStore:
+    """Local store of the coverages of the Data Observatory geographies, exact and simplified.
+
+    Args:
+        filepath (str, optional): path of the SQLite database used as store. By default
+            it is created in the cartoframes user config directory.
+
+    """
+    def __init__(self, filepath=None):
+        if filepath is None:
+            if not os.path.exists(USER_CONFIG_DIR):
+                os.makedirs(USER_CONFIG_DIR)
+            filepath = default_config_path(DEFAULT_STORE_FILENAME)
+
+        self.filepath = filepath
+
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS coverages (position INTEGER, level INTEGER, id TEXT, '
+                         'the_geom BLOB, built_at REAL, PRIMARY KEY (position, level))')
+
+    def load(self):
+        """Return the stored index, or None if there is no index stored."""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT level, id, the_geom, built_at FROM coverages ORDER BY level, position') \
+                .fetchall()
+
+        if not rows:
+            return None
+
+        levels = {}
+        ids = []
+        for level, geography_id, the_geom, built_at in rows:
+            levels.setdefault(level, []).append(wkb.loads(bytes(the_geom)) if the_geom is not None else None)
+            if level == 0:
+                ids.append(geography_id)
+
+        levels = [levels[level] for level in sorted(levels)]
+        return CoverageIndex(ids, levels[-1], levels[:-1], built_at)
+
+    def save(self, index):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM coverages')
+            for level, coverages in enumerate(index.levels):
+                conn.executemany(
+                    'INSERT INTO coverages (position, level, id, the_geom, built_at) VALUES (?, ?, ?, ?, ?)',
+                    [(position, level, geography_id, _to_blob(geom), index.built_at)
+                     for position, (geography_id, geom) in enumerate(zip(index.ids, coverages))]
+                )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM coverages')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.filepath)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def get_coverage_index(store=None):
+    """Return the coverage index of the process, loading it from the local store if it has not
+    expired, or downloading the coverages and storing them otherwise.
+    """
+    global _coverage_index
+
+    if _coverage_index is None or _coverage_index.is_expired():
+        store = store or CoverageIndexStore()
+        _coverage_index = store.load()
+
+        if _coverage_index is None or _coverage_index.is_expired():
+            log.debug('Downloading the coverage of the geographies')
+            geographies_gdf = get_geography_repo().get_geographies_gdf()
+            _coverage_index = CoverageIndex(geographies_gdf['id'].values, geographies_gdf.geometry.values)
+            store.save(_coverage_index)
+
+    return _coverage_index
+
+
+def reset_coverage_index(store=None):
+    global _coverage_index
+    _coverage_index = None
+    (store or CoverageIndexStore()).clear()
+
+
+def _approximate(coverages, tolerance):
+    """Simplified coverages that contain the exact ones."""
+    return [geom.buffer(tolerance, resolution=2).simplify(tolerance, preserve_topology=False)
+            if geom is not None and not geom.is_empty else None for geom in coverages]
+
+
+def _to_blob(geom):
+    return sqlite3.Binary(geom.wkb) if geom is not None and not geom.is_empty else None
@@ -3,9 +3,9 @@ import geopandas as gpd
 
 from shapely import wkt
 
-from .entity import CatalogEntity
+from .entity import CatalogEntity, DEFAULT_BATCH_ROWS
+from .coverage_index import get_coverage_index
 from .repository.dataset_repo import get_dataset_repo, DATASET_TYPE
-from .repository.geography_repo import get_geography_repo
 from .repository.variable_repo import get_variable_repo
 from .repository.variable_group_repo import get_variable_group_repo
 from .repository.constants import DATASET_FILTER
@@ -13,6 +13,7 @@ from .summary import dataset_describe, head, tail, counts, fields_by_type, geom_
 from . import subscription_info
 from . import subscriptions
 from . import utils
+from ....utils.geom_utils import is_reprojection_needed, reproject
 from ....utils.logger import log
 from ....utils.utils import get_credentials, check_credentials, check_do_enabled
 from ....exceptions import DOError
@@ -351,10 +352,11 @@ class Dataset(CatalogEntity):
         user_gdf = cls._get_user_geodataframe(filter_dataset)
 
         # TODO: check if the dataframe has a geometry column if not exception
-        # Saving memory
-        user_gdf = user_gdf[[user_gdf.geometry.name]]
-        catalog_geographies_gdf = get_geography_repo().get_geographies_gdf()
-        matched_geographies_ids = cls._join_geographies_geodataframes(catalog_geographies_gdf, user_gdf)
+        user_geometries = user_gdf.geometry
+        if is_reprojection_needed(user_geometries):
+            user_geometries = reproject(user_geometries)
+
+        matched_geographies_ids = get_coverage_index().query(user_geometries.values)
 
         # Get Dataset objects
         return get_dataset_repo().get_all({'geography_id': list(matched_geographies_ids)})
@@ -371,11 +373,6 @@ class Dataset(CatalogEntity):
             df['geometry'] = df['geometry'].apply(wkt.loads)
             return gpd.GeoDataFrame(df)
 
-    @staticmethod
-    def _join_geographies_geodataframes(geographies_gdf1, geographies_gdf2):
-        join_gdf = gpd.sjoin(geographies_gdf1, geographies_gdf2, how='inner', op='intersects')
-        return join_gdf['id'].unique()
-
     @check_do_enabled
     def to_csv(self, file_path, credentials=None, limit=None, order_by=None, sql_query=None, add_geom=None):
         """Download dataset data as a local csv file. You need Data Observatory enabled in your CARTO
@@ -412,6 +409,48 @@ class Dataset(CatalogEntity):
 
         self._download(_credentials, file_path, limit=limit, order_by=order_by, sql_query=sql_query, add_geom=add_geom)
 
+    @check_do_enabled
+    def to_parquet(self, file_path, credentials=None, batch_rows=DEFAULT_BATCH_ROWS, limit=None, order_by=None,
+                   sql_query=None, add_geom=None):
+        """Download dataset data as a local Parquet file, with the geography encoded as WKB. You need Data
+        Observatory enabled in your CARTO account, please contact us at support@carto.com for more information.
+
+        The data is converted in batches of rows as it is downloaded, so large datasets can be saved with
+        bounded memory. It requires `pyarrow`.
+
+        For premium datasets (those with `is_public_data` set to False), you need a subscription to the dataset.
+        Check the subscription guides for more information.
+
+        Args:
+            file_path (str): the file path where save the dataset (Parquet).
+            credentials (:py:class:`Credentials <cartoframes.auth.Credentials>`, optional):
+                credentials of CARTO user account. If not provided,
+                a default credentials (if set with :py:meth:`set_default_credentials
+                <cartoframes.auth.set_default_credentials>`) will be used.
+            batch_rows (int, optional): number of rows converted and written at once. Default is 100000.
+            limit (int, optional):
+                The number of rows to download. Default is to download all rows.
+            order_by (str, optional): Field(s) used to order the rows to download. Default is unordered.
+            sql_query (str, optional): a query to select, filter or aggregate the content of the dataset.
+                For instance, to download just one row: `select * from $dataset$ limit 1`. The placeholder
+                `$dataset$` is mandatory and it will be replaced by the actual dataset before running the query.
+                You can build any arbitrary query.
+            add_geom (boolean, optional): to include the geography when using the `sql_query` argument. Default to True.
+
+        Raises:
+            DOError: if you have not a valid license for the dataset being downloaded,
+                DO is not enabled or there is an issue downloading the data.
+            ValueError: if the credentials argument is not valid.
+
+        """
+        _credentials = get_credentials(credentials)
+
+        if not self.is_subscribed(_credentials, DATASET_TYPE):
+            raise DOError(DATASET_SUBSCRIPTION_ERROR)
+
+        self._download_parquet(_credentials, file_path, batch_rows, limit=limit, order_by=order_by,
+                               sql_query=sql_query, add_geom=add_geom)
+
     @check_do_enabled
     def to_dataframe(self, credentials=None, limit=None, order_by=None, sql_query=None, add_geom=None):
         """Download dataset data as a geopandas.GeoDataFrame. You need Data Observatory enabled in your CARTO
@@ -1,11 +1,14 @@
+import io
+import json
 import pandas as pd
 
 from abc import ABC
 from geopandas import GeoDataFrame
+from shapely import wkb
 
 from carto.do_dataset import DODataset
 from . import subscriptions
-from ....utils.geom_utils import set_geometry
+from ....utils.geom_utils import decode_geometry, set_geometry
 from ....utils.logger import log
 
 _DATASET_READ_MSG = '''To load it as a DataFrame you can do:
@@ -21,8 +24,17 @@ _GEOGRAPHY_READ_MSG = '''To load it as a GeoDataFrame you can do:
     gdf = GeoDataFrame(df, geometry=decode_geometry(df['geom']))
 '''
 
+_PARQUET_READ_MSG = '''To load it as a GeoDataFrame you can do:
+
+    gdf = geopandas.read_parquet('{}')
+'''
+
 GEOM_COL = 'geom'
 
+# Size of the blocks read from the download stream and written to disk
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+DEFAULT_BATCH_ROWS = 100000
+
 
 class CatalogEntity(ABC):
     """This is an internal class the rest of the classes related to the catalog discovery extend.
@@ -128,21 +140,13 @@ class CatalogEntity(ABC):
         return self.id
 
     def _download(self, credentials, file_path=None, limit=None, order_by=None, sql_query=None, add_geom=None):
-        auth_client = credentials.get_api_key_auth_client()
-
-        is_geography = None
-        if sql_query is not None:
-            is_geography = self.__class__.__name__ == 'Geography'
+        rows = self._download_stream(credentials, limit, order_by, sql_query, add_geom)
 
-        rows = DODataset(auth_client=auth_client).name(self.id).download_stream(limit=limit,
-                                                                                order_by=order_by,
-                                                                                sql_query=sql_query,
-                                                                                add_geom=add_geom,
-                                                                                is_geography=is_geography)
         if file_path:
-            with open(file_path, 'w') as csvfile:
-                for row in rows:
-                    csvfile.write(row.decode('utf-8'))
+            # The CSV is written as it is downloaded, without decoding it
+            with open(file_path, 'wb') as csvfile:
+                for block in _read_blocks(rows):
+                    csvfile.write(block)
 
             log.info('Data saved: {}'.format(file_path))
             if self.__class__.__name__ == 'Dataset':
@@ -150,7 +154,7 @@ class CatalogEntity(ABC):
             elif self.__class__.__name__ == 'Geography':
                 log.info(_GEOGRAPHY_READ_MSG.format(file_path))
         else:
-            dataframe = pd.read_csv(rows)
+            dataframe = pd.read_csv(_buffered(rows))
             gdf = GeoDataFrame(dataframe)
 
             if GEOM_COL in gdf:
@@ -158,6 +162,50 @@ class CatalogEntity(ABC):
 
             return gdf
 
+    def _download_parquet(self, credentials, file_path, batch_rows=DEFAULT_BATCH_ROWS, limit=None, order_by=None,
+                          sql_query=None, add_geom=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('pyarrow is required to save the data as Parquet. Install it with: pip install pyarrow')
+
+        rows = self._download_stream(credentials, limit, order_by, sql_query, add_geom)
+
+        # Only a batch of rows is kept in memory: each one is written as a row group of the file
+        writer = None
+        try:
+            for chunk in pd.read_csv(_buffered(rows), chunksize=batch_rows):
+                if GEOM_COL in chunk:
+                    chunk[GEOM_COL] = _encode_wkb(chunk[GEOM_COL])
+
+                table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+
+                if writer is None:
+                    schema = _parquet_schema(pyarrow, table.schema)
+                    writer = pyarrow.parquet.ParquetWriter(file_path, schema)
+
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+        log.info('Data saved: {}'.format(file_path))
+        log.info(_PARQUET_READ_MSG.format(file_path))
+
+    def _download_stream(self, credentials, limit=None, order_by=None, sql_query=None, add_geom=None):
+        auth_client = credentials.get_api_key_auth_client()
+
+        is_geography = None
+        if sql_query is not None:
+            is_geography = self.__class__.__name__ == 'Geography'
+
+        return DODataset(auth_client=auth_client).name(self.id).download_stream(limit=limit,
+                                                                                order_by=order_by,
+                                                                                sql_query=sql_query,
+                                                                                add_geom=add_geom,
+                                                                                is_geography=is_geography)
+
     def _get_remote_full_table_name(self, user_project, user_dataset, public_project):
         project, dataset, table = self.id.split('.')
 
@@ -202,3 +250,63 @@ class CatalogList(list):
             del df['summary_json']
 
         return df
+
+
+class _ChunksReader(io.RawIOBase):
+    """Raw stream over an iterator of chunks of bytes, pulling the next chunk only when it is read."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _buffered(rows):
+    """Read the download stream in large blocks instead of the chunks of the HTTP response."""
+    if not isinstance(rows, io.RawIOBase):
+        rows = _ChunksReader(rows)
+    return io.BufferedReader(rows, buffer_size=DOWNLOAD_BUFFER_SIZE)
+
+
+def _read_blocks(rows):
+    stream = _buffered(rows)
+    return iter(lambda: stream.read(DOWNLOAD_BUFFER_SIZE), b'')
+
+
+def _encode_wkb(geom_col):
+    # Batches without geometries are read as float columns of NaN
+    geom_col = geom_col.astype(object).where(geom_col.notnull(), None)
+    return [wkb.dumps(geom) if geom is not None else None for geom in decode_geometry(geom_col)]
+
+
+def _parquet_schema(pyarrow, schema):
+    """Schema of the Parquet file from the one of the first batch: columns without values are kept as
+    strings, and the geometry is described in the GeoParquet metadata.
+    """
+    fields = [pyarrow.field(field.name, pyarrow.string()) if pyarrow.types.is_null(field.type) else field
+              for field in schema]
+    metadata = dict(schema.metadata or {})
+
+    if GEOM_COL in schema.names:
+        fields = [pyarrow.field(GEOM_COL, pyarrow.binary()) if field.name == GEOM_COL else field for field in fields]
+        metadata[b'geo'] = json.dumps({
+            'version': '0.4.0',
+            'primary_column': GEOM_COL,
+            'columns': {GEOM_COL: {'encoding': 'WKB', 'geometry_type': []}}
+        }).encode('utf-8')
+
+    return pyarrow.schema(fields, metadata=metadata)
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+from contextlib import contextmanager
+from carto.do_dataset import METADATA_BASE_PATH
+from carto.exceptions import CartoException
+
+from .....utils.logger import log
+from .....utils.utils import USER_CONFIG_DIR, default_config_path
+
+DEFAULT_CACHE_FILENAME = 'catalog_cache.sqlite'
+
+DAY_IN_SECONDS = 24 * 60 * 60
+DEFAULT_TTL = DAY_IN_SECONDS
+ENTITY_TTLS = {
+    'countries': 7 * DAY_IN_SECONDS,
+    'categories': 7 * DAY_IN_SECONDS,
+    'providers': 7 * DAY_IN_SECONDS,
+    'geographies': DAY_IN_SECONDS,
+    'datasets': DAY_IN_SECONDS,
+    'variables': DAY_IN_SECONDS,
+    'variables_groups': DAY_IN_SECONDS
+}
+
+_metadata_cache = None
+
+
+class MetadataCache:
+    """Local store of the Data Observatory catalog metadata.
+
+    Each response is identified by the account used, the entity path and the filters, and it is
+    reused while it is younger than the TTL of its entity type. Expired responses with an `ETag`
+    are revalidated with a conditional request, so they are only downloaded again if they changed.
+
+    Args:
+        filepath (str, optional): path of the SQLite database used as store. By default
+            it is created in the cartoframes user config directory.
+        ttls (dict, optional): time to live in seconds by entity type (`countries`, `categories`,
+            `providers`, `geographies`, `datasets`, `variables` and `variables_groups`).
+
+    """
+    def __init__(self, filepath=None, ttls=None):
+        if filepath is None:
+            if not os.path.exists(USER_CONFIG_DIR):
+                os.makedirs(USER_CONFIG_DIR)
+            filepath = default_config_path(DEFAULT_CACHE_FILENAME)
+
+        self.filepath = filepath
+        self.ttls = dict(ENTITY_TTLS, **(ttls or {}))
+
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS metadata '
+                         '(key TEXT PRIMARY KEY, etag TEXT, fetched_at REAL, value TEXT)')
+
+    def fetch(self, auth_client, entity, filters=None):
+        """Return the metadata of the entity path with the filters given, from the cache if it is
+        still valid or from the metadata API otherwise.
+        """
+        key = self.key(auth_client, entity, filters)
+        entry = self._get(key)
+
+        if entry is not None and not _is_expired(entry, self.ttl(entity)):
+            return entry['value']
+
+        etag = entry['etag'] if entry is not None else None
+        modified, value, etag = _request_metadata(auth_client, entity, filters, etag)
+
+        if not modified:
+            log.debug('Catalog metadata not modified: %s', entity)
+            value = entry['value']
+
+        self._set(key, etag, value)
+        return value
+
+    def key(self, auth_client, entity, filters=None):
+        text_id = json.dumps([
+            auth_client.base_url,
+            hashlib.sha256((auth_client.api_key or '').encode('utf-8')).hexdigest(),
+            entity,
+            filters or {}
+        ], sort_keys=True)
+        return hashlib.md5(text_id.encode('utf-8')).hexdigest()
+
+    def ttl(self, entity):
+        segments = entity.split('/')
+        # Nested paths like datasets/{id}/variables are cached as their last type
+        entity_type = segments[-1] if len(segments) > 2 else segments[0]
+        return self.ttls.get(entity_type, DEFAULT_TTL)
+
+    def expire(self):
+        """Mark all the cached metadata as expired, to be revalidated the next time it is used."""
+        with self._connect() as conn:
+            conn.execute('UPDATE metadata SET fetched_at = NULL')
+
+    def clear(self):
+        """Remove all the cached metadata."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM metadata')
+
+    def _get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT etag, fetched_at, value FROM metadata WHERE key = ?', (key,)).fetchone()
+
+        if row is not None:
+            return {'etag': row[0], 'fetched_at': row[1], 'value': json.loads(row[2])}
+
+    def _set(self, key, etag, value):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO metadata (key, etag, fetched_at, value) VALUES (?, ?, ?, ?)',
+                         (key, etag, time.time(), json.dumps(value)))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.filepath)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def get_metadata_cache():
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = MetadataCache()
+    return _metadata_cache
+
+
+def _is_expired(entry, ttl):
+    return entry['fetched_at'] is None or time.time() - entry['fetched_at'] >= ttl
+
+
+def _request_metadata(auth_client, entity, filters=None, etag=None):
+    """Request the metadata, conditionally to the `ETag` given if any. Return whether it was
+    modified, the metadata and its `ETag`.
+    """
+    params = dict(filters or {})
+    headers = {'If-None-Match': etag} if etag else {}
+    relative_path = '{}/{}'.format(METADATA_BASE_PATH, entity)
+
+    response = auth_client.send(relative_path, 'GET', params=params, headers=headers)
+
+    if response.status_code == 304:
+        return False, None, etag
+
+    if 400 <= response.status_code < 500:
+        # Client error, provide better reason
+        reason = response.json()['errors'][0]
+        raise CartoException(u'%s Client Error: %s' % (response.status_code, reason))
+
+    try:
+        response.raise_for_status()
+    except Exception as e:
+        raise CartoException(e)
+
+    return True, response.json(), response.headers.get('ETag')
@@ -1,28 +1,29 @@
-from carto.do_dataset import DODataset
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
+from .metadata_cache import get_metadata_cache
 from .....auth import Credentials, defaults
 
 DEFAULT_USER = 'do-metadata'
+MAX_WORKERS = 8
 
 
 class RepoClient:
 
     def __init__(self):
         default_credentials = Credentials(DEFAULT_USER)
-        default_auth_client = default_credentials.get_api_key_auth_client()
-        self._default_do_dataset = DODataset(auth_client=default_auth_client)
-        self._user_do_dataset = None
-        self._external_do_dataset = None
+        self._default_auth_client = default_credentials.get_api_key_auth_client()
+        self._user_auth_client = None
+        self._external_auth_client = None
 
     def set_user_credentials(self, credentials):
         if credentials is not None:
-            auth_client = credentials.get_api_key_auth_client()
-            self._user_do_dataset = DODataset(auth_client=auth_client)
+            self._user_auth_client = credentials.get_api_key_auth_client()
         else:
-            self._user_do_dataset = None
+            self._user_auth_client = None
 
     def reset_user_credentials(self):
-        self._user_do_dataset = None
+        self._user_auth_client = None
 
     def set_external_credentials(self):
         # This must be checked every time to allow the definition of
@@ -30,10 +31,9 @@ class RepoClient:
         # every repo uses a singleton instance of this client
         external_credentials = defaults.get_default_do_credentials()
         if external_credentials is not None:
-            external_auth_client = external_credentials.get_api_key_auth_client()
-            self._external_do_dataset = DODataset(auth_client=external_auth_client)
+            self._external_auth_client = external_credentials.get_api_key_auth_client()
         else:
-            self._external_do_dataset = None
+            self._external_auth_client = None
 
     def get_countries(self, filters=None):
         self.set_external_credentials()
@@ -89,10 +89,26 @@ class RepoClient:
 
     def _fetch_entity_id(self, entity, filter_id):
         if isinstance(filter_id, list):
-            return list(filter(None, [self._fetch_entity('{0}/{1}'.format(entity, _id)) for _id in filter_id]))
+            # The metadata API has no filter by a list of ids: they are requested concurrently
+            entity_ids = ['{0}/{1}'.format(entity, _id) for _id in OrderedDict.fromkeys(filter_id)]
+            if len(entity_ids) > 1:
+                with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(entity_ids))) as executor:
+                    rows = list(executor.map(self._fetch_entity, entity_ids))
+            else:
+                rows = [self._fetch_entity(entity_id) for entity_id in entity_ids]
+            return _unique_rows(filter(None, rows))
         else:
             return self._fetch_entity('{0}/{1}'.format(entity, filter_id))
 
     def _fetch_entity(self, entity, filters=None):
-        do_dataset = self._user_do_dataset or self._external_do_dataset or self._default_do_dataset
-        return do_dataset.metadata(entity, filters)
+        auth_client = self._user_auth_client or self._external_auth_client or self._default_auth_client
+        return get_metadata_cache().fetch(auth_client, entity, filters)
+
+
+def _unique_rows(rows):
+    """Remove the repeated rows by id (an entity can be requested by id and by slug), keeping the order."""
+    unique_rows = OrderedDict()
+    for row in rows:
+        row_id = row.get('id') if isinstance(row, dict) else row
+        unique_rows.setdefault(row_id, row)
+    return list(unique_rows.values())
@@ -1,4 +1,4 @@
-from .enrichment_service import EnrichmentService, AGGREGATION_DEFAULT
+from .enrichment_service import EnrichmentService, AGGREGATION_DEFAULT, DEFAULT_MAX_WORKERS, DEFAULT_RETRY_TIMES
 
 GEOM_TYPE_POINTS = 'points'
 GEOM_TYPE_POLYGONS = 'polygons'
@@ -14,6 +14,10 @@ class Enrichment(EnrichmentService):
     Please, see the :obj:`Catalog` discovery and subscription guides, to understand how to explore the Data Observatory
     repository and subscribe to premium datasets to be used in your enrichment workflows.
 
+    The geometries uploaded to be enriched are reused by later enrichments of the same geometries for
+    50 minutes, and so are the variables already enriched (unless `filters` are used): only the new
+    variables are sent to the Data Observatory.
+
     Args:
         credentials (:py:class:`Credentials <cartoframes.auth.Credentials>`, optional):
             credentials of user account. If not provided,
@@ -25,7 +29,9 @@ class Enrichment(EnrichmentService):
     def __init__(self, credentials=None):
         super(Enrichment, self).__init__(credentials)
 
-    def enrich_points(self, dataframe, variables, geom_col=None, filters=None):
+    def enrich_points(self, dataframe, variables, geom_col=None, filters=None, shard_size=None,
+                      max_workers=DEFAULT_MAX_WORKERS, retry_times=DEFAULT_RETRY_TIMES, progress_callback=None,
+                      deduplicate=False):
         """Enrich your points `DataFrame` with columns (:obj:`Variable`) from one or more :obj:`Dataset`
         in the Data Observatory, intersecting the points in the source `DataFrame` with the geographies in the
         Data Observatory.
@@ -45,12 +51,23 @@ class Enrichment(EnrichmentService):
                 operator (in the example: `WHERE {variable1.column_name} > 30`). If you want to filter the same
                 variable several times you can use a list as a dict value: `{variable1.id: ["> 30", "< 100"]}`. The
                 variables used to filter results should exist in `variables` property list.
+            shard_size (int, optional): maximum number of rows enriched in each job. When set, the `dataframe` is
+                split into spatially grouped shards (by the quadkey of each geometry) that are uploaded and enriched
+                concurrently. Recommended for very large datasets. By default all the rows are enriched in a single job.
+            max_workers (int, optional): maximum number of shards enriched concurrently. Default is 4.
+            retry_times (int, optional): number of times a shard is tried to be enriched before failing. Default is 3.
+            progress_callback (callable, optional): function called with the number of shards enriched and the total
+                number of shards each time a shard is enriched.
+            deduplicate (bool, optional): upload and enrich only the distinct geometries of the `dataframe`, and
+                then expand the results to all its rows. Recommended for data with many repeated geometries,
+                such as visits or geocoded addresses. Default is False.
 
         Returns:
             A geopandas.GeoDataFrame enriched with the variables passed as argument.
 
         Raises:
             EnrichmentError: if there is an error in the enrichment process.
+            ValueError: if `shard_size` or `retry_times` are lower than 1.
 
         *Note that if the points of the `dataframe` you provide are contained in more than one geometry
         in the enrichment dataset, the number of rows of the returned `GeoDataFrame` could be different
@@ -81,10 +98,25 @@ class Enrichment(EnrichmentService):
             ...     filters=filters,
             ...     geom_col='the_geom')
 
+            Enrich a large points dataframe in shards of 100k points:
+
+            >>> df = pandas.read_csv('path/to/local/csv')
+            >>> variables = Catalog().country('usa').category('demographics').datasets[0].variables
+            >>> gdf_enrich = Enrichment().enrich_points(
+            ...     df,
+            ...     variables,
+            ...     geom_col='the_geom',
+            ...     shard_size=100000,
+            ...     progress_callback=lambda done, total: print('{}/{}'.format(done, total)))
+
         """
-        return self._enrich(GEOM_TYPE_POINTS, dataframe, variables, geom_col, filters)
+        return self._enrich(GEOM_TYPE_POINTS, dataframe, variables, geom_col, filters, shard_size=shard_size,
+                            max_workers=max_workers, retry_times=retry_times, progress_callback=progress_callback,
+                            deduplicate=deduplicate)
 
-    def enrich_polygons(self, dataframe, variables, geom_col=None, filters=None, aggregation=AGGREGATION_DEFAULT):
+    def enrich_polygons(self, dataframe, variables, geom_col=None, filters=None, aggregation=AGGREGATION_DEFAULT,
+                        shard_size=None, max_workers=DEFAULT_MAX_WORKERS, retry_times=DEFAULT_RETRY_TIMES,
+                        progress_callback=None, deduplicate=False):
         """Enrich your polygons `DataFrame` with columns (:obj:`Variable`) from one or more :obj:`Dataset` in
         the Data Observatory by intersecting the polygons in the source `DataFrame` with geographies in the
         Data Observatory.
@@ -131,12 +163,23 @@ class Enrichment(EnrichmentService):
                 variables, use a dict as :py:attr:`Variable.id`: aggregation method pairs, for example:
                 `{variable1.id: 'SUM', variable3.id: 'AVG'}`. Or if you want to use several aggregation method for one
                 variable, you can use a list as a dict value: `{variable1.id: ['SUM', 'AVG'], variable3.id: 'AVG'}`
+            shard_size (int, optional): maximum number of rows enriched in each job. When set, the `dataframe` is
+                split into spatially grouped shards (by the quadkey of each geometry) that are uploaded and enriched
+                concurrently. Recommended for very large datasets. By default all the rows are enriched in a single job.
+            max_workers (int, optional): maximum number of shards enriched concurrently. Default is 4.
+            retry_times (int, optional): number of times a shard is tried to be enriched before failing. Default is 3.
+            progress_callback (callable, optional): function called with the number of shards enriched and the total
+                number of shards each time a shard is enriched.
+            deduplicate (bool, optional): upload and enrich only the distinct geometries of the `dataframe`, and
+                then expand the results to all its rows. Recommended for data with many repeated geometries,
+                such as visits or geocoded addresses. Default is False.
 
         Returns:
             A geopandas.GeoDataFrame enriched with the variables passed as argument.
 
         Raises:
             EnrichmentError: if there is an error in the enrichment process.
+            ValueError: if `shard_size` or `retry_times` are lower than 1.
 
         *Note that if the geometry of the `dataframe` you provide intersects with more than one geometry
         in the enrichment dataset, the number of rows of the returned `GeoDataFrame` could be different
@@ -242,4 +285,6 @@ class Enrichment(EnrichmentService):
             ...     geom_col='the_geom')
 
         """
-        return self._enrich(GEOM_TYPE_POLYGONS, dataframe, variables, geom_col, filters, aggregation)
+        return self._enrich(GEOM_TYPE_POLYGONS, dataframe, variables, geom_col, filters, aggregation,
+                            shard_size=shard_size, max_workers=max_workers, retry_times=retry_times,
+                            progress_callback=progress_callback, deduplicate=deduplicate)
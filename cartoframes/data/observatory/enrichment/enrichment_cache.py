@@ -0,0 +1,113 @@
+import time
+import numpy
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+# Number of uploads and size in bytes of their results kept in memory
+DEFAULT_MAX_ENTRIES = 16
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class EnrichmentCache(object):
+    """In-memory store of the datasets uploaded for enrichment and of their enrichment results.
+
+    Uploads are identified by the credentials used and the geometry fingerprint of the data,
+    and they are reused while they are younger than ``ttl_seconds``. Results are stored per
+    upload as frames along with the ``(variable, aggregation)`` pairs they contain, so that
+    only the variables not enriched yet need a new enrichment job.
+
+    The least recently used uploads are dropped when there are more than ``max_entries`` or
+    their results take more than ``max_bytes``, and the expired ones on every access. Frames
+    are copied in and out, so the results returned to the callers don't share memory with them.
+    """
+
+    def __init__(self, ttl_seconds, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._uploads = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get_upload(self, key):
+        """Return the ``(temp_table_name, dataset)`` uploaded for the key, if it has not expired."""
+        with self._lock:
+            entry = self._get_entry(key)
+            return entry and (entry['temp_table_name'], entry['dataset'])
+
+    def set_upload(self, key, temp_table_name, dataset):
+        with self._lock:
+            self._uploads[key] = {
+                'uploaded_at': time.time(),
+                'temp_table_name': temp_table_name,
+                'dataset': dataset,
+                'results': {},
+                'size': 0
+            }
+            self._uploads.move_to_end(key)
+            self._evict()
+
+    def get_results(self, key, geom_type, variables):
+        """Return copies of the cached frames containing only requested ``(variable, aggregation)``
+        pairs, and the list of requested pairs not found in them.
+        """
+        pending = list(variables)
+        frames = []
+
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry:
+                for result_variables, frame in entry['results'].get(geom_type, []):
+                    if all(variable in pending for variable in result_variables):
+                        frames.append(frame.copy())
+                        pending = [variable for variable in pending if variable not in result_variables]
+
+        return frames, pending
+
+    def add_results(self, key, geom_type, variables, frame):
+        size = int(frame.memory_usage(deep=True).sum())
+        if size > self._max_bytes:
+            return
+
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry:
+                entry['results'].setdefault(geom_type, []).append((tuple(variables), frame.copy()))
+                entry['size'] += size
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._uploads.clear()
+
+    def _get_entry(self, key):
+        self._purge()
+        entry = self._uploads.get(key)
+        if entry:
+            self._uploads.move_to_end(key)
+        return entry
+
+    def _purge(self):
+        now = time.time()
+        expired = [key for key, entry in self._uploads.items() if now - entry['uploaded_at'] >= self._ttl_seconds]
+        for key in expired:
+            del self._uploads[key]
+
+    def _evict(self):
+        self._purge()
+        while len(self._uploads) > self._max_entries or \
+                sum(entry['size'] for entry in self._uploads.values()) > self._max_bytes:
+            self._uploads.popitem(last=False)
+
+
+def geometry_fingerprint(geometries, ids=None):
+    """Hash of the WKB of the geometries given, in order, and of the ids they are uploaded with."""
+    fingerprint = hashlib.sha1()
+    if ids is not None:
+        fingerprint.update(numpy.asarray(ids, dtype='int64').tobytes())
+    for geom in geometries:
+        wkb = geom.wkb if geom is not None else b''
+        fingerprint.update(len(wkb).to_bytes(4, 'little'))
+        fingerprint.update(wkb)
+    return fingerprint.hexdigest()
@@ -1,19 +1,42 @@
 import uuid
+import numpy
 import pandas
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from geopandas import GeoDataFrame
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_numeric_dtype
 from carto.do_dataset import DODataset
 
+from .enrichment_cache import EnrichmentCache, geometry_fingerprint
 from ...observatory import Variable
 from ....auth import get_default_credentials
 from ....exceptions import EnrichmentError
 from ....utils.geom_utils import set_geometry, has_geometry
+from ....utils.logger import log
 from ....utils.utils import timelogger
 
 _ENRICHMENT_ID = '__enrichment_id'
 _GEOM_COLUMN = '__geom_column'
+_UNIQUE_ID = '__unique_id'
 _TTL_IN_SECONDS = 3600
+# Margin to avoid reusing uploaded datasets about to expire
+_TTL_MARGIN_IN_SECONDS = 600
 
 AGGREGATION_DEFAULT = 'default'
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_RETRY_TIMES = 3
+
+_SHARD_QUADKEY_ZOOM = 16
+_READ_CHUNK_SIZE = 100000
+_DB_TYPES_MAPPING = {
+    'FLOAT': 'float64',
+    'FLOAT64': 'float64',
+    'NUMERIC': 'float64'
+}
+
+_enrichment_cache = EnrichmentCache(_TTL_IN_SECONDS - _TTL_MARGIN_IN_SECONDS)
 
 
 class EnrichmentService(object):
@@ -23,20 +46,121 @@ class EnrichmentService(object):
         self.auth_client = _create_auth_client(credentials or get_default_credentials())
 
     @timelogger
-    def _enrich(self, geom_type, dataframe, variables, geom_col=None, filters=None, aggregation=AGGREGATION_DEFAULT):
+    def _enrich(self, geom_type, dataframe, variables, geom_col=None, filters=None, aggregation=AGGREGATION_DEFAULT,
+                shard_size=None, max_workers=DEFAULT_MAX_WORKERS, retry_times=DEFAULT_RETRY_TIMES,
+                progress_callback=None, deduplicate=False):
+        if retry_times < 1:
+            raise ValueError('retry_times must be at least 1, found: {}.'.format(retry_times))
+
+        if shard_size is not None and shard_size < 1:
+            raise ValueError('shard_size must be at least 1, found: {}.'.format(shard_size))
+
         filters = filters or {}
         variable_ids = self._prepare_variables(variables)
+        column_types = self._prepare_column_types(variables)
         geodataframe = self._prepare_data(dataframe, geom_col)
-        temp_table_name = self._get_temp_table_name()
-        uploaded_dataset = self._upload_data(temp_table_name, geodataframe)
-        enriched_dataframe = self._execute_enrichment(uploaded_dataset,
-                                                      temp_table_name,
-                                                      geom_type,
-                                                      variable_ids,
-                                                      filters,
-                                                      aggregation)
+
+        if deduplicate:
+            unique_codes, data = _deduplicate_geometries(geodataframe)
+            log.debug('Enriching %s unique geometries of %s', len(data), len(geodataframe))
+        else:
+            data = geodataframe
+
+        if shard_size is None:
+            enriched_dataframe = self._enrich_data(data, geom_type, variable_ids, filters, aggregation, column_types)
+        else:
+            enriched_dataframe = self._enrich_shards(_shard_data(data, shard_size), geom_type, variable_ids,
+                                                     filters, aggregation, column_types, max_workers, retry_times,
+                                                     progress_callback)
+
+        if deduplicate:
+            enriched_dataframe = _expand_enrichment(enriched_dataframe, unique_codes, len(data))
+
         return self._merge(geodataframe, enriched_dataframe)
 
+    def _enrich_data(self, geodataframe, geom_type, variable_ids, filters, aggregation, column_types=None):
+        upload_key = self._get_upload_key(geodataframe)
+        temp_table_name, uploaded_dataset = self._get_uploaded_data(upload_key, geodataframe)
+        enrichment_ids = geodataframe[_ENRICHMENT_ID].values
+
+        if filters:
+            # Filters apply to all the variables together: results are not reused
+            enriched_dataframe = self._execute_enrichment(uploaded_dataset,
+                                                          temp_table_name,
+                                                          geom_type,
+                                                          variable_ids,
+                                                          filters,
+                                                          aggregation,
+                                                          column_types,
+                                                          enrichment_ids)
+        else:
+            variable_aggregations = [(v, _variable_aggregation(v, aggregation)) for v in variable_ids]
+            enriched_dataframes, pending = _enrichment_cache.get_results(upload_key, geom_type, variable_aggregations)
+
+            if pending and not all(_has_unique_ids(frame) for frame in enriched_dataframes):
+                # Several results for the same geometry can't be joined with the results of other variables
+                enriched_dataframes, pending = [], variable_aggregations
+
+            if pending or not enriched_dataframes:
+                pending_ids = [variable_id for variable_id, _ in pending]
+                pending_dataframe = self._execute_enrichment(uploaded_dataset,
+                                                             temp_table_name,
+                                                             geom_type,
+                                                             pending_ids,
+                                                             filters,
+                                                             _pending_aggregation(pending_ids, aggregation),
+                                                             column_types,
+                                                             enrichment_ids)
+                _enrichment_cache.add_results(upload_key, geom_type, pending, pending_dataframe)
+
+                if enriched_dataframes and not _has_unique_ids(pending_dataframe):
+                    enriched_dataframes = []
+                    pending_dataframe = self._execute_enrichment(uploaded_dataset,
+                                                                 temp_table_name,
+                                                                 geom_type,
+                                                                 variable_ids,
+                                                                 filters,
+                                                                 aggregation,
+                                                                 column_types,
+                                                                 enrichment_ids)
+                    _enrichment_cache.add_results(upload_key, geom_type, variable_aggregations, pending_dataframe)
+
+                enriched_dataframes.append(pending_dataframe)
+
+            enriched_dataframe = _merge_results(enriched_dataframes)
+
+        return enriched_dataframe
+
+    @timelogger
+    def _enrich_shards(self, shards, geom_type, variable_ids, filters, aggregation, column_types=None,
+                       max_workers=DEFAULT_MAX_WORKERS, retry_times=DEFAULT_RETRY_TIMES, progress_callback=None):
+        """Enrich the shards concurrently, retrying each failed shard up to `retry_times` times,
+        and concatenate their results. Each shard is uploaded and cached by its own ids, so shards
+        with the same geometries don't reuse each other's results.
+        """
+        results = [None] * len(shards)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_retry, partial(self._enrich_data, shard, geom_type, variable_ids, filters,
+                                                aggregation, column_types), retry_times): index
+                for index, shard in enumerate(shards)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    for pending_future in futures:
+                        pending_future.cancel()
+                    raise EnrichmentError('Couldn\'t enrich the shard {index}: {error}'.format(index=index, error=e))
+
+                log.debug('Enriched %s/%s shards', done, len(shards))
+                if progress_callback is not None:
+                    progress_callback(done, len(shards))
+
+        return pandas.concat(results, ignore_index=True)
+
     def _prepare_variables(self, variables):
         _variables = []
 
@@ -49,6 +173,19 @@ class EnrichmentService(object):
 
         return _variables
 
+    def _prepare_column_types(self, variables):
+        """Map the column names of the :obj:`Variable` instances given to the types to read them with."""
+        if isinstance(variables, Variable):
+            variables = [variables]
+        elif not isinstance(variables, list):
+            return {}
+
+        return {
+            variable.column_name: _DB_TYPES_MAPPING[str(variable.db_type).upper()]
+            for variable in variables
+            if isinstance(variable, Variable) and str(variable.db_type).upper() in _DB_TYPES_MAPPING
+        }
+
     @timelogger
     def _prepare_data(self, dataframe, geom_col):
         geodataframe = GeoDataFrame(dataframe, copy=True)
@@ -67,6 +204,25 @@ class EnrichmentService(object):
 
         return geodataframe
 
+    def _get_upload_key(self, geodataframe):
+        # The results are joined by the ids uploaded, so they are part of the key along with the geometries
+        return (self.auth_client.base_url, self.auth_client.api_key,
+                geometry_fingerprint(geodataframe.geometry, geodataframe[_ENRICHMENT_ID].values))
+
+    def _get_uploaded_data(self, upload_key, geodataframe):
+        """Return the dataset uploaded previously for the same geometries, if it is still alive,
+        or upload the data to a new dataset otherwise.
+        """
+        uploaded = _enrichment_cache.get_upload(upload_key)
+        if uploaded:
+            log.debug('Reusing uploaded dataset %s', uploaded[0])
+            return uploaded
+
+        temp_table_name = self._get_temp_table_name()
+        uploaded_dataset = self._upload_data(temp_table_name, geodataframe)
+        _enrichment_cache.set_upload(upload_key, temp_table_name, uploaded_dataset)
+        return temp_table_name, uploaded_dataset
+
     @timelogger
     def _upload_data(self, temp_table_name, geodataframe):
         reduced_geodataframe = geodataframe[[_ENRICHMENT_ID, _GEOM_COLUMN]]
@@ -85,8 +241,9 @@ class EnrichmentService(object):
         return dataset
 
     @timelogger
-    def _execute_enrichment(self, dataset, temp_table_name, geom_type, variables, filters, aggregation):
-        output_name = '{}_result'.format(temp_table_name)
+    def _execute_enrichment(self, dataset, temp_table_name, geom_type, variables, filters, aggregation,
+                            column_types=None, enrichment_ids=None):
+        output_name = '{}_result'.format(self._get_temp_table_name())
         status = dataset.enrichment(geom_type=geom_type,
                                     variables=variables,
                                     filters=filters,
@@ -97,16 +254,38 @@ class EnrichmentService(object):
             raise EnrichmentError('Couldn\'t enrich the dataframe. The job hasn\'t finished successfuly')
 
         result = DODataset(auth_client=self.auth_client).name(output_name).download_stream()
-        enriched_dataframe = pandas.read_csv(result)
+        dtype = dict(column_types or {}, **{_ENRICHMENT_ID: 'int64'})
+        chunks = pandas.read_csv(result, dtype=dtype, chunksize=_READ_CHUNK_SIZE)
 
-        return enriched_dataframe
+        if enrichment_ids is None:
+            return pandas.concat(chunks, ignore_index=True)
+        return _read_aligned_chunks(chunks, enrichment_ids)
 
+    @timelogger
     def _merge(self, geodataframe, enriched_dataframe):
-        result = geodataframe.merge(enriched_dataframe, on=_ENRICHMENT_ID, how='left')
-        result.drop(_ENRICHMENT_ID, axis=1, inplace=True)
-        result.drop(_GEOM_COLUMN, axis=1, inplace=True)
+        enrichment_ids = enriched_dataframe[_ENRICHMENT_ID]
+        common_columns = set(geodataframe.columns) & set(enriched_dataframe.columns) - {_ENRICHMENT_ID}
 
-        return result
+        if not enrichment_ids.is_unique or common_columns:
+            # Several results for the same geometry (or repeated column names): rows can't be aligned by position
+            result = geodataframe.merge(enriched_dataframe, on=_ENRICHMENT_ID, how='left')
+            del result[_ENRICHMENT_ID]
+            del result[_GEOM_COLUMN]
+            return result
+
+        # The enrichment id is the position of each row in the geodataframe
+        enriched_dataframe = enriched_dataframe.set_index(_ENRICHMENT_ID)
+        if not enriched_dataframe.index.equals(pandas.RangeIndex(len(geodataframe))):
+            enriched_dataframe = enriched_dataframe.reindex(pandas.RangeIndex(len(geodataframe)))
+
+        del geodataframe[_ENRICHMENT_ID]
+        del geodataframe[_GEOM_COLUMN]
+        geodataframe.reset_index(drop=True, inplace=True)
+        enriched_dataframe.index = geodataframe.index
+
+        result = pandas.concat([geodataframe, enriched_dataframe], axis=1, copy=False)
+
+        return GeoDataFrame(result, geometry=geodataframe.geometry.name, crs=geodataframe.crs)
 
     def _get_temp_table_name(self):
         id_tablename = uuid.uuid4().hex
@@ -115,3 +294,154 @@ class EnrichmentService(object):
 
 def _create_auth_client(credentials):
     return credentials.get_api_key_auth_client()
+
+
+def _variable_aggregation(variable_id, aggregation):
+    if isinstance(aggregation, dict):
+        aggregation = aggregation.get(variable_id, AGGREGATION_DEFAULT)
+    if isinstance(aggregation, list):
+        aggregation = tuple(aggregation)
+    return aggregation
+
+
+def _pending_aggregation(variable_ids, aggregation):
+    if isinstance(aggregation, dict):
+        return {k: v for k, v in aggregation.items() if k in variable_ids}
+    return aggregation
+
+
+def _shard_data(geodataframe, shard_size):
+    """Split the data into shards of `shard_size` rows, spatially grouped by sorting the rows
+    by the quadkey of their bounding box centers.
+    """
+    bounds = geodataframe.geometry.bounds
+    quadkeys = _quadkeys((bounds['minx'] + bounds['maxx']) / 2, (bounds['miny'] + bounds['maxy']) / 2)
+    geodataframe = geodataframe.iloc[numpy.argsort(quadkeys, kind='mergesort')]
+
+    return [geodataframe.iloc[start:start + shard_size] for start in range(0, max(len(geodataframe), 1), shard_size)]
+
+
+def _quadkeys(lng, lat, zoom=_SHARD_QUADKEY_ZOOM):
+    """Quadkeys (as integers, which keep the quadkey order) of the tiles containing the coordinates."""
+    size = 2 ** zoom
+    lng = numpy.nan_to_num(numpy.asarray(lng, dtype=float))
+    lat = numpy.clip(numpy.nan_to_num(numpy.asarray(lat, dtype=float)), -85.05112878, 85.05112878)
+    sin_lat = numpy.sin(numpy.radians(lat))
+
+    x = numpy.clip(numpy.floor((lng + 180) / 360 * size), 0, size - 1).astype(numpy.int64)
+    y = numpy.clip(numpy.floor((0.5 - numpy.log((1 + sin_lat) / (1 - sin_lat)) / (4 * numpy.pi)) * size),
+                   0, size - 1).astype(numpy.int64)
+
+    quadkeys = numpy.zeros(len(x), dtype=numpy.int64)
+    for bit in range(zoom):
+        quadkeys |= ((x >> bit) & 1) << (2 * bit)
+        quadkeys |= ((y >> bit) & 1) << (2 * bit + 1)
+    return quadkeys
+
+
+def _retry(task, retry_times=DEFAULT_RETRY_TIMES):
+    for attempt in range(1, retry_times + 1):
+        try:
+            return task()
+        except Exception as e:
+            if attempt >= retry_times:
+                raise e
+            log.debug('Enrichment failed (%s). Retrying...', e)
+
+
+def _deduplicate_geometries(geodataframe):
+    """Return the code of each row geometry (its position in the list of distinct geometries,
+    compared by WKB) and a geodataframe prepared for the enrichment with the distinct geometries.
+    """
+    wkbs = [geom.wkb if geom is not None else b'' for geom in geodataframe.geometry]
+    unique_codes, _ = pandas.factorize(wkbs)
+    _, first_positions = numpy.unique(unique_codes, return_index=True)
+
+    unique_geometries = geodataframe.geometry.iloc[first_positions].values
+    unique_geodataframe = GeoDataFrame({
+        _ENRICHMENT_ID: range(len(first_positions)),
+        _GEOM_COLUMN: unique_geometries
+    }, geometry=_GEOM_COLUMN, crs=geodataframe.crs)
+
+    return unique_codes, unique_geodataframe
+
+
+def _expand_enrichment(enriched_dataframe, unique_codes, unique_count):
+    """Expand the enrichment of the distinct geometries to every row of the original data."""
+    if enriched_dataframe[_ENRICHMENT_ID].is_unique:
+        expanded = enriched_dataframe.set_index(_ENRICHMENT_ID).reindex(pandas.RangeIndex(unique_count))
+        expanded = expanded.take(unique_codes)
+        expanded.index = pandas.RangeIndex(len(unique_codes), name=_ENRICHMENT_ID)
+        return expanded.reset_index()
+
+    codes = pandas.DataFrame({_ENRICHMENT_ID: range(len(unique_codes)), _UNIQUE_ID: unique_codes})
+    expanded = codes.merge(enriched_dataframe.rename(columns={_ENRICHMENT_ID: _UNIQUE_ID}), on=_UNIQUE_ID)
+    del expanded[_UNIQUE_ID]
+    return expanded
+
+
+def _read_aligned_chunks(chunks, enrichment_ids):
+    """Write the chunks of the enrichment results in columns preallocated in the order of the
+    enrichment ids uploaded, so only one copy of the results is kept in memory. Geometries without
+    results get null values. When a geometry has several results, the rows can't be aligned: the rows
+    read and the rest of the chunks are concatenated instead.
+    """
+    positions = pandas.Index(enrichment_ids)
+    written = numpy.zeros(len(positions), dtype=bool)
+    columns = None
+    integer_columns = None
+    rest = []
+
+    for chunk in chunks:
+        if not rest:
+            chunk_positions = positions.get_indexer(chunk[_ENRICHMENT_ID].values)
+            if (chunk_positions >= 0).all() and not written[chunk_positions].any() and \
+                    len(numpy.unique(chunk_positions)) == len(chunk_positions):
+                if columns is None:
+                    columns = OrderedDict((name, _empty_column(chunk[name], len(positions)))
+                                          for name in chunk.columns if name != _ENRICHMENT_ID)
+                    integer_columns = set(columns)
+                for name, values in columns.items():
+                    values[chunk_positions] = chunk[name].values
+                    if not is_integer_dtype(chunk[name]):
+                        integer_columns.discard(name)
+                written[chunk_positions] = True
+                continue
+
+            if columns is not None:
+                rest.append(_aligned_frame(enrichment_ids, columns, integer_columns, written).loc[written])
+        rest.append(chunk)
+
+    if rest:
+        return pandas.concat(rest, ignore_index=True)
+    if columns is None:
+        return pandas.DataFrame({_ENRICHMENT_ID: enrichment_ids})
+    return _aligned_frame(enrichment_ids, columns, integer_columns, written)
+
+
+def _empty_column(column, length):
+    if is_numeric_dtype(column) and not is_bool_dtype(column):
+        return numpy.full(length, numpy.nan)
+    return numpy.full(length, numpy.nan, dtype=object)
+
+
+def _aligned_frame(enrichment_ids, columns, integer_columns, written):
+    # Columns are moved one by one, so a single column is kept twice in memory at a time
+    frame = pandas.DataFrame({_ENRICHMENT_ID: enrichment_ids})
+    while columns:
+        name, values = columns.popitem(last=False)
+        frame[name] = values.astype('int64') if name in integer_columns and written.all() else values
+        del values
+    return frame
+
+
+def _has_unique_ids(enriched_dataframe):
+    return enriched_dataframe[_ENRICHMENT_ID].is_unique
+
+
+def _merge_results(enriched_dataframes):
+    """Join the results of different variables of the same geometries, with an enrichment id each."""
+    result = enriched_dataframes[0]
+    for enriched_dataframe in enriched_dataframes[1:]:
+        result = result.merge(enriched_dataframe, on=_ENRICHMENT_ID, how='outer')
+    return result
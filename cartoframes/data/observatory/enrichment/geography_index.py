@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import numpy
+
+from contextlib import contextmanager
+from shapely import wkb
+
+from ..catalog.entity import GEOM_COL
+from ..catalog.geography import Geography
+from ....utils.logger import log
+from ....utils.spatial_index import SpatialIndex
+from ....utils.utils import USER_CONFIG_DIR, default_config_path
+
+DEFAULT_STORE_FILENAME = 'geography_index.sqlite'
+GEOID_COL = 'geoid'
+
+_geography_index_store = None
+
+
+class GeographyIndex:
+    """Spatial index over the geographies of a Data Observatory :obj:`Geography`, by `geoid`.
+
+    Args:
+        geoids (sequence): identifiers of the geographies.
+        geometries (sequence of shapely geometries): geometries of the geographies, in the same order.
+
+    """
+    def __init__(self, geoids, geometries):
+        self.geoids = numpy.array([str(geoid) for geoid in geoids], dtype=object)
+        self._index = SpatialIndex(geometries)
+
+    def __len__(self):
+        return len(self.geoids)
+
+    @property
+    def geometries(self):
+        return self._index.geometries
+
+    @classmethod
+    def from_dataframe(cls, geodataframe):
+        """Build the index from a `GeoDataFrame` with the `geoid` and geometry of each geography."""
+        return cls(geodataframe[GEOID_COL].values, geodataframe.geometry.values)
+
+    def query(self, geometries, predicate='intersects'):
+        """Return the positions of the geometries given and the `geoid` of the geographies that
+        satisfy the predicate with each one, sorted by position.
+        """
+        positions, geography_positions = self._index.query(geometries, predicate=predicate)
+        return positions, self.geoids[geography_positions]
+
+
+class GeographyIndexStore:
+    """Local store of the geographies downloaded to build :obj:`GeographyIndex` instances, so that
+    each Data Observatory :obj:`Geography` is downloaded only once.
+
+    Args:
+        filepath (str, optional): path of the SQLite database used as store. By default
+            it is created in the cartoframes user config directory.
+
+    """
+    def __init__(self, filepath=None):
+        if filepath is None:
+            if not os.path.exists(USER_CONFIG_DIR):
+                os.makedirs(USER_CONFIG_DIR)
+            filepath = default_config_path(DEFAULT_STORE_FILENAME)
+
+        self.filepath = filepath
+        self._indexes = {}
+
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS geographies (geography_id TEXT, geoid TEXT, the_geom BLOB)')
+            conn.execute('CREATE INDEX IF NOT EXISTS geographies_geography_id ON geographies (geography_id)')
+
+    def get(self, geography, credentials=None):
+        """Return the index of a :obj:`Geography` (instance or ID), downloading and storing
+        its geographies the first time.
+        """
+        geography_id = geography.id if isinstance(geography, Geography) else geography
+
+        index = self._indexes.get(geography_id)
+        if index is None:
+            index = self.load(geography_id)
+        if index is None:
+            if not isinstance(geography, Geography):
+                geography = Geography.get(geography_id)
+
+            log.info('Downloading geography %s to build its index', geography_id)
+            geography_gdf = geography.to_dataframe(credentials, sql_query=_geography_query())
+            index = GeographyIndex.from_dataframe(geography_gdf)
+            self.save(geography_id, index)
+
+        self._indexes[geography_id] = index
+        return index
+
+    def load(self, geography_id):
+        """Return the stored index of the geography, or None if it is not stored."""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT geoid, the_geom FROM geographies WHERE geography_id = ?',
+                                (geography_id,)).fetchall()
+
+        if not rows:
+            return None
+
+        geoids, geometries = zip(*rows)
+        return GeographyIndex(geoids, [wkb.loads(bytes(the_geom)) for the_geom in geometries])
+
+    def save(self, geography_id, index):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM geographies WHERE geography_id = ?', (geography_id,))
+            conn.executemany(
+                'INSERT INTO geographies (geography_id, geoid, the_geom) VALUES (?, ?, ?)',
+                [(geography_id, geoid, sqlite3.Binary(geom.wkb))
+                 for geoid, geom in zip(index.geoids, index.geometries) if geom is not None]
+            )
+
+    def clear(self, geography_id=None):
+        """Remove the stored geographies, all of them or the ones of the geography given."""
+        with self._connect() as conn:
+            if geography_id is None:
+                conn.execute('DELETE FROM geographies')
+                self._indexes = {}
+            else:
+                conn.execute('DELETE FROM geographies WHERE geography_id = ?', (geography_id,))
+                self._indexes.pop(geography_id, None)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.filepath)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def get_geography_index_store():
+    global _geography_index_store
+    if _geography_index_store is None:
+        _geography_index_store = GeographyIndexStore()
+    return _geography_index_store
+
+
+def _geography_query():
+    return 'select {geoid}, {geom} from $geography$'.format(geoid=GEOID_COL, geom=GEOM_COL)
@@ -0,0 +1,305 @@
+import numpy
+import pandas
+
+from geopandas import GeoDataFrame, GeoSeries
+
+from .enrichment_service import EnrichmentService, AGGREGATION_DEFAULT, _ENRICHMENT_ID
+from .geography_index import GEOID_COL, get_geography_index_store
+from ..catalog.entity import GEOM_COL
+from ..catalog.variable import Variable
+from ....utils.geom_utils import set_geometry, has_geometry, is_reprojection_needed, reproject
+from ....utils.logger import log
+from ....utils.spatial_index import SpatialIndex
+from ....utils.utils import timelogger
+
+AGGREGATIONS = ['SUM', 'AVG', 'MIN', 'MAX', 'COUNT', 'STRING_AGG']
+
+_GEOID_KEY = '__geoid'
+
+
+class LocalEnrichment(EnrichmentService):
+    """Enrich your data locally with Data Observatory data already downloaded, for example with
+    :py:meth:`Dataset.to_dataframe <cartoframes.data.observatory.Dataset.to_dataframe>` and
+    :py:meth:`Geography.to_dataframe <cartoframes.data.observatory.Geography.to_dataframe>`.
+
+    The geometries are intersected using a spatial index (STRtree) over the Data Observatory geographies
+    and the variables are aggregated in vectorized form, so no credentials nor connection are needed.
+    The index is queried for all the geometries at once with shapely>=2; with older versions of shapely
+    each geometry is queried against it in a Python loop, which is noticeably slower for large data.
+
+    Args:
+        credentials (:py:class:`Credentials <cartoframes.auth.Credentials>`, optional):
+            credentials of user account, only used to download the geographies of a :obj:`Geography`
+            the first time it is used in :py:meth:`enrich_points`. If not provided, a default credentials
+            (if set with :py:meth:`set_default_credentials <cartoframes.auth.set_default_credentials>`)
+            will attempted to be used.
+
+    """
+    def __init__(self, credentials=None):
+        # The enrichment is computed locally: no auth client is needed
+        self.auth_client = None
+        self.credentials = credentials
+
+    @timelogger
+    def enrich_points(self, dataframe, do_dataframe, variables, geography=None, geom_col=None):
+        """Enrich your points `DataFrame` with columns of a Data Observatory `DataFrame` by
+        intersecting the points in the source `DataFrame` with its geographies.
+
+        When a :obj:`Geography` is given, the points are intersected with a spatial index of its geographies,
+        built the first time from the geography downloaded and stored locally, and the variables of the
+        `do_dataframe` are joined by `geoid`. Later enrichments with the same geography don't need any connection.
+
+        Args:
+            dataframe (pandas.DataFrame, geopandas.GeoDataFrame): a `DataFrame` instance to be enriched.
+            do_dataframe (pandas.DataFrame, geopandas.GeoDataFrame): a `DataFrame` with the variables of a
+                Data Observatory dataset, as the one returned by :py:meth:`Dataset.to_dataframe
+                <cartoframes.data.observatory.Dataset.to_dataframe>`. It needs the `geoid` column when the
+                `geography` is given, and the geometry of each geography otherwise.
+            variables (:py:class:`Variable <cartoframes.data.observatory.Variable>`, list, str):
+                :obj:`Variable` instance or column name, or list of :obj:`Variable` instances or column names,
+                of the `do_dataframe`.
+            geography (:py:class:`Geography <cartoframes.data.observatory.Geography>`, str, optional):
+                :obj:`Geography` instance or ID of the geographies of the `do_dataframe`.
+            geom_col (str, optional): string indicating the geometry column name in the source `DataFrame`.
+
+        Returns:
+            A geopandas.GeoDataFrame enriched with the variables passed as argument.
+
+        Raises:
+            ValueError: if there is no valid geometry or a variable is not found in the `do_dataframe`.
+
+        *Note that if the points of the `dataframe` you provide are contained in more than one geometry
+        in the enrichment dataset, the number of rows of the returned `GeoDataFrame` could be different
+        than the `dataframe` argument number of rows.*
+
+        Examples:
+            Enrich a points dataframe with a dataset downloaded previously:
+
+            >>> dataset = Dataset.get('acs_sociodemogr_b758e778')
+            >>> do_df = dataset.to_dataframe()
+            >>> gdf_enrich = LocalEnrichment().enrich_points(
+            ...     df,
+            ...     do_df,
+            ...     dataset.variables,
+            ...     geography=dataset.geography,
+            ...     geom_col='the_geom')
+
+        """
+        geodataframe = self._prepare_data(dataframe, geom_col)
+        columns = [column for column, _ in _prepare_local_variables(variables, None, do_dataframe)]
+
+        if geography is None:
+            do_geodataframe = _prepare_do_data(do_dataframe, geodataframe.crs)
+            index = SpatialIndex(do_geodataframe.geometry.values)
+            positions, do_positions = index.query(geodataframe.geometry.values)
+
+            enriched_dataframe = pandas.DataFrame({_ENRICHMENT_ID: positions})
+            for column in columns:
+                enriched_dataframe[column] = do_geodataframe[column].values[do_positions]
+        else:
+            if GEOID_COL not in do_dataframe:
+                raise ValueError('Column "{}" not found in the Data Observatory dataframe.'.format(GEOID_COL))
+
+            geometries = geodataframe.geometry
+            if is_reprojection_needed(geodataframe):
+                geometries = reproject(geometries)
+
+            index = get_geography_index_store().get(geography, self.credentials)
+            positions, geoids = index.query(geometries.values)
+            enriched_dataframe = _join_geoids(positions, geoids, do_dataframe, columns)
+
+        log.debug('Found %s intersections of %s points', len(enriched_dataframe), len(geodataframe))
+
+        return self._merge(geodataframe, enriched_dataframe)
+
+    @timelogger
+    def enrich_polygons(self, dataframe, do_dataframe, variables, geom_col=None, aggregation=AGGREGATION_DEFAULT):
+        """Enrich your polygons `DataFrame` with columns of a Data Observatory `GeoDataFrame` by
+        intersecting the polygons in the source `DataFrame` with its geographies.
+
+        It follows the same aggregation rules than :py:meth:`Enrichment.enrich_polygons
+        <cartoframes.data.observatory.Enrichment.enrich_polygons>`: the :py:attr:`Variable.agg_method` of each
+        variable is used by default, and the variables without it are skipped. `SUM` interpolates the value of each
+        geography by the proportion of its area intersected, `AVG`, `MIN` and `MAX` aggregate the values of the
+        geographies intersected, `COUNT` counts them and `STRING_AGG` concatenates them. Areas are computed in the
+        coordinate reference system of the data.
+
+        Args:
+            dataframe (pandas.DataFrame, geopandas.GeoDataFrame): a `DataFrame` instance to be enriched.
+            do_dataframe (geopandas.GeoDataFrame): a `GeoDataFrame` with the geographies and the variables of a
+                Data Observatory dataset, as the one returned by :py:meth:`Dataset.to_dataframe
+                <cartoframes.data.observatory.Dataset.to_dataframe>` with `add_geom=True`, or the one of
+                :py:meth:`Geography.to_dataframe <cartoframes.data.observatory.Geography.to_dataframe>` merged
+                with the dataset by `geoid`.
+            variables (:py:class:`Variable <cartoframes.data.observatory.Variable>`, list, str):
+                :obj:`Variable` instance or column name, or list of :obj:`Variable` instances or column names,
+                of the `do_dataframe`.
+            geom_col (str, optional): string indicating the geometry column name in the source `DataFrame`.
+            aggregation (None, str, dict, optional): aggregation used for all the variables (`SUM`, `AVG`, `MIN`,
+                `MAX`, `COUNT` or `STRING_AGG`), a dict with the aggregation of each variable by id or column name,
+                with one aggregation per variable (lists of aggregations are not supported locally), or None to
+                return a row for each geography intersected without aggregating. By default the
+                :py:attr:`Variable.agg_method` property of each variable is used.
+
+        Returns:
+            A geopandas.GeoDataFrame enriched with the variables passed as argument.
+
+        Raises:
+            ValueError: if there is no valid geometry, a variable is not found in the `do_dataframe`
+                or an aggregation is not valid.
+
+        Examples:
+            Enrich a polygons dataframe with a dataset downloaded previously:
+
+            >>> dataset = Dataset.get('acs_sociodemogr_b758e778')
+            >>> do_gdf = dataset.to_dataframe(sql_query='select * from $dataset$', add_geom=True)
+            >>> variables = [variable for variable in dataset.variables if variable.agg_method]
+            >>> gdf_enrich = LocalEnrichment().enrich_polygons(df, do_gdf, variables, geom_col='the_geom')
+
+        """
+        geodataframe = self._prepare_data(dataframe, geom_col)
+        do_geodataframe = _prepare_do_data(do_dataframe, geodataframe.crs)
+        variable_aggregations = _prepare_local_variables(variables, aggregation, do_geodataframe)
+
+        enriched_dataframe = _interpolate(geodataframe.geometry, do_geodataframe, variable_aggregations,
+                                          aggregate=aggregation is not None)
+
+        return self._merge(geodataframe, enriched_dataframe)
+
+
+def _join_geoids(positions, geoids, do_dataframe, columns):
+    """Join the variables of the Data Observatory rows with each `geoid` to its position."""
+    variables_dataframe = do_dataframe[[GEOID_COL] + [column for column in columns if column != GEOID_COL]].copy()
+    variables_dataframe[_GEOID_KEY] = variables_dataframe[GEOID_COL].astype(str)
+    if GEOID_COL not in columns:
+        del variables_dataframe[GEOID_COL]
+
+    pairs = pandas.DataFrame({_ENRICHMENT_ID: positions, _GEOID_KEY: geoids})
+    enriched_dataframe = pairs.merge(variables_dataframe, on=_GEOID_KEY, how='inner', sort=False)
+    del enriched_dataframe[_GEOID_KEY]
+
+    return enriched_dataframe
+
+
+def _prepare_do_data(do_dataframe, crs=None):
+    if has_geometry(do_dataframe):
+        do_geodataframe = GeoDataFrame(do_dataframe, geometry=do_dataframe.geometry.name)
+    elif GEOM_COL in do_dataframe:
+        do_geodataframe = GeoDataFrame(do_dataframe, copy=True)
+        set_geometry(do_geodataframe, GEOM_COL, inplace=True)
+    else:
+        raise ValueError('No valid geometry found in the Data Observatory dataframe. Please download it ' +
+                         'with its geography, for example using the "add_geom" param.')
+
+    if crs is not None and do_geodataframe.crs is not None and do_geodataframe.crs != crs:
+        do_geodataframe = do_geodataframe.to_crs(crs)
+
+    return do_geodataframe
+
+
+def _prepare_local_variables(variables, aggregation, do_geodataframe):
+    """Return the ``(column, aggregation)`` pairs of the variables to enrich, skipping the ones
+    without aggregation when the default one is used.
+    """
+    if not isinstance(variables, list):
+        variables = [variables]
+
+    variable_aggregations = []
+
+    for variable in variables:
+        if isinstance(variable, Variable):
+            variable_id, column, agg_method = variable.id, variable.column_name, variable.agg_method
+        else:
+            variable_id, column, agg_method = variable, variable, None
+
+        if column not in do_geodataframe:
+            raise ValueError('Variable "{}" not found in the Data Observatory dataframe.'.format(column))
+
+        if aggregation is None:
+            variable_aggregations.append((column, None))
+            continue
+
+        if isinstance(aggregation, dict):
+            variable_aggregation = aggregation.get(variable_id, aggregation.get(column, AGGREGATION_DEFAULT))
+        else:
+            variable_aggregation = aggregation
+
+        if variable_aggregation == AGGREGATION_DEFAULT:
+            variable_aggregation = agg_method
+
+        if not variable_aggregation:
+            log.debug('Skipping variable %s without aggregation', column)
+            continue
+
+        if not isinstance(variable_aggregation, str):
+            raise ValueError('Aggregation "{}" not valid for variable "{}": only one aggregation by variable is '
+                             'supported in local enrichments.'.format(variable_aggregation, column))
+
+        variable_aggregation = variable_aggregation.upper()
+        if variable_aggregation not in AGGREGATIONS:
+            raise ValueError('Aggregation "{}" not valid. Valid aggregations are: {}.'.format(
+                variable_aggregation, ', '.join(AGGREGATIONS)))
+
+        variable_aggregations.append((column, variable_aggregation))
+
+    return variable_aggregations
+
+
+@timelogger
+def _interpolate(geometries, do_geodataframe, variable_aggregations, aggregate=True):
+    """Intersect the geometries with the Data Observatory geographies and aggregate their values by
+    the position of each geometry, in the enrichment id column.
+    """
+    index = SpatialIndex(do_geodataframe.geometry.values)
+    positions, do_positions = index.query(geometries.values)
+    log.debug('Found %s intersections of %s geometries', len(positions), len(geometries))
+
+    if not aggregate:
+        enriched_dataframe = pandas.DataFrame({_ENRICHMENT_ID: positions})
+        for column, _ in variable_aggregations:
+            enriched_dataframe[column] = do_geodataframe[column].values[do_positions]
+        return enriched_dataframe
+
+    ratios = None
+    if any(variable_aggregation == 'SUM' for _, variable_aggregation in variable_aggregations):
+        ratios = _intersection_ratios(geometries.values[positions], do_geodataframe.geometry.values[do_positions])
+
+    enriched_dataframe = pandas.DataFrame(index=pandas.Index(numpy.unique(positions), name=_ENRICHMENT_ID))
+    for column, variable_aggregation in variable_aggregations:
+        values = pandas.Series(do_geodataframe[column].values[do_positions])
+        if variable_aggregation == 'SUM':
+            values = values * ratios
+        enriched_dataframe[column] = _aggregate(values, positions, variable_aggregation)
+
+    return enriched_dataframe.reset_index()
+
+
+def _intersection_ratios(geometries, do_geometries):
+    """Proportion of the area of each Data Observatory geography intersected by its pair geometry."""
+    geometries = GeoSeries(list(geometries))
+    do_geometries = GeoSeries(list(do_geometries))
+
+    intersection_areas = geometries.intersection(do_geometries).area.values
+    do_areas = do_geometries.area.values
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        return numpy.where(do_areas > 0, intersection_areas / do_areas, 0.0)
+
+
+def _aggregate(values, positions, aggregation):
+    if aggregation == 'STRING_AGG':
+        values = values.dropna()
+        return values.astype(str).groupby(positions[values.index.values]).agg(','.join)
+
+    grouped = values.groupby(positions)
+
+    if aggregation == 'SUM':
+        return grouped.sum(min_count=1)
+    elif aggregation == 'AVG':
+        return grouped.mean()
+    elif aggregation == 'MIN':
+        return grouped.min()
+    elif aggregation == 'MAX':
+        return grouped.max()
+    elif aggregation == 'COUNT':
+        return grouped.count()
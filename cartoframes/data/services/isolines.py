@@ -1,13 +1,26 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+from pandas import DataFrame, concat
+from geopandas import GeoDataFrame, GeoSeries
+
 from .service import Service
+from .utils import IsolinesCache
 from ...utils.logger import log
-from ...utils.geom_utils import set_geometry, has_geometry
+from ...utils.geom_utils import set_geometry, has_geometry, is_reprojection_needed, reproject
 from ...io.managers.source_manager import SourceManager
 from ...io.carto import read_carto, to_carto, delete_table
 
 QUOTA_SERVICE = 'isolines'
 DATA_RANGE_KEY = 'data_range'
 RANGE_LABEL_KEY = 'range_label'
+LOWER_DATA_RANGE_KEY = 'lower_data_range'
 CARTO_INDEX_KEY = 'cartodb_id'
+GEOM_COLUMN_NAME = 'the_geom'
+DEFAULT_MAX_WORKERS = 4
+INLINE_BATCH_SIZE = 1000
 
 
 class Isolines(Service):
@@ -16,6 +29,7 @@ class Isolines(Service):
 
     def __init__(self, credentials=None):
         super(Isolines, self).__init__(credentials, quota_service=QUOTA_SERVICE)
+        self._cache = None
 
     def isochrones(self, source, ranges, **args):
         """isochrone areas.
@@ -56,6 +70,15 @@ class Isolines(Service):
             source_col (str, optional): string indicating the source column name. This column will be used to reference
                 the generated isolines with the original geometry. By default it uses the `cartodb_id` column if exists,
                 or the index of the source `DataFrame`.
+            cached (bool, optional): reuse the areas previously computed for the same source points and
+                parameters, stored in a local cache. Only the missing areas are computed (and count towards
+                the required quota). Only available for `DataFrame` sources of points. Default is False.
+            chunk_size (int, optional): number of source points computed in each request. When set, the source
+                is split in chunks computed concurrently, and the areas of the chunks that fail are reported in the
+                ``chunks`` metadata (along with the time spent in each chunk) instead of failing the whole
+                computation. Remote sources are split by their ``cartodb_id`` column. By default all the source
+                points are computed in a single request.
+            max_workers (int, optional): maximum number of chunks computed concurrently. Default is 4.
 
         Returns:
             A named-tuple ``(data, metadata)`` containing a ``data`` geopandas.GeoDataFrame
@@ -107,6 +130,15 @@ class Isolines(Service):
             source_col (str, optional): string indicating the source column name. This column will be used to reference
                 the generated isolines with the original geometry. By default it uses the `cartodb_id` column if exists,
                 or the index of the source `DataFrame`.
+            cached (bool, optional): reuse the areas previously computed for the same source points and
+                parameters, stored in a local cache. Only the missing areas are computed (and count towards
+                the required quota). Only available for `DataFrame` sources of points. Default is False.
+            chunk_size (int, optional): number of source points computed in each request. When set, the source
+                is split in chunks computed concurrently, and the areas of the chunks that fail are reported in the
+                ``chunks`` metadata (along with the time spent in each chunk) instead of failing the whole
+                computation. Remote sources are split by their ``cartodb_id`` column. By default all the source
+                points are computed in a single request.
+            max_workers (int, optional): maximum number of chunks computed concurrently. Default is 4.
 
         Returns:
             A named-tuple ``(data, metadata)`` containing a ``data`` geopandas.GeoDataFrame
@@ -122,6 +154,39 @@ class Isolines(Service):
         """
         return self._iso_areas(source, ranges, function='isodistance', **args)
 
+    @staticmethod
+    def rings(isolines):
+        """exclusive areas from inclusive isolines.
+
+        This method computes locally the exclusive areas (rings) of inclusive isolines, as returned
+        by ``isochrones`` or ``isodistances`` with ``exclusive=False``, so that both views can be obtained
+        without performing (and spending quota on) a new computation.
+
+        Args:
+            isolines (geopandas.GeoDataFrame): inclusive isolines containing the ``source_id`` and
+                ``data_range`` columns.
+
+        Returns:
+            geopandas.GeoDataFrame: the exclusive areas, with the additional ``lower_data_range`` and
+            ``range_label`` columns, sorted by ``source_id`` and ``data_range``.
+
+        Raises:
+            ValueError: if the isolines are already exclusive.
+
+        Example:
+            >>> isolines, _ = Isolines().isochrones(df, [300, 600, 900])
+            >>> rings = Isolines.rings(isolines)
+        """
+        if LOWER_DATA_RANGE_KEY in isolines:
+            raise ValueError('The isolines provided are already exclusive.')
+
+        gdf = _rings(isolines)
+
+        if len(gdf) > 0:
+            gdf[RANGE_LABEL_KEY] = _range_labels(gdf[DATA_RANGE_KEY])
+
+        return gdf
+
     def _iso_areas(self,
                    source,
                    ranges,
@@ -139,13 +204,45 @@ class Isolines(Service):
                    ascending=False,
                    function=None,
                    geom_col=None,
-                   source_col=None):
+                   source_col=None,
+                   cached=False,
+                   chunk_size=None,
+                   max_workers=DEFAULT_MAX_WORKERS):
         metadata = {}
 
         source_manager = SourceManager(source, self._credentials)
 
-        num_rows = source_manager.get_num_rows()
-        metadata['required_quota'] = num_rows * len(ranges)
+        if cached and not source_manager.is_dataframe():
+            raise ValueError('Cached isolines are only available for DataFrame sources.')
+
+        iso_function = '_cdb_{function}_exception_safe'.format(function=function)
+        options = {
+            'is_destination': is_destination,
+            'mode_type': mode_type,
+            'mode_traffic': mode_traffic,
+            'resolution': resolution,
+            'maxpoints': maxpoints,
+            'quality': quality
+        }
+
+        if cached:
+            source_gdf = _source_gdf(source_manager, geom_col)
+            geom_types = set(geom.geom_type for geom in source_gdf.geometry if geom)
+            if not geom_types <= {'Point'}:
+                raise ValueError('Cached isolines are only available for point geometries, '
+                                 'found: {}.'.format(', '.join(sorted(geom_types - {'Point'}))))
+
+            cache = self._get_cache()
+            keys = [
+                [cache.key(geom, function, mode, r, options) for r in ranges] if geom else []
+                for geom in source_gdf.geometry
+            ]
+            areas = cache.get(key for row_keys in keys for key in row_keys)
+            missing_ranges = [[r for r, key in zip(ranges, row_keys) if key not in areas] for row_keys in keys]
+            metadata['required_quota'] = sum(len(row_ranges) for row_ranges in missing_ranges)
+        else:
+            num_rows = source_manager.get_num_rows()
+            metadata['required_quota'] = num_rows * len(ranges)
 
         if dry_run:
             return self.result(data=None, metadata=metadata)
@@ -157,50 +254,44 @@ class Isolines(Service):
                     available_quota
                 ))
 
-        if source_manager.is_remote():
-            temporary_table_name = False
-            source_query = source_manager.get_query()
-        else:
-            # upload to temporary table
-            temporary_table_name = self._new_temporary_table_name()
-            source_gdf = source_manager.gdf
-
-            if geom_col in source_gdf:
-                set_geometry(source_gdf, geom_col, inplace=True)
-
-            if not has_geometry(source_gdf):
-                raise ValueError('No valid geometry found. Please provide an input source with ' +
-                                 'a valid geometry or specify the "geom_col" param with a geometry column.')
-
-            index_as_cartodbid = CARTO_INDEX_KEY not in source_gdf.columns
-
-            to_carto(source_gdf, temporary_table_name, self._credentials, index=index_as_cartodbid,
-                     index_label=CARTO_INDEX_KEY, log_enabled=False)
-            source_query = 'SELECT * FROM {table}'.format(table=temporary_table_name)
-
-        if source_col is None:
-            source_col = CARTO_INDEX_KEY
-
-        iso_function = '_cdb_{function}_exception_safe'.format(function=function)
-        options = {
-            'is_destination': is_destination,
-            'mode_type': mode_type,
-            'mode_traffic': mode_traffic,
-            'resolution': resolution,
-            'maxpoints': maxpoints,
-            'quality': quality
-        }
-        iso_options = ["'{}={}'".format(k, v) for k, v in options.items() if v is not None]
-        iso_options = "ARRAY[{opts}]".format(opts=','.join(iso_options))
-        iso_ranges = 'ARRAY[{ranges}]'.format(ranges=','.join([str(r) for r in ranges]))
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError('The chunk_size must be a positive integer.')
 
-        sql = _areas_query(source_query, source_col, iso_function, mode, iso_ranges, iso_options)
+        if cached:
+            missing_areas = self._cached_missing_areas(
+                source_gdf, keys, missing_ranges, ranges, iso_function, mode, options,
+                chunk_size, max_workers, metadata)
+            cache.set(missing_areas.items())
+            areas.update(missing_areas)
 
-        if exclusive:
-            sql = _rings_query(sql)
+            gdf = _areas_from_cache(_source_ids(source_gdf, source_col), keys, ranges, areas)
 
-        # Execute and download the query to generate the isolines
-        gdf = read_carto(sql, self._credentials)
+            if exclusive:
+                gdf = _rings(gdf)
+        else:
+            if source_manager.is_remote():
+                source_query = source_manager.get_query()
+                if source_col is None:
+                    source_col = CARTO_INDEX_KEY
+                if chunk_size is not None and source_col != CARTO_INDEX_KEY and \
+                        CARTO_INDEX_KEY not in source_manager.get_column_names():
+                    raise ValueError('Remote sources need a "{}" column to be split in chunks.'.format(
+                        CARTO_INDEX_KEY))
+                tasks = [
+                    (stop - start, partial(
+                        self._remote_iso_areas, _chunk_query(source_query, source_col, start, stop, chunk_size),
+                        source_col, ranges, iso_function, mode, options, exclusive))
+                    for start, stop in _chunks(num_rows, chunk_size)
+                ]
+            else:
+                source_gdf = _source_gdf(source_manager, geom_col)
+                tasks = [
+                    (stop - start, partial(
+                        self._local_iso_areas, source_gdf.iloc[start:stop],
+                        source_col, ranges, iso_function, mode, options, exclusive))
+                    for start, stop in _chunks(num_rows, chunk_size)
+                ]
+            gdf = _concat(self._compute_chunks(tasks, chunk_size, max_workers, metadata))
 
         # Recalculating `cartodb_id`
         gdf.reset_index(drop=True, inplace=True)
@@ -210,7 +301,7 @@ class Isolines(Service):
         if exclusive:
             # Add range label column
             if len(gdf) > 0:
-                gdf[RANGE_LABEL_KEY] = gdf.apply(lambda r: '%.0f min.' % (r[DATA_RANGE_KEY]/60), axis=1)
+                gdf[RANGE_LABEL_KEY] = _range_labels(gdf[DATA_RANGE_KEY])
 
         if table_name:
             # save result in a table
@@ -219,15 +310,296 @@ class Isolines(Service):
         if source_manager.is_dataframe() and CARTO_INDEX_KEY in gdf:
             del gdf[CARTO_INDEX_KEY]
 
-        if temporary_table_name:
-            delete_table(temporary_table_name, self._credentials, log_enabled=False)
-
         result = self.result(data=gdf, metadata=metadata)
 
         log.info('Success! Isolines created correctly')
 
         return result
 
+    def _remote_iso_areas(self, source_query, source_col, ranges, iso_function, mode, options, exclusive=False):
+        sql = _areas_query(source_query, source_col, iso_function, mode, _iso_ranges(ranges), _iso_options(options))
+
+        if exclusive:
+            sql = _rings_query(sql)
+
+        # Execute and download the query to generate the isolines
+        return read_carto(sql, self._credentials)
+
+    def _local_iso_areas(self, source_gdf, source_col, ranges, iso_function, mode, options, exclusive=False):
+        if _has_only_points(source_gdf):
+            return self._inline_iso_areas(source_gdf, source_col, ranges, iso_function, mode, options, exclusive)
+
+        # upload to temporary table
+        temporary_table_name = self._new_temporary_table_name()
+
+        index_as_cartodbid = CARTO_INDEX_KEY not in source_gdf.columns
+
+        to_carto(source_gdf, temporary_table_name, self._credentials, index=index_as_cartodbid,
+                 index_label=CARTO_INDEX_KEY, log_enabled=False)
+        source_query = 'SELECT * FROM {table}'.format(table=temporary_table_name)
+
+        if source_col is None:
+            source_col = CARTO_INDEX_KEY
+
+        sql = _areas_query(source_query, source_col, iso_function, mode, _iso_ranges(ranges), _iso_options(options))
+
+        if exclusive:
+            sql = _rings_query(sql)
+
+        try:
+            # Execute and download the query to generate the isolines
+            return read_carto(sql, self._credentials)
+        finally:
+            delete_table(temporary_table_name, self._credentials, log_enabled=False)
+
+    def _inline_iso_areas(self, source_gdf, source_col, ranges, iso_function, mode, options, exclusive=False):
+        """Compute the areas of point sources inlining their coordinates in the query, instead of
+        uploading them to a temporary table. Points are sent in batches of ``INLINE_BATCH_SIZE``
+        to keep the requests small; the ``source_id`` returned is mapped back to the source values.
+        """
+        if is_reprojection_needed(source_gdf):
+            source_gdf = reproject(source_gdf)
+
+        source_ids = list(_source_ids(source_gdf, source_col))
+        geoms = source_gdf.geometry
+        positions = [i for i, valid in enumerate(geoms.notnull() & ~geoms.is_empty) if valid]
+        xs = list(geoms.iloc[positions].x)
+        ys = list(geoms.iloc[positions].y)
+
+        gdfs = []
+        for start, stop in _chunks(len(positions), INLINE_BATCH_SIZE):
+            source_query = _points_query(positions[start:stop], xs[start:stop], ys[start:stop])
+            sql = _areas_query(source_query, CARTO_INDEX_KEY, iso_function, mode,
+                               _iso_ranges(ranges), _iso_options(options))
+
+            if exclusive:
+                sql = _rings_query(sql)
+
+            gdfs.append(self._query_areas(sql))
+
+        gdf = _concat(gdfs)
+        gdf['source_id'] = [source_ids[int(position)] for position in gdf['source_id']]
+        return gdf
+
+    def _query_areas(self, sql):
+        result = self._execute_query(sql)
+        df = DataFrame(result.get('rows', []), columns=list(result.get('fields', {}).keys()))
+        gdf = GeoDataFrame(df)
+        if GEOM_COLUMN_NAME in gdf:
+            set_geometry(gdf, GEOM_COLUMN_NAME, inplace=True, crs='epsg:4326')
+        return gdf
+
+    def _cached_missing_areas(self, source_gdf, keys, missing_ranges, ranges, iso_function, mode, options,
+                              chunk_size=None, max_workers=DEFAULT_MAX_WORKERS, metadata=None):
+        """Compute the areas not found in the cache. Source points are grouped by their missing
+        ranges so that each group (or chunk of a group) is computed with a single query.
+        """
+        groups = {}
+        for position, row_ranges in enumerate(missing_ranges):
+            if row_ranges:
+                groups.setdefault(tuple(row_ranges), []).append(position)
+
+        tasks = []
+        for group_ranges, positions in groups.items():
+            for start, stop in _chunks(len(positions), chunk_size):
+                chunk_positions = positions[start:stop]
+                group_gdf = GeoDataFrame(
+                    {CARTO_INDEX_KEY: chunk_positions},
+                    geometry=source_gdf.geometry.iloc[chunk_positions].values,
+                    crs=source_gdf.crs
+                )
+                tasks.append((len(chunk_positions), partial(
+                    self._local_iso_areas, group_gdf, CARTO_INDEX_KEY, group_ranges, iso_function, mode, options)))
+
+        areas = {}
+        for group_areas in self._compute_chunks(tasks, chunk_size, max_workers, metadata):
+            for position, data_range, geom in zip(
+                    group_areas['source_id'], group_areas[DATA_RANGE_KEY], group_areas.geometry):
+                range_keys = dict(zip(ranges, keys[int(position)]))
+                key = range_keys.get(data_range)
+                if key is not None and geom is not None:
+                    areas[key] = geom
+        return areas
+
+    def _compute_chunks(self, tasks, chunk_size=None, max_workers=DEFAULT_MAX_WORKERS, metadata=None):
+        """Run the ``(num_rows, task)`` pairs given. Without a ``chunk_size`` the tasks are run
+        sequentially and any error is raised. Otherwise they are run concurrently, the time spent and
+        the error of each chunk are added to the ``chunks`` metadata, and only the results of the
+        successful chunks are returned (an error is raised only if every chunk fails).
+        """
+        if chunk_size is None:
+            return [task() for _, task in tasks]
+
+        results = [None] * len(tasks)
+        chunks_info = [None] * len(tasks)
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_timed, task): index for index, (_, task) in enumerate(tasks)}
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                result, elapsed, error = future.result()
+                results[index] = result
+                chunks_info[index] = {
+                    'chunk': index,
+                    'num_rows': tasks[index][0],
+                    'time': elapsed,
+                    'error': str(error) if error else None
+                }
+                if error:
+                    errors.append(error)
+                log.info('Isolines computed for {done}/{total} chunks'.format(done=done, total=len(tasks)))
+
+        if metadata is not None:
+            metadata['chunks'] = chunks_info
+
+        if errors:
+            if len(errors) == len(tasks):
+                raise errors[0]
+            log.warning('Isolines could not be computed for {failed}/{total} chunks. '
+                        'See the "chunks" metadata for details.'.format(failed=len(errors), total=len(tasks)))
+
+        return [result for result in results if result is not None]
+
+    def _get_cache(self):
+        if self._cache is None:
+            self._cache = IsolinesCache()
+        return self._cache
+
+
+def _chunks(num_rows, chunk_size=None):
+    if chunk_size is None or num_rows == 0:
+        return [(0, num_rows)]
+    return [(start, min(start + chunk_size, num_rows)) for start in range(0, num_rows, chunk_size)]
+
+
+def _chunk_query(source_query, source_col, start, stop, chunk_size=None):
+    if chunk_size is None:
+        return source_query
+    # The chunks are paged by the unique `cartodb_id`, so that no row is skipped or repeated
+    # when the values of the source column are repeated
+    order_cols = [CARTO_INDEX_KEY] if source_col == CARTO_INDEX_KEY else [CARTO_INDEX_KEY, source_col]
+    return 'SELECT * FROM ({source_query}) _source_chunk ORDER BY {order_cols} LIMIT {limit} OFFSET {offset}'.format(
+        source_query=source_query,
+        order_cols=', '.join(order_cols),
+        limit=stop - start,
+        offset=start
+    )
+
+
+def _timed(task):
+    start = time.time()
+    try:
+        return task(), time.time() - start, None
+    except Exception as e:
+        return None, time.time() - start, e
+
+
+def _concat(gdfs):
+    if len(gdfs) == 1:
+        return gdfs[0]
+    return GeoDataFrame(
+        concat(gdfs, ignore_index=True),
+        geometry=gdfs[0].geometry.name,
+        crs=gdfs[0].crs
+    )
+
+
+def _source_gdf(source_manager, geom_col):
+    source_gdf = source_manager.gdf
+
+    if geom_col in source_gdf:
+        set_geometry(source_gdf, geom_col, inplace=True)
+
+    if not has_geometry(source_gdf):
+        raise ValueError('No valid geometry found. Please provide an input source with ' +
+                         'a valid geometry or specify the "geom_col" param with a geometry column.')
+
+    return source_gdf
+
+
+def _source_ids(source_gdf, source_col):
+    if source_col is not None:
+        return source_gdf[source_col]
+    if CARTO_INDEX_KEY in source_gdf.columns:
+        return source_gdf[CARTO_INDEX_KEY]
+    return source_gdf.index
+
+
+def _areas_from_cache(source_ids, keys, ranges, areas):
+    records = [
+        (source_id, data_range, areas[key])
+        for source_id, row_keys in zip(source_ids, keys)
+        for data_range, key in zip(ranges, row_keys)
+        if key in areas
+    ]
+    gdf = GeoDataFrame(
+        DataFrame(records, columns=['source_id', DATA_RANGE_KEY, GEOM_COLUMN_NAME]),
+        geometry=GEOM_COLUMN_NAME,
+        crs='epsg:4326'
+    )
+    gdf.insert(0, CARTO_INDEX_KEY, gdf.index + 1)
+    return gdf
+
+
+def _rings(gdf):
+    """Compute the exclusive areas of each source by subtracting from every area
+    the one of the immediately smaller range. Differences are computed in bulk
+    over the whole frame, sorted by source and range.
+    """
+    gdf = gdf.sort_values(['source_id', DATA_RANGE_KEY], kind='mergesort')
+    geom_col = gdf.geometry.name
+
+    grouped = gdf.groupby('source_id', sort=False)
+    lower_data_range = grouped[DATA_RANGE_KEY].shift(1).fillna(0)
+    lower_geom = GeoSeries(grouped[geom_col].shift(1), index=gdf.index, crs=gdf.crs)
+
+    has_lower = lower_geom.notnull().values
+    rings = gdf.geometry.copy()
+    if has_lower.any():
+        rings[has_lower] = gdf.geometry[has_lower].difference(lower_geom[has_lower])
+
+    gdf = gdf.copy()
+    gdf.insert(gdf.columns.get_loc(DATA_RANGE_KEY) + 1, LOWER_DATA_RANGE_KEY, lower_data_range)
+    gdf[geom_col] = rings
+    return gdf
+
+
+def _range_labels(data_range):
+    return (data_range / 60).round().astype(int).astype(str) + ' min.'
+
+
+def _has_only_points(source_gdf):
+    geoms = source_gdf.geometry.dropna()
+    return (geoms.geom_type == 'Point').all()
+
+
+def _points_query(ids, xs, ys):
+    return """
+        SELECT
+          _points.{carto_index} AS {carto_index},
+          ST_SetSRID(ST_MakePoint(_points.x, _points.y), 4326) AS the_geom
+        FROM unnest(
+          ARRAY[{ids}]::integer[],
+          ARRAY[{xs}]::double precision[],
+          ARRAY[{ys}]::double precision[]
+        ) AS _points({carto_index}, x, y)
+    """.format(
+        carto_index=CARTO_INDEX_KEY,
+        ids=','.join([str(i) for i in ids]),
+        xs=','.join([repr(float(x)) for x in xs]),
+        ys=','.join([repr(float(y)) for y in ys])
+    )
+
+
+def _iso_ranges(ranges):
+    return 'ARRAY[{ranges}]'.format(ranges=','.join([str(r) for r in ranges]))
+
+
+def _iso_options(options):
+    iso_options = ["'{}={}'".format(k, v) for k, v in options.items() if v is not None]
+    return "ARRAY[{opts}]".format(opts=','.join(iso_options))
+
 
 def _areas_query(source_query, source_col, iso_function, mode, iso_ranges, iso_options):
     return """
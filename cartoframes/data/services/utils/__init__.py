@@ -1,9 +1,11 @@
 from . import geocoding_constants
 from . import geocoding_utils
 from .table_geocoding_lock import TableGeocodingLock
+from .isolines_cache import IsolinesCache
 
 __all__ = [
   'geocoding_constants',
   'geocoding_utils',
-  'TableGeocodingLock'
+  'TableGeocodingLock',
+  'IsolinesCache'
 ]
@@ -0,0 +1,90 @@
+import os
+import json
+import sqlite3
+import hashlib
+
+from contextlib import contextmanager
+from shapely import wkb
+
+from ....utils.utils import USER_CONFIG_DIR, default_config_path
+
+DEFAULT_CACHE_FILENAME = 'isolines_cache.sqlite'
+DEFAULT_PRECISION = 6
+MAX_SQL_VARIABLES = 500
+
+
+class IsolinesCache:
+    """Local store of previously computed isoline areas.
+
+    Each area is identified by the source point coordinates (rounded to ``precision`` decimals),
+    the isoline function, the travel mode, the range value and the service options,
+    so that areas already computed for the same parameters are not requested (nor charged) again.
+
+    Args:
+        filepath (str, optional): path of the SQLite database used as store. By default
+            it is created in the cartoframes user config directory.
+        precision (int, optional): number of decimals used to round the source coordinates
+            when computing the cache keys. Default is 6.
+
+    """
+    def __init__(self, filepath=None, precision=DEFAULT_PRECISION):
+        if filepath is None:
+            if not os.path.exists(USER_CONFIG_DIR):
+                os.makedirs(USER_CONFIG_DIR)
+            filepath = default_config_path(DEFAULT_CACHE_FILENAME)
+
+        self.filepath = filepath
+        self.precision = precision
+
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS isolines (key TEXT PRIMARY KEY, the_geom BLOB)')
+
+    def key(self, geom, function, mode, data_range, options):
+        """Compute the cache key of an isoline area."""
+        options = {k: v for k, v in options.items() if v is not None}
+        text_id = json.dumps([
+            function,
+            mode,
+            round(geom.x, self.precision),
+            round(geom.y, self.precision),
+            data_range,
+            options
+        ], sort_keys=True)
+        return hashlib.md5(text_id.encode('utf-8')).hexdigest()
+
+    def get(self, keys):
+        """Return a dict with the cached geometries for the given keys. Misses are not included."""
+        keys = list(keys)
+        result = {}
+        with self._connect() as conn:
+            for i in range(0, len(keys), MAX_SQL_VARIABLES):
+                chunk = keys[i:i + MAX_SQL_VARIABLES]
+                rows = conn.execute(
+                    'SELECT key, the_geom FROM isolines WHERE key IN ({})'.format(','.join('?' * len(chunk))),
+                    chunk
+                )
+                for key, the_geom in rows:
+                    result[key] = wkb.loads(bytes(the_geom))
+        return result
+
+    def set(self, items):
+        """Store the ``(key, geometry)`` pairs given."""
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO isolines (key, the_geom) VALUES (?, ?)',
+                [(key, sqlite3.Binary(geom.wkb)) for key, geom in items if geom is not None]
+            )
+
+    def clear(self):
+        """Remove all the cached isoline areas."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM isolines')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.filepath)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
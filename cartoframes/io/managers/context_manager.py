@@ -1,4 +1,5 @@
 import time
+import threading
 
 import pandas as pd
 
@@ -20,6 +21,11 @@ from ...utils.columns import (get_dataframe_columns_info, get_query_columns_info
                               normalize_name)
 
 DEFAULT_RETRY_TIMES = 3
+NUMERIC_DBTYPES = ['smallint', 'integer', 'bigint', 'real', 'double precision', 'number']
+
+# Schemas of the tables of the queries by credentials
+_schemas = {}
+_schemas_lock = threading.Lock()
 
 
 def retry_copy(func):
@@ -239,6 +245,10 @@ class ContextManager:
 
         return columns
 
+    def get_numeric_column_names(self, query):
+        """Fetch the names of the numeric columns of a remote table or query"""
+        return [c.name for c in self._get_query_columns_info(query) if c.dbtype in NUMERIC_DBTYPES]
+
     def is_public(self, query):
         # Used to detect public tables in queries in the publication,
         # because privacy only works for tables.
@@ -305,9 +315,20 @@ class ContextManager:
     def compute_query(self, source, schema=None):
         if is_sql_query(source):
             return source
-        schema = schema or self.get_schema()
+        schema = schema or self._get_query_schema()
         return self._compute_query_from_table(source, schema)
 
+    def _get_query_schema(self):
+        """Get the user schema once for each credentials"""
+        key = (self.credentials.base_url, self.credentials.api_key)
+        with _schemas_lock:
+            schema = _schemas.get(key)
+        if schema is None:
+            schema = self.get_schema()
+            with _schemas_lock:
+                _schemas[key] = schema
+        return schema
+
     def _compute_query_from_table(self, table_name, schema):
         return 'SELECT * FROM "{schema}"."{table_name}"'.format(
             schema=schema or 'public',
@@ -395,6 +416,12 @@ class ContextManager:
         return norm_table_name
 
 
+def clear_cache():
+    """Clear the schemas of the credentials kept in memory."""
+    with _schemas_lock:
+        _schemas.clear()
+
+
 def _drop_table_query(table_name, if_exists=True):
     return 'DROP TABLE {if_exists} {table_name}'.format(
         table_name=table_name,
@@ -0,0 +1,150 @@
+"""Compact binary encoding of the local data embedded in the maps.
+
+The data is encoded in columns of typed arrays, decoded in the browser without parsing any JSON
+but a small header:
+
+    uint32 header length | JSON header | padding to 8 bytes | buffers
+
+The geometries are nested in parts (the points, lines or polygons of the geometry), rings (the
+rings of the polygons, or a single one for the lines and points) and coordinates. Their types and
+offsets (`geometryParts`, `partRings` and `ringCoords`) are stored as `Uint8Array` and `Uint32Array`
+buffers, and the coordinates as an `Int32Array` of the deltas of the coordinates scaled to the
+precision, or as a `Float64Array` if there is no precision. Numeric properties are stored as buffers
+of their type (`Float64Array` for the types without typed array), with NaN as null. Categorical
+properties are stored as buffers of their codes, with -1 as null, and their categories in the header.
+The rest of the properties are stored as JSON values of the header.
+
+"""
+
+import json
+import struct
+import numpy as np
+
+from pandas.api.types import is_bool_dtype, is_categorical_dtype, is_numeric_dtype
+
+BINARY_ENCODING = 'binary'
+BINARY_VERSION = 1
+# Maximum precision of the coordinates stored as scaled integers: 180 * 10^6 deltas fit an Int32
+MAX_SCALED_PRECISION = 6
+
+# Types of the numeric buffers, decoded as the JS typed array of the same name
+TYPED_ARRAY_TYPES = ['int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32', 'float32', 'float64']
+
+_GEOM_TYPES = {
+    'Point': 1,
+    'MultiPoint': 2,
+    'LineString': 3,
+    'MultiLineString': 4,
+    'Polygon': 5,
+    'MultiPolygon': 6
+}
+
+
+def encode_geodataframe_binary(gdf, precision=None, json_encoder=None):
+    """Encode a GeoDataFrame without null geometries in the binary format of this module.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): the data to encode.
+        precision (int, optional): number of decimals of the coordinates. If it is not greater than 6,
+            the coordinates are stored as scaled integers.
+        json_encoder (json.JSONEncoder, optional): encoder of the properties stored in the header.
+
+    Returns:
+        bytes
+
+    """
+    buffers = _Buffers()
+    scale = 10 ** precision if precision is not None and precision <= MAX_SCALED_PRECISION else None
+
+    types, geometry_parts, part_rings, ring_coords, coords = _flatten_geometries(gdf.geometry.values)
+    geometry = {
+        'types': buffers.add(np.asarray(types, dtype='uint8')),
+        'geometryParts': buffers.add(np.asarray(geometry_parts, dtype='uint32')),
+        'partRings': buffers.add(np.asarray(part_rings, dtype='uint32')),
+        'ringCoords': buffers.add(np.asarray(ring_coords, dtype='uint32'))
+    }
+
+    coords = np.asarray(coords, dtype='float64').reshape(-1, 2)
+    if scale is not None:
+        scaled = np.round(coords * scale).astype('int64')
+        deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype='int64'))
+        geometry['coords'] = buffers.add(deltas.astype('int32'))
+    else:
+        geometry['coords'] = buffers.add(coords)
+
+    columns = []
+    for name in gdf.columns:
+        if name == gdf.geometry.name:
+            continue
+        column = gdf[name]
+        if is_categorical_dtype(column):
+            codes = column.cat.codes.values
+            columns.append({'name': name, 'type': codes.dtype.name, 'buffer': buffers.add(codes),
+                            'categories': column.cat.categories.tolist()})
+        elif is_numeric_dtype(column) and not is_bool_dtype(column):
+            values = column.values
+            if values.dtype.name not in TYPED_ARRAY_TYPES:
+                values = values.astype('float64')
+            columns.append({'name': name, 'type': values.dtype.name, 'buffer': buffers.add(values)})
+        else:
+            values = column.astype(object).where(column.notnull(), None).tolist()
+            columns.append({'name': name, 'values': values})
+
+    header = json.dumps({
+        'version': BINARY_VERSION,
+        'count': len(gdf),
+        'scale': scale,
+        'geometry': geometry,
+        'columns': columns
+    }, cls=json_encoder, separators=(',', ':')).encode('utf-8')
+
+    prefix = struct.pack('<I', len(header)) + header
+    return prefix + b'\0' * _padding(len(prefix)) + buffers.tobytes()
+
+
+def _flatten_geometries(geometries):
+    """Return the types of the geometries, the offsets of their parts, the offsets of the rings of the
+    parts, the offsets of the coordinates of the rings and the coordinates.
+    """
+    types = []
+    geometry_parts = [0]
+    part_rings = [0]
+    ring_coords = [0]
+    coords = []
+
+    for geom in geometries:
+        geom_type = geom.geom_type
+        types.append(_GEOM_TYPES[geom_type])
+        parts = list(geom.geoms) if geom_type.startswith('Multi') else [geom]
+
+        for part in parts:
+            rings = [part.exterior] + list(part.interiors) if part.geom_type == 'Polygon' else [part]
+            for ring in rings:
+                coords.extend(coord[:2] for coord in ring.coords)
+                ring_coords.append(len(coords))
+            part_rings.append(len(ring_coords) - 1)
+        geometry_parts.append(len(part_rings) - 1)
+
+    return types, geometry_parts, part_rings, ring_coords, coords
+
+
+def _padding(length):
+    return -length % 8
+
+
+class _Buffers:
+    """Typed arrays aligned to 8 bytes, referenced by byte offset and number of items."""
+
+    def __init__(self):
+        self._chunks = []
+        self._length = 0
+
+    def add(self, array):
+        data = np.ascontiguousarray(array).astype(array.dtype.newbyteorder('<'), copy=False).tobytes()
+        reference = [self._length, int(array.size)]
+        self._chunks.append(data + b'\0' * _padding(len(data)))
+        self._length += len(self._chunks[-1])
+        return reference
+
+    def tobytes(self):
+        return b''.join(self._chunks)
@@ -1,9 +1,11 @@
 import re
 import json
+import numpy
 import shapely
 import binascii as ba
 
 from geopandas import GeoSeries, GeoDataFrame, points_from_xy
+from shapely.ops import transform
 
 ENC_SHAPELY = 'shapely'
 ENC_WKB = 'wkb'
@@ -255,6 +257,20 @@ def to_geojson(geom, buffer_simplify=True):
             return json.dumps(shapely.geometry.mapping(geom), sort_keys=True)
 
 
+def quantize_geometries(geometries, precision):
+    """Round the coordinates of the geometries to a number of decimals."""
+    def round_coords(x, y, z=None):
+        return numpy.round(x, precision), numpy.round(y, precision)
+
+    return geometries.apply(lambda geom: transform(round_coords, geom) if geom is not None else None)
+
+
+def simplify_geometries(geometries, tolerance):
+    """Simplify the lines and polygons preserving their topology. Points are not modified."""
+    return geometries.apply(
+        lambda geom: geom.simplify(tolerance) if geom is not None and 'Point' not in geom.geom_type else geom)
+
+
 def is_reprojection_needed(gdf):
     crs = get_crs(gdf)
     return crs is not None and crs != 'epsg:4326'
@@ -0,0 +1,69 @@
+import numpy as np
+import shapely
+
+from shapely.strtree import STRtree
+
+_SHAPELY_2 = int(shapely.__version__.split('.')[0]) >= 2
+
+
+class SpatialIndex:
+    """STRtree over a sequence of geometries, queried by position.
+
+    It works with shapely 1.8, querying each geometry against the tree, and with shapely 2,
+    where all the geometries are queried at once in vectorized form. With shapely 1.8 the
+    query is a Python loop over the input geometries, so large inputs are much slower there.
+
+    Args:
+        geometries (sequence of shapely geometries): geometries to index.
+
+    """
+    def __init__(self, geometries):
+        self.geometries = _to_array(geometries)
+
+        if _SHAPELY_2:
+            self._tree = STRtree(self.geometries)
+        else:
+            valid = [i for i, geom in enumerate(self.geometries) if geom is not None and not geom.is_empty]
+            self._tree = STRtree([self.geometries[i] for i in valid], valid) if valid else None
+
+    def __len__(self):
+        return len(self.geometries)
+
+    def query(self, geometries, predicate='intersects'):
+        """Return the positions of the ``(input, indexed)`` geometry pairs that satisfy the predicate,
+        as two integer arrays sorted by input position. With ``predicate=None`` the pairs with
+        intersecting bounding boxes are returned.
+        """
+        geometries = _to_array(geometries)
+
+        if _SHAPELY_2:
+            input_positions, tree_positions = self._tree.query(geometries, predicate=predicate)
+        else:
+            input_positions, tree_positions = self._query_each(geometries, predicate)
+
+        order = np.lexsort((tree_positions, input_positions))
+        return input_positions[order].astype('int64'), tree_positions[order].astype('int64')
+
+    def _query_each(self, geometries, predicate):
+        input_positions = []
+        tree_positions = []
+
+        if self._tree is not None:
+            for input_position, geom in enumerate(geometries):
+                if geom is None or geom.is_empty:
+                    continue
+                for tree_position in self._tree.query_items(geom):
+                    if predicate is None or getattr(geom, predicate)(self.geometries[tree_position]):
+                        input_positions.append(input_position)
+                        tree_positions.append(tree_position)
+
+        return np.array(input_positions, dtype='int64'), np.array(tree_positions, dtype='int64')
+
+
+def _to_array(geometries):
+    # Filled by item: numpy would try to unpack the coordinates of the geometries otherwise
+    geometries = list(geometries)
+    array = np.empty(len(geometries), dtype=object)
+    for i, geom in enumerate(geometries):
+        array[i] = geom
+    return array
@@ -10,6 +10,7 @@ import appdirs
 import decimal
 import hashlib
 import inspect
+import logging
 import requests
 import warnings
 import functools
@@ -19,13 +20,18 @@ import pkg_resources
 import semantic_version
 
 
+from collections import OrderedDict
 from functools import wraps
 from datetime import datetime, timezone
 from warnings import catch_warnings, filterwarnings
 from pyrestcli.exceptions import ServerErrorException
-from pandas.api.types import is_datetime64_any_dtype as is_datetime
+from pandas import Series, to_numeric
+from pandas.util import hash_pandas_object
+from pandas.api.types import is_datetime64_any_dtype as is_datetime, is_bool_dtype, is_float_dtype, \
+                             is_integer_dtype, is_object_dtype, infer_dtype
 
 from .logger import log
+from .binary_data import BINARY_ENCODING, encode_geodataframe_binary
 from ..exceptions import DOError
 
 GEOM_TYPE_POINT = 'point'
@@ -34,6 +40,11 @@ GEOM_TYPE_POLYGON = 'polygon'
 
 PG_NULL = '__null'
 
+# Maximum ratio of distinct values to values of the string columns encoded as categories
+CATEGORY_MAX_RATIO = 0.5
+# Integers above this value can't be represented exactly as floats
+MAX_SAFE_INTEGER = 2 ** 53
+
 USER_CONFIG_DIR = appdirs.user_config_dir('cartoframes')
 
 
@@ -263,8 +274,13 @@ def get_geodataframe_geom_type(gdf):
     return None
 
 
-def get_geodataframe_data(data, encode_data=True):
+def get_geodataframe_data(data, encode_data=True, precision=None):
     filtered_geometries = _filter_null_geometries(data)
+
+    if encode_data == BINARY_ENCODING:
+        binary_data = encode_geodataframe_binary(_set_time_cols_epoc(filtered_geometries), precision, CustomJSONEncoder)
+        return base64.b64encode(gzip.compress(binary_data)).decode('utf-8')
+
     data = _set_time_cols_epoc(filtered_geometries).to_json(cls=CustomJSONEncoder, separators=(',', ':'))
 
     if (encode_data):
@@ -274,6 +290,92 @@ def get_geodataframe_data(data, encode_data=True):
         return data
 
 
+def plan_geodataframe_data(data, columns=None):
+    """Return the data to serialize: only the columns given and the geometry, with the numeric columns
+    downcasted to the smallest type that keeps their values and the string columns with few distinct
+    values encoded as categories.
+    """
+    geom_col = data.geometry.name
+    if columns is not None:
+        data = data[list(OrderedDict.fromkeys(list(columns) + [geom_col]))]
+
+    optimized = {}
+    for name in data.columns:
+        if name != geom_col:
+            column = _downcast_column(data[name])
+            if column is not None:
+                optimized[name] = column
+
+    planned_data = data.copy() if optimized else data
+    for name, column in optimized.items():
+        planned_data[name] = column
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('Local data planned with %s of %s columns: %s properties bytes, %s before',
+                  len(planned_data.columns) - 1, len(data.columns) - 1,
+                  _properties_size(planned_data), _properties_size(data))
+
+    return planned_data
+
+
+def get_geodataframe_hash(data):
+    """Return a hash of the content of a GeoDataFrame (columns, types, index, values and geometries),
+    or None if it has values that can't be hashed.
+    """
+    geometry = data.geometry
+    try:
+        values = hash_pandas_object(data.drop(columns=geometry.name), index=True).values
+        # GeoSeries.to_wkb is not available in all the supported versions of geopandas
+        wkbs = [geom.wkb if geom is not None else None for geom in geometry]
+        geometries = hash_pandas_object(Series(wkbs, index=data.index, dtype=object), index=False).values
+    except TypeError:
+        return None
+
+    digest = hashlib.sha1(json.dumps([[str(name), str(dtype)] for name, dtype in data.dtypes.items()]).encode())
+    digest.update(values.tobytes())
+    digest.update(geometries.tobytes())
+    return digest.hexdigest()
+
+
+def _downcast_column(column):
+    """Return the column with the smallest type that keeps its values, or None to keep it."""
+    if column.empty or is_bool_dtype(column) or not isinstance(column.dtype, np.dtype):
+        # Extension types (categories, nullable types...) are kept
+        return None
+
+    if is_integer_dtype(column):
+        return _downcast_integers(column)
+
+    if is_float_dtype(column):
+        values = column.values.astype('float64')
+        if not np.isnan(values).any() and np.all(np.abs(values) <= MAX_SAFE_INTEGER) and \
+           np.all(np.mod(values, 1) == 0):
+            return _downcast_integers(column.astype('int64'))
+
+        with np.errstate(over='ignore'):
+            float32_values = values.astype('float32')
+        if column.dtype != 'float32' and np.array_equal(float32_values.astype('float64'), values, equal_nan=True):
+            return column.astype('float32')
+        return None
+
+    if is_object_dtype(column) and infer_dtype(column, skipna=True) == 'string':
+        count = column.count()
+        if count and column.nunique() <= count * CATEGORY_MAX_RATIO:
+            return column.astype('category')
+
+    return None
+
+
+def _downcast_integers(column):
+    downcast = 'unsigned' if column.min() >= 0 else 'integer'
+    downcasted = to_numeric(column, downcast=downcast)
+    return downcasted if downcasted.dtype != column.dtype else None
+
+
+def _properties_size(data):
+    return int(data.drop(columns=data.geometry.name).memory_usage(deep=True, index=False).sum())
+
+
 def _first_value(series):
     series = series.loc[~series.isnull()]  # Remove null values
     if len(series) > 0:
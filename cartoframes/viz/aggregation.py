@@ -0,0 +1,98 @@
+from ..utils.utils import double_quote
+
+QUADGRID = 'quadgrid'
+CLUSTER = 'cluster'
+AGGREGATIONS = [QUADGRID, CLUSTER]
+
+DEFAULT_RESOLUTION = 32
+MAX_RESOLUTION = 256
+FEATURE_COUNT_COLUMN = '_cdb_feature_count'
+
+_RESERVED_COLUMNS = ['cartodb_id', 'the_geom', 'the_geom_webmercator', FEATURE_COUNT_COLUMN]
+
+# Tokens replaced by the Maps API with the values of each tile
+_CELL_SIZE = '(!pixel_width! * {resolution})'
+_BBOX = '!bbox!'
+
+_CELL_GEOMETRIES = {
+    QUADGRID: 'ST_MakeEnvelope(_cdb_gx * {cell}, _cdb_gy * {cell}, (_cdb_gx + 1) * {cell}, '
+              '(_cdb_gy + 1) * {cell}, 3857)',
+    CLUSTER: 'ST_SetSRID(ST_MakePoint(avg(ST_X(_cdb_point)), avg(ST_Y(_cdb_point))), 3857)'
+}
+
+
+def check_aggregation(aggregate, resolution):
+    if aggregate not in AGGREGATIONS:
+        raise ValueError('"{}" is not a valid aggregation. Valid aggregations are {}'.format(
+            aggregate, ', '.join(AGGREGATIONS)))
+
+    if not isinstance(resolution, (int, float)) or not 0 < resolution <= MAX_RESOLUTION:
+        raise ValueError('The resolution must be a number greater than 0 and not greater than {}'.format(
+            MAX_RESOLUTION))
+
+
+def get_aggregation_geom_type(aggregate):
+    return 'polygon' if aggregate == QUADGRID else 'point'
+
+
+def get_aggregation_query(query, aggregate, resolution=DEFAULT_RESOLUTION, columns=None, numeric_columns=None):
+    """Return a query aggregating the features of a query in a grid of cells of the resolution given,
+    in pixels, at the zoom of each tile requested.
+
+    The query is computed by the Maps API for each tile, so only the features of the tile are
+    aggregated. The cells are aligned with the tiles, so each cell is computed only once when the
+    resolution is a power of two. Each cell has the count of its features in the
+    `_cdb_feature_count` column, the sum of the numeric columns given and the most common value of
+    the rest of columns, with the names of the columns. With 'quadgrid', the geometry of the cells is
+    their square, and with 'cluster', the average position of their features.
+
+    Args:
+        query (str): the query of the features.
+        aggregate (str): the aggregation: 'quadgrid' or 'cluster'.
+        resolution (int, optional): size of the cells in pixels. Default is 32.
+        columns (list, optional): columns of the features to aggregate.
+        numeric_columns (list, optional): columns summed in the aggregation. The rest of the
+            columns are aggregated with their most common value.
+
+    Returns:
+        str
+
+    """
+    cell = _CELL_SIZE.format(resolution=resolution)
+    numeric_columns = set(numeric_columns or [])
+
+    aggregations = ['count(*) AS {}'.format(FEATURE_COUNT_COLUMN)]
+    for column in columns or []:
+        if column in _RESERVED_COLUMNS:
+            continue
+        if column in numeric_columns:
+            aggregation = 'sum({0}) AS {0}'
+        else:
+            aggregation = 'mode() WITHIN GROUP (ORDER BY {0}) AS {0}'
+        aggregations.append(aggregation.format(double_quote(column)))
+
+    return '''
+        SELECT row_number() OVER () AS cartodb_id, ST_Transform(the_geom_webmercator, 4326) AS the_geom, *
+        FROM (
+            SELECT
+                {cell_geometry} AS the_geom_webmercator,
+                {aggregations}
+            FROM (
+                SELECT *,
+                    Floor(ST_X(_cdb_point) / {cell}) AS _cdb_gx,
+                    Floor(ST_Y(_cdb_point) / {cell}) AS _cdb_gy
+                FROM (
+                    SELECT *, ST_PointOnSurface(the_geom_webmercator) AS _cdb_point
+                    FROM ({query}) _cdb_source
+                    WHERE the_geom_webmercator && {bbox}
+                ) _cdb_points
+            ) _cdb_features
+            GROUP BY _cdb_gx, _cdb_gy
+        ) _cdb_grid
+    '''.format(
+        cell_geometry=_CELL_GEOMETRIES[aggregate].format(cell=cell),
+        aggregations=',\n                '.join(aggregations),
+        cell=cell,
+        query=query,
+        bbox=_BBOX
+    )
@@ -115,3 +115,6 @@ CLUSTER_OPERATIONS = {
 THEMES = ['dark', 'light']
 
 DEFAULT_LAYOUT_M_SIZE = 1
+
+# Size in pixels assumed for a map without size: the iframe fills the cell width and it is 632px high
+DEFAULT_MAP_SIZE = (1024, 632)
@@ -1,10 +1,8 @@
 from warnings import warn
 
-from jinja2 import Environment, PackageLoader
-
-from .. import constants
 from ..basemaps import Basemaps
 from . import utils
+from .templates import render_template
 
 
 class HTMLMap(object):
@@ -12,17 +10,8 @@ class HTMLMap(object):
         self.width = None
         self.height = None
         self.srcdoc = None
-        self._env = Environment(
-            loader=PackageLoader('cartoframes', 'assets'),
-            autoescape=True
-        )
-
-        self._env.filters['quot'] = utils.quote_filter
-        self._env.filters['iframe_size'] = utils.iframe_size_filter
-        self._env.filters['clear_none'] = utils.clear_none_filter
-
         self.html = None
-        self._template = self._env.get_template(template_path)
+        self._template_path = template_path
 
     def set_content(
             self, size, layers, bounds, camera=None, basemap=None, show_info=None,
@@ -64,31 +53,17 @@ class HTMLMap(object):
                     'If basemap is a dict, it must have a `style` key'
                 )
 
-        if _carto_vl_path is None:
-            carto_vl_path = constants.CARTO_VL_URL
-        else:
-            carto_vl_path = _carto_vl_path + constants.CARTO_VL_DEV
-
-        if _airship_path is None:
-            airship_components_path = constants.AIRSHIP_COMPONENTS_URL
-            airship_bridge_path = constants.AIRSHIP_BRIDGE_URL
-            airship_module_path = constants.AIRSHIP_MODULE_URL
-            airship_styles_path = constants.AIRSHIP_STYLES_URL
-            airship_icons_path = constants.AIRSHIP_ICONS_URL
-        else:
-            airship_components_path = _airship_path + constants.AIRSHIP_COMPONENTS_DEV
-            airship_bridge_path = _airship_path + constants.AIRSHIP_BRIDGE_DEV
-            airship_module_path = _airship_path + constants.AIRSHIP_MODULE_DEV
-            airship_styles_path = _airship_path + constants.AIRSHIP_STYLES_DEV
-            airship_icons_path = _airship_path + constants.AIRSHIP_ICONS_DEV
-
         has_legends = any(layer['legends'] for layer in layers)
         has_widgets = any(len(layer['widgets']) != 0 for layer in layers)
+        layers, sources = utils.get_layer_sources(layers)
 
-        return self._template.render(
+        return render_template(
+            self._template_path,
+            dev=_carto_vl_path is not None or _airship_path is not None,
             width=size[0] if size is not None else None,
             height=size[1] if size is not None else None,
             layers=layers,
+            sources=sources,
             basemap=basemap,
             basecolor=basecolor,
             mapboxtoken=token,
@@ -98,17 +73,12 @@ class HTMLMap(object):
             has_widgets=has_widgets,
             show_info=show_info,
             theme=theme,
-            carto_vl_path=carto_vl_path,
-            airship_components_path=airship_components_path,
-            airship_module_path=airship_module_path,
-            airship_bridge_path=airship_bridge_path,
-            airship_styles_path=airship_styles_path,
-            airship_icons_path=airship_icons_path,
             title=title,
             description=description,
             is_embed=is_embed,
             is_static=is_static,
-            layer_selector=layer_selector
+            layer_selector=layer_selector,
+            **utils.get_asset_paths(_carto_vl_path, _airship_path)
         )
 
     def _repr_html_(self):
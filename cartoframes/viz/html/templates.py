@@ -0,0 +1,74 @@
+"""Process-wide Jinja environment and rendered HTML cache of the map templates"""
+
+import json
+import hashlib
+import threading
+
+from collections import OrderedDict
+from jinja2 import Environment, PackageLoader
+
+from . import utils
+
+# Number of rendered HTML documents kept in memory
+HTML_CACHE_SIZE = 8
+
+_environments = {}
+_html_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_environment(dev=False):
+    """Return the Jinja environment of the process. The environment keeps the templates compiled.
+    In dev mode, the templates are compiled again when their files change."""
+    with _lock:
+        if dev not in _environments:
+            env = Environment(
+                loader=PackageLoader('cartoframes', 'assets'),
+                autoescape=True,
+                auto_reload=dev
+            )
+
+            env.filters['quot'] = utils.quote_filter
+            env.filters['iframe_size'] = utils.iframe_size_filter
+            env.filters['clear_none'] = utils.clear_none_filter
+
+            _environments[dev] = env
+
+    return _environments[dev]
+
+
+def render_template(template_path, dev=False, **context):
+    """Render a template with the context given. The HTML is cached by the template and a hash of
+    the context, except in dev mode or if the context can't be hashed."""
+    template = get_environment(dev).get_template(template_path)
+    key = None if dev else _get_context_hash(template_path, context)
+
+    if key is not None:
+        with _lock:
+            if key in _html_cache:
+                _html_cache.move_to_end(key)
+                return _html_cache[key]
+
+    html = template.render(**context)
+
+    if key is not None:
+        with _lock:
+            _html_cache[key] = html
+            if len(_html_cache) > HTML_CACHE_SIZE:
+                _html_cache.popitem(last=False)
+
+    return html
+
+
+def clear_cache():
+    with _lock:
+        _html_cache.clear()
+
+
+def _get_context_hash(template_path, context):
+    try:
+        serialized_context = json.dumps(context, sort_keys=True, separators=(',', ':'))
+    except (TypeError, ValueError):
+        return None
+
+    return hashlib.sha1((template_path + serialized_context).encode('utf-8')).hexdigest()
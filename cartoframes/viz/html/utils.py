@@ -1,5 +1,15 @@
 """general utility functions for HTML Map templates"""
 
+import hashlib
+
+from functools import lru_cache
+
+from .. import constants
+from ..source import SourceType
+
+# Length of the ids of the sources shared by the layers
+SOURCE_ID_LENGTH = 16
+
 
 def safe_quotes(text, escape_single_quotes=False):
     """htmlify string"""
@@ -24,3 +34,52 @@ def iframe_size_filter(value):
 
 def clear_none_filter(value):
     return dict(filter(lambda item: item[1] is not None, value.items()))
+
+
+@lru_cache(maxsize=None)
+def get_asset_paths(carto_vl_path=None, airship_path=None):
+    """Paths of the CARTO VL and Airship assets: the CDN ones, or the dev ones of the paths given"""
+    if carto_vl_path is None:
+        paths = {'carto_vl_path': constants.CARTO_VL_URL}
+    else:
+        paths = {'carto_vl_path': carto_vl_path + constants.CARTO_VL_DEV}
+
+    if airship_path is None:
+        paths.update({
+            'airship_components_path': constants.AIRSHIP_COMPONENTS_URL,
+            'airship_bridge_path': constants.AIRSHIP_BRIDGE_URL,
+            'airship_module_path': constants.AIRSHIP_MODULE_URL,
+            'airship_styles_path': constants.AIRSHIP_STYLES_URL,
+            'airship_icons_path': constants.AIRSHIP_ICONS_URL
+        })
+    else:
+        paths.update({
+            'airship_components_path': airship_path + constants.AIRSHIP_COMPONENTS_DEV,
+            'airship_bridge_path': airship_path + constants.AIRSHIP_BRIDGE_DEV,
+            'airship_module_path': airship_path + constants.AIRSHIP_MODULE_DEV,
+            'airship_styles_path': airship_path + constants.AIRSHIP_STYLES_DEV,
+            'airship_icons_path': airship_path + constants.AIRSHIP_ICONS_DEV
+        })
+
+    return paths
+
+
+def get_layer_sources(layers):
+    """Move the local data of the layers to a registry of sources by the hash of their content, so
+    the data shared by several layers, or several maps of a layout, is embedded only once.
+
+    Returns:
+        tuple: the layers, with a `source_id` instead of the data, and the sources by id.
+
+    """
+    sources = {}
+    layer_sources = []
+
+    for layer in layers:
+        if layer.get('type') == SourceType.GEOJSON and isinstance(layer.get('data'), str):
+            source_id = hashlib.sha1(layer['data'].encode('utf-8')).hexdigest()[:SOURCE_ID_LENGTH]
+            sources.setdefault(source_id, layer['data'])
+            layer = dict(layer, data=None, source=None, source_id=source_id)
+        layer_sources.append(layer)
+
+    return layer_sources, sources
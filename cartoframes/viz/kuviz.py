@@ -1,8 +1,10 @@
 import copy
 
+from concurrent.futures import ThreadPoolExecutor
 from warnings import filterwarnings
 from carto.kuvizs import KuvizManager
 
+from .source import SourceType
 from ..data.clients.auth_api_client import AuthAPIClient
 from ..exceptions import PublishError
 from ..utils.logger import log
@@ -11,6 +13,7 @@ from ..utils.utils import get_credentials
 filterwarnings('ignore', category=FutureWarning, module='carto')
 
 DEFAULT_PUBLIC = 'default_public'
+MAX_WORKERS = 8
 
 
 class KuvizPublisher:
@@ -24,16 +27,22 @@ class KuvizPublisher:
         return self._layers
 
     def set_layers(self, layers, maps_api_key=None):
+        public_sources = _get_public_sources(layers)
+
         new_maps_api_key = None
         if maps_api_key is None:
-            new_maps_api_key = self._create_maps_api_keys(layers)
+            new_maps_api_key = self._create_maps_api_keys(layers, public_sources)
 
         self._layers = []
-        for layer in layers:
+        for layer, is_public in zip(layers, public_sources):
+            if layer.source_type == SourceType.MVT:
+                raise PublishError('Layers with local tiles can not be published. Please, upload your data '
+                                   'to CARTO calling `to_carto` and use the table name as the source.')
+
             layer_copy = copy.deepcopy(layer)
 
             if layer_copy.credentials is not None:
-                if layer_copy.source.is_public():
+                if is_public:
                     layer_copy.credentials['api_key'] = maps_api_key or DEFAULT_PUBLIC
                 else:
                     layer_copy.credentials['api_key'] = maps_api_key or new_maps_api_key
@@ -68,8 +77,10 @@ class KuvizPublisher:
             return True
         return False
 
-    def _create_maps_api_keys(self, layers):
-        private_sources = [layer.source for layer in layers if not layer.source.is_public()]
+    def _create_maps_api_keys(self, layers, public_sources=None):
+        if public_sources is None:
+            public_sources = _get_public_sources(layers)
+        private_sources = [layer.source for layer, is_public in zip(layers, public_sources) if not is_public]
 
         if len(private_sources) > 0:
             key_name, key_value, private_tables_names = self._auth_api_client.create_api_key(
@@ -85,6 +96,15 @@ class KuvizPublisher:
         return DEFAULT_PUBLIC
 
 
+def _get_public_sources(layers):
+    # The privacy of each remote source is checked with a query, so they are checked concurrently
+    sources = [layer.source for layer in layers]
+    if sum(not source.is_local() for source in sources) > 1:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(sources))) as executor:
+            return list(executor.map(lambda source: source.is_public(), sources))
+    return [source.is_public() for source in sources]
+
+
 def _create_kuviz(html, name, auth_client, password, if_exists):
     kmanager = _get_kuviz_manager(auth_client)
 
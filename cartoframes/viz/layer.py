@@ -4,6 +4,7 @@ from .legend import Legend
 from .legend_list import LegendList
 from .popup import Popup
 from .popup_list import PopupList
+from .aggregation import DEFAULT_RESOLUTION
 from .source import Source
 from .style import Style
 from .widget import Widget
@@ -56,10 +57,28 @@ class Layer:
         default_popup_click (bool, optional): flag to set the default popup click. This only works when using a
             style helper. Default False.
         title (str, optional): title for the default legend, widget and popups.
-        encode_data (bool, optional): By default, local data is encoded in order to save local space.
+        encode_data (bool or str, optional): By default, local data is encoded in order to save local space.
             However, when using very large files, it might not be possible to encode all the data.
             By disabling this parameter with `encode_data=False` the resulting notebook will be large,
-            but there will be no encoding issues.
+            but there will be no encoding issues. With `encode_data='binary'`, the data is encoded
+            in typed arrays instead of GeoJSON, which is smaller and faster to decode in the browser.
+        tiles (bool, optional): By default, local data is embedded in the map. With `tiles=True`, it is
+            served as vector tiles from a local server instead, to render large DataFrames at interactive
+            speed. The map must be opened in the machine running Python, and it can't be published.
+        precision (int, optional): number of decimals of the coordinates of the local data embedded in
+            the map, to make the data smaller. 6 decimals (about 10 cm) are enough for most maps.
+            Default is None, which keeps the full precision.
+        simplify (str or float, optional): tolerance in degrees to simplify the lines and polygons of the
+            local data embedded in the map, or 'auto' to derive it from the bounds of the data and the size
+            of the map. The simplified geometries look coarse when zooming in further than two levels
+            over the zoom that fits the data: use `tiles=True` to keep the detail at every zoom.
+            Default is None, which keeps all the vertices.
+        aggregate (str, optional): By default, the features of tables and SQL queries are rendered one by
+            one. With `aggregate='quadgrid'` or `aggregate='cluster'`, they are aggregated by the server
+            in a grid of cells for each tile, to render huge tables at interactive speed. The cells have
+            the count of their features in the `_cdb_feature_count` column and the sum or most common
+            value of the columns used by the layer.
+        resolution (int, optional): size of the cells of the aggregation in pixels. Default is 32.
 
 
     Raises:
@@ -88,6 +107,14 @@ class Layer:
         ...     'table_name',
         ...     credentials=Credentials.from_file('creds.json'))
 
+        Create a layer aggregating a huge table in a grid.
+
+        >>> Layer(
+        ...     'table_name',
+        ...     style=color_continuous_style('_cdb_feature_count'),
+        ...     aggregate='quadgrid',
+        ...     resolution=16)
+
     """
     def __init__(self,
                  source,
@@ -105,12 +132,18 @@ class Layer:
                  default_popup_click=False,
                  title=None,
                  parent_map=None,
-                 encode_data=True):
+                 encode_data=True,
+                 tiles=False,
+                 precision=None,
+                 simplify=None,
+                 aggregate=None,
+                 resolution=DEFAULT_RESOLUTION):
 
         self.is_basemap = False
         self.default_legend = default_legend
-        self.source = _set_source(source, credentials, geom_col, encode_data)
-        self.style = _set_style(style)
+        self.source = _set_source(source, credentials, geom_col, encode_data, tiles, precision, simplify,
+                                  aggregate, resolution)
+        self.style = _set_style(style).precompute_breaks(self.source)
         self.encode_data = encode_data
         self.parent_map = None
         self.geom_type = self.source.get_geom_type()
@@ -129,7 +162,6 @@ class Layer:
 
         self.source.compute_metadata(viz_columns)
         self.source_type = self.source.type
-        self.source_data = self.source.data
         self.bounds = bounds or self.source.bounds
         self.credentials = self.source.get_credentials()
         self.interactivity = self.popups.get_interactivity()
@@ -187,6 +219,11 @@ class Layer:
 
         return {}
 
+    @property
+    def source_data(self):
+        """Data of the source, serialized the first time it is needed"""
+        return self.source.data
+
     def get_layer_def(self):
         return {
             'credentials': self.credentials,
@@ -232,9 +269,10 @@ class Layer:
             self.legends_info = self.legends.get_info() if self.legends is not None else None
 
 
-def _set_source(source, credentials, geom_col, encode_data):
+def _set_source(source, credentials, geom_col, encode_data, tiles=False, precision=None,
+                simplify=None, aggregate=None, resolution=DEFAULT_RESOLUTION):
     if isinstance(source, (str, pandas.DataFrame)):
-        return Source(source, credentials, geom_col, encode_data)
+        return Source(source, credentials, geom_col, encode_data, tiles, precision, simplify, aggregate, resolution)
     elif isinstance(source, Source):
         return source
     else:
@@ -0,0 +1,347 @@
+import os
+import math
+import struct
+import threading
+
+from collections import OrderedDict
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+from shapely.affinity import affine_transform
+from shapely.geometry import box
+from shapely.ops import clip_by_rect
+
+from ..utils.spatial_index import SpatialIndex
+
+EXTENT = 4096
+BUFFER = 64
+DEFAULT_MAX_ZOOM = 16
+# Number of encoded tiles kept in memory by each pyramid
+DEFAULT_MAX_TILES = 512
+LAYER_NAME = 'layer0'
+ID_PROPERTY = 'cartodb_id'
+
+# Half of the side of the Web Mercator world (EPSG:3857)
+MERCATOR_ORIGIN = 20037508.342789244
+
+# Geometry types and commands of the Mapbox Vector Tile specification 2.1
+_POINT, _LINESTRING, _POLYGON = 1, 2, 3
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+_GEOM_TYPES = {
+    'Point': _POINT,
+    'MultiPoint': _POINT,
+    'LineString': _LINESTRING,
+    'MultiLineString': _LINESTRING,
+    'Polygon': _POLYGON,
+    'MultiPolygon': _POLYGON
+}
+
+
+class TilePyramid:
+    """Vector tiles of a GeoDataFrame, encoded on demand as Mapbox Vector Tiles.
+
+    The geometries are projected to Web Mercator and indexed once. Each tile takes the features
+    intersecting its bounds from the index, clips them with a buffer, transforms them to the tile
+    coordinates and encodes them in a single layer. The last encoded tiles are cached.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): the data to tile, with WGS 84 (EPSG:4326) coordinates.
+        max_zoom (int, optional): the maximum zoom of the tiles. Default is 16.
+        extent (int, optional): size of the tiles in tile coordinates. Default is 4096.
+        buffer (int, optional): size of the buffer around the tiles in tile coordinates. Default is 64.
+        max_tiles (int, optional): number of encoded tiles cached. Default is 512.
+
+    """
+    def __init__(self, gdf, max_zoom=DEFAULT_MAX_ZOOM, extent=EXTENT, buffer=BUFFER, max_tiles=DEFAULT_MAX_TILES):
+        self.max_zoom = max_zoom
+        self.extent = extent
+        self.buffer = buffer
+        self.max_tiles = max_tiles
+
+        geometries = gdf.geometry
+        if geometries.crs is None:
+            # GeoSeries.set_crs is not available in all the supported versions of geopandas
+            geometries = geometries.copy()
+            geometries.crs = 'epsg:4326'
+        self.geometries = geometries.to_crs('epsg:3857').values
+
+        self.properties = _get_properties(gdf)
+        self.metadata = {
+            'idProperty': ID_PROPERTY,
+            'properties': {name: {'type': property_type} for name, (property_type, _) in self.properties.items()}
+        }
+
+        self._index = SpatialIndex(self.geometries)
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_tile(self, z, x, y):
+        """Return the encoded tile of the zoom and coordinates given."""
+        key = (z, x, y)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+
+        tile = self._encode(z, x, y)
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def write(self, directory, min_zoom=0, max_zoom=None):
+        """Write the tiles with features up to a zoom in a `{z}/{x}/{y}.mvt` directory tree.
+
+        Returns:
+            int: the number of tiles written.
+
+        """
+        max_zoom = self.max_zoom if max_zoom is None else max_zoom
+        count = 0
+
+        for z in range(min_zoom, max_zoom + 1):
+            for x, y in self._tiles_with_features(z):
+                tile_directory = os.path.join(directory, str(z), str(x))
+                if not os.path.exists(tile_directory):
+                    os.makedirs(tile_directory)
+
+                with open(os.path.join(tile_directory, '{}.mvt'.format(y)), 'wb') as tile_file:
+                    tile_file.write(self.get_tile(z, x, y))
+                count += 1
+
+        return count
+
+    def _tiles_with_features(self, z):
+        size = _tile_size(z)
+        last = 2 ** z - 1
+        tiles = set()
+
+        for geom in self.geometries:
+            if geom is None or geom.is_empty:
+                continue
+            minx, miny, maxx, maxy = geom.bounds
+            x0, x1 = _clamp((minx + MERCATOR_ORIGIN) // size, last), _clamp((maxx + MERCATOR_ORIGIN) // size, last)
+            y0, y1 = _clamp((MERCATOR_ORIGIN - maxy) // size, last), _clamp((MERCATOR_ORIGIN - miny) // size, last)
+            tiles.update((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+
+        return sorted(tiles)
+
+    def _encode(self, z, x, y):
+        size = _tile_size(z)
+        minx = -MERCATOR_ORIGIN + x * size
+        maxy = MERCATOR_ORIGIN - y * size
+        scale = self.extent / size
+        margin = self.buffer / scale
+        clip_bounds = (minx - margin, maxy - size - margin, minx + size + margin, maxy + margin)
+
+        _, positions = self._index.query([box(*clip_bounds)], predicate=None)
+
+        features = []
+        for position in positions:
+            geom = _clip(self.geometries[position], clip_bounds)
+            if geom is None:
+                continue
+
+            geom = affine_transform(geom, [scale, 0, 0, -scale, -minx * scale, maxy * scale])
+            if geom.geom_type not in ('Point', 'MultiPoint'):
+                geom = geom.simplify(1)
+
+            geom_type, commands = _encode_geometry(geom)
+            if commands:
+                features.append((int(position) + 1, geom_type, commands, self._feature_properties(position)))
+
+        return _encode_tile(LAYER_NAME, features, self.extent)
+
+    def _feature_properties(self, position):
+        properties = []
+        for name, (property_type, values) in self.properties.items():
+            value = values[position]
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            properties.append((name, float(value) if property_type == 'number' else str(value)))
+        return properties
+
+
+def _get_properties(gdf):
+    """Values of the columns by name, as CARTO VL `number` or `category` properties."""
+    properties = {}
+
+    for name in gdf.columns:
+        if name == gdf.geometry.name:
+            continue
+        column = gdf[name]
+        if is_numeric_dtype(column) and not is_bool_dtype(column):
+            properties[name] = ('number', column.values.astype(float))
+        else:
+            properties[name] = ('category', column.astype(object).values)
+
+    if ID_PROPERTY not in properties:
+        properties[ID_PROPERTY] = ('number', [float(position) for position in range(1, len(gdf) + 1)])
+
+    return properties
+
+
+def _tile_size(z):
+    return 2 * MERCATOR_ORIGIN / 2 ** z
+
+
+def _clamp(value, last):
+    return int(min(max(value, 0), last))
+
+
+def _clip(geom, bounds):
+    if geom is None or geom.is_empty:
+        return None
+
+    minx, miny, maxx, maxy = bounds
+    gminx, gminy, gmaxx, gmaxy = geom.bounds
+    if gminx > maxx or gmaxx < minx or gminy > maxy or gmaxy < miny:
+        return None
+
+    contained = minx <= gminx and gmaxx <= maxx and miny <= gminy and gmaxy <= maxy
+    if contained or geom.geom_type in ('Point', 'MultiPoint'):
+        return geom
+
+    clipped = clip_by_rect(geom, *bounds)
+    return None if clipped.is_empty else clipped
+
+
+def _encode_geometry(geom):
+    """Return the type and the commands of a geometry in tile coordinates."""
+    geom_type = _GEOM_TYPES.get(geom.geom_type)
+    parts = list(geom.geoms) if hasattr(geom, 'geoms') else [geom]
+    commands = []
+    cursor = [0, 0]
+
+    if geom_type == _POINT:
+        points = [_round(point.coords[0]) for point in parts if not point.is_empty]
+        commands = _path(points, cursor, _MOVE_TO, len(points)) if points else []
+    elif geom_type == _LINESTRING:
+        for line in parts:
+            points = _dedupe([_round(coord) for coord in line.coords])
+            if len(points) >= 2:
+                commands += _line(points, cursor)
+    elif geom_type == _POLYGON:
+        for polygon in parts:
+            if polygon.geom_type != 'Polygon' or polygon.is_empty:
+                continue
+            exterior = _ring(polygon.exterior, interior=False)
+            if exterior is None:
+                continue
+            commands += _line(exterior, cursor) + [_command(_CLOSE_PATH, 1)]
+            for interior in polygon.interiors:
+                ring = _ring(interior, interior=True)
+                if ring is not None:
+                    commands += _line(ring, cursor) + [_command(_CLOSE_PATH, 1)]
+
+    return geom_type, commands
+
+
+def _ring(ring, interior):
+    """Return the points of a ring without the closing one, with a positive area for exterior rings and a
+    negative one for interior rings (clockwise and counterclockwise with the Y axis pointing down), as the
+    specification requires. Rings without area are discarded.
+    """
+    points = _dedupe([_round(coord) for coord in ring.coords[:-1]])
+    if len(points) > 1 and points[0] == points[-1]:
+        points = points[:-1]
+    if len(points) < 3:
+        return None
+
+    area = sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]))
+    if area == 0:
+        return None
+    if (area < 0) != interior:
+        points = points[:1] + points[:0:-1]
+    return points
+
+
+def _line(points, cursor):
+    return _path(points[:1], cursor, _MOVE_TO, 1) + _path(points[1:], cursor, _LINE_TO, len(points) - 1)
+
+
+def _path(points, cursor, command, count):
+    commands = [_command(command, count)]
+    for x, y in points:
+        commands += [_zigzag(x - cursor[0]), _zigzag(y - cursor[1])]
+        cursor[0], cursor[1] = x, y
+    return commands
+
+
+def _round(coord):
+    return int(round(coord[0])), int(round(coord[1]))
+
+
+def _dedupe(points):
+    return [point for i, point in enumerate(points) if i == 0 or point != points[i - 1]]
+
+
+def _command(command, count):
+    return (command & 0x7) | (count << 3)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 31)
+
+
+def _encode_tile(name, features, extent):
+    """Encode the features in a tile with a single layer, as a Protocol Buffers message."""
+    keys = {}
+    values = {}
+    encoded_features = []
+
+    for feature_id, geom_type, commands, properties in features:
+        tags = []
+        for key, value in properties:
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(value, len(values)))
+
+        encoded_features.append(
+            _varint_field(1, feature_id) +
+            _bytes_field(2, _packed(tags)) +
+            _varint_field(3, geom_type) +
+            _bytes_field(4, _packed(commands))
+        )
+
+    layer = _varint_field(15, 2) + _bytes_field(1, name.encode('utf-8'))
+    layer += b''.join(_bytes_field(2, feature) for feature in encoded_features)
+    layer += b''.join(_bytes_field(3, key.encode('utf-8')) for key in keys)
+    layer += b''.join(_bytes_field(4, _encode_value(value)) for value in values)
+    layer += _varint_field(5, extent)
+
+    return _bytes_field(3, layer)
+
+
+def _encode_value(value):
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack('<d', value)
+    return _bytes_field(1, value.encode('utf-8'))
+
+
+def _packed(values):
+    return b''.join(_varint(value) for value in values)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _varint_field(field, value):
+    return _key(field, 0) + _varint(value)
+
+
+def _bytes_field(field, value):
+    return _key(field, 2) + _varint(len(value)) + value
+
+
+def _varint(value):
+    encoded = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            encoded.append(byte | 0x80)
+        else:
+            encoded.append(byte)
+            return bytes(encoded)
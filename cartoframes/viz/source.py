@@ -1,13 +1,45 @@
+import json
+import math
+import time
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 from pandas import DataFrame
 from geopandas import GeoDataFrame
 
+from .aggregation import DEFAULT_RESOLUTION, check_aggregation, get_aggregation_geom_type, get_aggregation_query
+from .constants import DEFAULT_MAP_SIZE
+from .mvt import TilePyramid
+from .stats import compute_breaks, get_breaks_query, read_breaks
+from .tile_server import get_tile_server
 from ..io.managers.context_manager import ContextManager
-from ..utils.geom_utils import is_reprojection_needed, reproject, has_geometry, set_geometry
-from ..utils.utils import get_geodataframe_data, get_geodataframe_bounds, \
-                          get_geodataframe_geom_type, get_datetime_column_names
+from ..utils.geom_utils import is_reprojection_needed, reproject, has_geometry, set_geometry, \
+                               quantize_geometries, simplify_geometries
+from ..utils.logger import log
+from ..utils.utils import get_geodataframe_data, get_geodataframe_bounds, get_geodataframe_hash, \
+                          get_geodataframe_geom_type, get_datetime_column_names, plan_geodataframe_data
 
 RFC_2822_DATETIME_FORMAT = "%a, %d %b %Y %T %z"
 
+# The automatic simplification keeps the detail visible up to this number of zoom levels
+# over the zoom that fits the bounds of the data
+SIMPLIFY_ZOOM_LEVELS = 2
+
+# Number of serialized local sources kept in memory
+DATA_CACHE_SIZE = 8
+# Seconds the geometry type and bounds of the remote sources are reused
+REMOTE_METADATA_TTL = 300
+
+# Breaks of the remote sources by credentials, query, column, method and bins
+_breaks_cache = {}
+# Serialized data of the local sources by content hash and serialization options
+_data_cache = OrderedDict()
+# Timestamp and value of the metadata of the remote sources by name, credentials and query
+_remote_metadata_cache = {}
+_cache_lock = threading.Lock()
+
 VALID_GEOMETRY_TYPES = [
     {'Point'},
     {'MultiPoint'},
@@ -23,6 +55,7 @@ VALID_GEOMETRY_TYPES = [
 class SourceType:
     QUERY = 'Query'
     GEOJSON = 'GeoJSON'
+    MVT = 'MVT'
 
 
 class Source:
@@ -35,8 +68,29 @@ class Source:
             A Credentials instance. If not provided, the credentials will be automatically
             obtained from the default credentials if available.
         geom_col (str, optional): string indicating the geometry column name in the source `DataFrame`.
-        encode_data (bool, optional): Indicates whether the data needs to be encoded.
-            Default is True.
+        encode_data (bool or str, optional): Indicates whether the data needs to be encoded.
+            With 'binary', the data is encoded in typed arrays instead of GeoJSON, which is smaller
+            and faster to decode in the browser. Default is True.
+        tiles (bool, optional): Indicates whether a DataFrame is served as vector tiles from a local
+            server instead of being embedded in the map. The tiles are encoded as they are requested,
+            so large DataFrames are rendered at interactive speed. The map must be opened in the
+            machine running Python. Default is False.
+        precision (int, optional): number of decimals of the coordinates of the local data embedded in
+            the map, to make the data smaller. 6 decimals (about 10 cm) are enough for most maps.
+            Default is None, which keeps the full precision.
+        simplify (str or float, optional): tolerance in degrees to simplify the lines and polygons of the
+            local data embedded in the map, preserving their topology. With 'auto', the tolerance is the
+            size of a pixel two zoom levels over the zoom that fits the bounds of the data in the map, so
+            the geometries look coarse when zooming in further. Use `tiles=True` to render the detail
+            of the geometries at every zoom. Default is None, which keeps all the vertices.
+        aggregate (str, optional): aggregation of the features of a table or SQL query in a grid
+            computed by the server for each tile: 'quadgrid' to render the cells of the grid or 'cluster'
+            to render a point in the average position of the features of each cell. Each cell has the
+            count of its features in the `_cdb_feature_count` column, the sum of the numeric columns
+            used by the layer and the most common value of the rest of columns used by the layer.
+            Default is None.
+        resolution (int, optional): size of the cells of the aggregation in pixels. Powers of two
+            align the cells with the tiles. Default is 32.
 
     Example:
 
@@ -56,15 +110,37 @@ class Source:
 
         >>> Source(gdf)
 
+        Large GeoDataFrame object as local vector tiles.
+
+        >>> Source(gdf, tiles=True)
+
+        Huge table aggregated in a grid.
+
+        >>> Source('table_name', aggregate='quadgrid', resolution=16)
+
         Setting the credentials.
 
         >>> Source('table_name', credentials)
 
     """
-    def __init__(self, source, credentials=None, geom_col=None, encode_data=True):
+    def __init__(self, source, credentials=None, geom_col=None, encode_data=True, tiles=False,
+                 precision=None, simplify=None, aggregate=None, resolution=DEFAULT_RESOLUTION):
         self.credentials = None
         self.datetime_column_names = None
         self.encode_data = encode_data
+        self.precision = precision
+        self.simplify = simplify
+        self.aggregate = aggregate
+        self.resolution = resolution
+        self.bounds = None
+        self._data = None
+        self._breaks_cache = {}
+
+        if aggregate is not None:
+            if not isinstance(source, str):
+                raise ValueError('Aggregations are computed by the server, so they are only available '
+                                 'for tables and SQL queries.')
+            check_aggregation(aggregate, resolution)
 
         if isinstance(source, str):
             # Table, SQL query
@@ -78,7 +154,7 @@ class Source:
                     source = reproject(source)
 
             # DataFrame, GeoDataFrame
-            self.type = SourceType.GEOJSON
+            self.type = SourceType.MVT if tiles else SourceType.GEOJSON
             self.gdf = GeoDataFrame(source, copy=True)
             self.set_datetime_columns()
 
@@ -115,11 +191,11 @@ class Source:
                     'api_key': self.credentials.api_key,
                     'base_url': self.credentials.base_url
                 }
-        elif self.type == SourceType.GEOJSON:
+        elif self.is_local():
             return None
 
     def set_datetime_columns(self):
-        if self.type == SourceType.GEOJSON:
+        if self.is_local():
             self.datetime_column_names = get_datetime_column_names(self.gdf)
 
             if self.datetime_column_names:
@@ -131,38 +207,192 @@ class Source:
 
     def get_geom_type(self):
         if self.type == SourceType.QUERY:
-            return self.manager.get_geom_type(self.query) or 'point'
-        elif self.type == SourceType.GEOJSON:
+            if self.aggregate is not None:
+                return get_aggregation_geom_type(self.aggregate)
+            return self._get_remote_metadata('geom_type') or 'point'
+        elif self.is_local():
             return get_geodataframe_geom_type(self.gdf)
 
+    @property
+    def data(self):
+        """Data of the source in the map: the query of tables and SQL queries, or the serialized data
+        or vector tiles of DataFrames. DataFrames are serialized the first time their data is needed."""
+        if self._data is None and self.is_local():
+            self._data = self._get_local_data()
+        return self._data
+
     def compute_metadata(self, columns=None):
         if self.type == SourceType.QUERY:
-            self.data = self.query
-            self.bounds = self.manager.get_bounds(self.query)
-        elif self.type == SourceType.GEOJSON:
-            if columns is not None:
-                columns += [self.gdf.geometry.name]
-                self.gdf = self.gdf[columns]
-            self.data = get_geodataframe_data(self.gdf, self.encode_data)
+            self._data = self.query if self.aggregate is None else self._get_aggregation_query(columns)
+            self.bounds = self._get_remote_metadata('bounds')
+        elif self.is_local():
+            self.gdf = plan_geodataframe_data(self.gdf, columns)
             self.bounds = get_geodataframe_bounds(self.gdf)
+            self._data = None
+
+    def _get_local_data(self):
+        """Serialize the data, or reuse the serialization of a DataFrame with the same content."""
+        content_hash = get_geodataframe_hash(self.gdf)
+        key = (content_hash, self.type, self.encode_data, self.precision, self.simplify)
+
+        if content_hash is not None:
+            with _cache_lock:
+                if key in _data_cache and _is_served(_data_cache[key]):
+                    log.debug('Reusing the serialized data of the source %s', content_hash)
+                    _data_cache.move_to_end(key)
+                    return _data_cache[key]
+
+        if self.type == SourceType.MVT:
+            data = _get_tiles_data(self.gdf)
+        else:
+            data = get_geodataframe_data(self._reduce_geometries(), self.encode_data, self.precision)
+
+        if content_hash is not None:
+            with _cache_lock:
+                _data_cache[key] = data
+                if len(_data_cache) > DATA_CACHE_SIZE:
+                    _data_cache.popitem(last=False)
+
+        return data
+
+    def _get_remote_metadata(self, name):
+        """Return a metadata of the query computed recently for the same credentials and query, or
+        compute it. The rest of the metadata of the source not computed yet are computed at the same
+        time, in parallel, so the geometry type and the bounds cost a single round-trip."""
+        computes = {'bounds': self.manager.get_bounds}
+        if self.aggregate is None:
+            computes['geom_type'] = self.manager.get_geom_type
+        keys = {metadata: (metadata, self.credentials.base_url, self.credentials.api_key, self.query)
+                for metadata in computes}
+
+        values = {}
+        with _cache_lock:
+            for metadata, key in keys.items():
+                timestamp, value = _remote_metadata_cache.get(key, (None, None))
+                if timestamp is not None and time.time() - timestamp < REMOTE_METADATA_TTL:
+                    values[metadata] = value
+        if name in values:
+            return values[name]
+
+        missing = [metadata for metadata in computes if metadata not in values]
+        with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+            futures = [executor.submit(computes[metadata], self.query) for metadata in missing]
+            computed = [future.result() for future in futures]
+
+        with _cache_lock:
+            for metadata, value in zip(missing, computed):
+                _remote_metadata_cache[keys[metadata]] = (time.time(), value)
+                values[metadata] = value
+        return values[name]
+
+    def compute_breaks(self, column, method, bins):
+        """Return the breaks of the bins of a column computed from the data of the source, or None if
+        they can't be computed. They are cached by source and column.
+
+        Args:
+            column (str): the column to classify.
+            method (str): classification method: "quantiles", "equal" or "stdev".
+            bins (int): number of bins.
+
+        Returns:
+            list
+
+        """
+        if self.type == SourceType.QUERY:
+            if self.aggregate is not None:
+                log.debug('The breaks of aggregated sources depend on the zoom, they are computed in the map')
+                return None
+            cache, key = _breaks_cache, (self.credentials.base_url, self.query, column, method, bins)
+        else:
+            cache, key = self._breaks_cache, (column, method, bins)
+
+        if key not in cache:
+            cache[key] = self._compute_breaks(column, method, bins)
+        return cache[key]
+
+    def _compute_breaks(self, column, method, bins):
+        if self.type == SourceType.QUERY:
+            response = self.manager.execute_query(get_breaks_query(self.query, column, method, bins), do_post=False)
+            rows = response.get('rows') if response else None
+            return read_breaks(rows[0], method, bins) if rows else None
+        else:
+            return compute_breaks(self.gdf[column].values, method, bins)
+
+    def _get_aggregation_query(self, columns):
+        """Return the query aggregating the features with the columns given."""
+        numeric_columns = self.manager.get_numeric_column_names(self.query) if columns else []
+        return get_aggregation_query(self.query, self.aggregate, self.resolution, columns, numeric_columns)
+
+    def _reduce_geometries(self):
+        """Return the data with the geometries simplified and quantized to be embedded in the map."""
+        tolerance = self.simplify
+        if tolerance == 'auto':
+            tolerance = _get_simplify_tolerance(self.bounds or get_geodataframe_bounds(self.gdf))
+
+        if not tolerance and self.precision is None:
+            return self.gdf
+
+        gdf = self.gdf.copy()
+        geometries = gdf.geometry
+        if tolerance:
+            geometries = simplify_geometries(geometries, tolerance)
+        if self.precision is not None:
+            geometries = quantize_geometries(geometries, self.precision)
+        gdf[gdf.geometry.name] = geometries
+
+        log.debug('Local data simplified with tolerance %s and %s decimals', tolerance, self.precision)
+        return gdf
 
     def is_local(self):
-        return self.type == SourceType.GEOJSON
+        return self.type in (SourceType.GEOJSON, SourceType.MVT)
 
     def is_public(self):
         if self.type == SourceType.QUERY:
             return self.manager.is_public(self.query)
-        elif self.type == SourceType.GEOJSON:
+        elif self.is_local():
             return True
 
     def schema(self):
         if self.type == SourceType.QUERY:
             return self.manager.get_schema()
-        elif self.type == SourceType.GEOJSON:
+        elif self.is_local():
             return None
 
     def get_table_names(self):
         if self.type == SourceType.QUERY:
             return self.manager.get_table_names(self.query)
-        elif self.type == SourceType.GEOJSON:
+        elif self.is_local():
             return []
+
+
+def clear_cache():
+    """Clear the breaks, serialized data and metadata of the sources kept in memory."""
+    with _cache_lock:
+        _breaks_cache.clear()
+        _data_cache.clear()
+        _remote_metadata_cache.clear()
+
+
+def _get_simplify_tolerance(bounds, size=DEFAULT_MAP_SIZE):
+    """Size in degrees of a pixel some zoom levels over the zoom that fits the bounds in a map."""
+    (west, south), (east, north) = bounds
+    pixel_size = max((east - west) / size[0], (north - south) / size[1])
+    if not math.isfinite(pixel_size):
+        # No geometries
+        return None
+    return pixel_size / 2 ** SIMPLIFY_ZOOM_LEVELS
+
+
+def _is_served(data):
+    """Whether the tiles of serialized data are still served, if it is the data of vector tiles."""
+    return not isinstance(data, dict) or get_tile_server().is_registered(data['file'])
+
+
+def _get_tiles_data(gdf):
+    """Serve the GeoDataFrame as vector tiles and return the URL template and the metadata of the tiles."""
+    pyramid = TilePyramid(gdf)
+    return {
+        'file': get_tile_server().register(pyramid),
+        'metadata': json.dumps(pyramid.metadata),
+        'options': {'maxZoom': pyramid.max_zoom}
+    }
@@ -0,0 +1,82 @@
+import math
+import numpy as np
+
+from ..utils.utils import double_quote
+
+BREAKS_METHODS = ['quantiles', 'equal', 'stdev']
+
+
+def compute_breaks(values, method, bins):
+    """Return the breaks of the bins of the values computed as the CARTO VL classifiers
+    `globalQuantiles`, `globalEqIntervals` and `globalStandardDev`, or None if there are no values.
+    """
+    values = np.asarray(values, dtype='float64')
+    values = values[~np.isnan(values)]
+
+    if values.size == 0:
+        return None
+
+    if method == 'quantiles':
+        return _percentile_disc(np.sort(values), _fractions(bins))
+    elif method == 'equal':
+        return _equal_intervals_breaks(values.min(), values.max(), bins)
+    elif method == 'stdev':
+        stdev = values.std(ddof=1) if values.size > 1 else 0
+        return _standard_deviation_breaks(values.mean(), stdev, bins)
+
+
+def get_breaks_query(query, column, method, bins):
+    """Return the query of the statistics of a column of a query needed to compute the breaks."""
+    column = double_quote(column)
+
+    if method == 'quantiles':
+        aggregates = 'percentile_disc(ARRAY[{}]) WITHIN GROUP (ORDER BY {}) AS breaks'.format(
+            ', '.join(str(fraction) for fraction in _fractions(bins)), column)
+    elif method == 'equal':
+        aggregates = 'min({0}) AS min, max({0}) AS max'.format(column)
+    elif method == 'stdev':
+        aggregates = 'avg({0}) AS avg, stddev_samp({0}) AS stdev'.format(column)
+
+    return 'SELECT {aggregates} FROM ({query}) _q WHERE {column} IS NOT NULL'.format(
+        aggregates=aggregates, query=query, column=column)
+
+
+def read_breaks(row, method, bins):
+    """Return the breaks from the result of the query of the statistics, or None if there are no values."""
+    if method == 'quantiles':
+        return _to_list(row['breaks']) if row.get('breaks') else None
+    elif method == 'equal':
+        return _equal_intervals_breaks(row['min'], row['max'], bins) if row.get('min') is not None else None
+    elif method == 'stdev':
+        return _standard_deviation_breaks(row['avg'], row.get('stdev') or 0, bins) \
+            if row.get('avg') is not None else None
+
+
+def _fractions(bins):
+    return [i / bins for i in range(1, bins)]
+
+
+def _percentile_disc(sorted_values, fractions):
+    """Same as percentile_disc in PostgreSQL: the first value whose position in the sorted values is
+    greater than or equal to each fraction."""
+    count = sorted_values.size
+    return _to_list(sorted_values[max(math.ceil(fraction * count) - 1, 0)] for fraction in fractions)
+
+
+def _equal_intervals_breaks(min_value, max_value, bins):
+    return _to_list(min_value + (max_value - min_value) * np.array(_fractions(bins)))
+
+
+def _standard_deviation_breaks(avg, stdev, bins):
+    """Breaks around the average every standard deviation: centered in the average for an even
+    number of bins, and in the central bin for an odd number of bins.
+    """
+    if bins % 2 == 0:
+        offsets = np.arange(-(bins // 2) + 1, bins // 2)
+    else:
+        offsets = np.arange(-(bins // 2), bins // 2) + 0.5
+    return _to_list(avg + offsets * stdev)
+
+
+def _to_list(values):
+    return [float(value) for value in values]
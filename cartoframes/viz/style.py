@@ -6,13 +6,14 @@ class Style:
 
     def __init__(self, data=None, value=None,
                  default_legend=None, default_widget=None,
-                 default_popup_hover=None, default_popup_click=None):
+                 default_popup_hover=None, default_popup_click=None, precompute=None):
         self._style = self._init_style(data=data)
         self._value = value
         self._default_legend = default_legend
         self._default_widget = default_widget
         self._default_popup_hover = default_popup_hover
         self._default_popup_click = default_popup_click
+        self._precompute = precompute
 
     def _init_style(self, data):
         if data is None:
@@ -42,6 +43,18 @@ class Style:
     def default_popup_click(self):
         return self._default_popup_click
 
+    def precompute_breaks(self, source):
+        """Return the style with the breaks computed from the data of the source, if it
+        requires precomputed breaks and they can be computed, or the same style otherwise."""
+        if self._precompute is None:
+            return self
+
+        breaks = source.compute_breaks(self._value, self._precompute['method'], self._precompute['bins'])
+        if breaks is None:
+            return self
+
+        return self._precompute['style'](breaks)
+
     def compute_viz(self, geom_type, variables={}):
         style = self._style
         default_style = defaults.STYLE[geom_type]
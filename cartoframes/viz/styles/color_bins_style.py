@@ -1,4 +1,4 @@
-from .utils import serialize_palette, get_value, prop
+from .utils import get_precompute, serialize_palette, get_value, prop
 from ..style import Style
 from ..legends import color_bins_legend
 from ..widgets import histogram_widget
@@ -6,7 +6,7 @@ from ..popups import popup_element
 
 
 def color_bins_style(value, method='quantiles', bins=5, breaks=None, palette=None, size=None,
-                     opacity=None, stroke_color=None, stroke_width=None, animate=None):
+                     opacity=None, stroke_color=None, stroke_width=None, animate=None, precompute=False):
     """Helper function for quickly creating a color bins style.
 
     Args:
@@ -25,6 +25,9 @@ def color_bins_style(value, method='quantiles', bins=5, breaks=None, palette=Non
             Default is '#222'.
         stroke_width (int, optional): Size of the stroke on point features.
         animate (str, optional): Animate features by date/time or other numeric field.
+        precompute (bool, optional): Compute the breaks of the classification method from the data
+            of the layer, in Python for DataFrames and with a single query for tables and SQL queries,
+            instead of in the browser. The breaks are cached by source and column. Default is False.
 
     Returns:
         cartoframes.viz.style.Style
@@ -87,5 +90,8 @@ def color_bins_style(value, method='quantiles', bins=5, breaks=None, palette=Non
         default_legend=color_bins_legend(title=value),
         default_widget=histogram_widget(value, title=value),
         default_popup_hover=popup_element(value, title=value),
-        default_popup_click=popup_element(value, title=value)
+        default_popup_click=popup_element(value, title=value),
+        precompute=get_precompute(precompute and breaks is None, method, bins, lambda breaks: color_bins_style(
+            value, method, bins, breaks, palette or default_palette, size, opacity, stroke_color,
+            stroke_width, animate))
     )
@@ -1,4 +1,4 @@
-from .utils import get_value, prop
+from .utils import get_precompute, get_value, prop
 from ..style import Style
 from ..legends import size_bins_legend
 from ..widgets import histogram_widget
@@ -6,7 +6,7 @@ from ..popups import popup_element
 
 
 def size_bins_style(value, method='quantiles', bins=5, breaks=None, size_range=None, color=None,
-                    opacity=None, stroke_width=None, stroke_color=None, animate=None):
+                    opacity=None, stroke_width=None, stroke_color=None, animate=None, precompute=False):
     """Helper function for quickly creating a size bind style with
     classification method/buckets.
 
@@ -26,6 +26,9 @@ def size_bins_style(value, method='quantiles', bins=5, breaks=None, size_range=N
             Default is '#222'.
         stroke_width (int, optional): Size of the stroke on point features.
         animate (str, optional): Animate features by date/time or other numeric field.
+        precompute (bool, optional): Compute the breaks of the classification method from the data
+            of the layer, in Python for DataFrames and with a single query for tables and SQL queries,
+            instead of in the browser. The breaks are cached by source and column. Default is False.
 
     Returns:
         cartoframes.viz.style.Style
@@ -73,5 +76,7 @@ def size_bins_style(value, method='quantiles', bins=5, breaks=None, size_range=N
         default_legend=size_bins_legend(title=value),
         default_widget=histogram_widget(value, title=value),
         default_popup_hover=popup_element(value, title=value),
-        default_popup_click=popup_element(value, title=value)
+        default_popup_click=popup_element(value, title=value),
+        precompute=get_precompute(precompute and breaks is None, method, bins, lambda breaks: size_bins_style(
+            value, method, bins, breaks, size_range, color, opacity, stroke_width, stroke_color, animate))
     )
@@ -20,3 +20,9 @@ def prop(value):
         return 'prop("{}")'.format(value)
     else:
         return "prop('{}')".format(value)
+
+
+def get_precompute(precompute, method, bins, style):
+    """Return the definition of the breaks to precompute for a style, or None."""
+    if precompute:
+        return {'method': method, 'bins': bins, 'style': style}
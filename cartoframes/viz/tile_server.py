@@ -0,0 +1,122 @@
+import re
+import uuid
+import threading
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from ..utils.logger import log
+
+DEFAULT_HOST = '127.0.0.1'
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+# Number of pyramids served at the same time
+DEFAULT_MAX_PYRAMIDS = 8
+
+_TILE_PATH = re.compile(r'^/(?P<pyramid_id>\w+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.mvt$')
+
+_tile_server = None
+_tile_server_lock = threading.Lock()
+
+
+class TileServer:
+    """Local HTTP server of the vector tiles of the local layers, running in a background thread.
+
+    The tiles of each registered :py:class:`TilePyramid <cartoframes.viz.mvt.TilePyramid>` are
+    served at `http://{host}:{port}/{id}/{z}/{x}/{y}.mvt`. The maps must be opened in the machine
+    running Python to reach the server. Only the last pyramids registered or requested are served,
+    so the maps of older layers stop rendering their tiles.
+
+    Args:
+        host (str, optional): the host to bind. Default is `127.0.0.1`.
+        port (int, optional): the port to bind. Default is any free port.
+        max_pyramids (int, optional): number of pyramids served at the same time. Default is 8.
+
+    """
+    def __init__(self, host=DEFAULT_HOST, port=0, max_pyramids=DEFAULT_MAX_PYRAMIDS):
+        self.pyramids = OrderedDict()
+        self.max_pyramids = max_pyramids
+        self._lock = threading.Lock()
+        self._server = _ThreadingHTTPServer((host, port), _TileRequestHandler)
+        self._server.tile_server = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        log.debug('Tile server started at %s', self.url)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def register(self, pyramid):
+        """Serve the tiles of a pyramid and return the URL template of its tiles. The least recently
+        used pyramid is unregistered when there are more than `max_pyramids`."""
+        pyramid_id = uuid.uuid4().hex
+        with self._lock:
+            self.pyramids[pyramid_id] = pyramid
+            while len(self.pyramids) > self.max_pyramids:
+                self.pyramids.popitem(last=False)
+        return '{}/{}/{{z}}/{{x}}/{{y}}.mvt'.format(self.url, pyramid_id)
+
+    def unregister(self, url):
+        """Stop serving the tiles of the URL template returned by `register`."""
+        with self._lock:
+            self.pyramids.pop(self._get_pyramid_id(url), None)
+
+    def is_registered(self, url):
+        with self._lock:
+            return self._get_pyramid_id(url) in self.pyramids
+
+    def get_pyramid(self, pyramid_id):
+        with self._lock:
+            pyramid = self.pyramids.get(pyramid_id)
+            if pyramid is not None:
+                self.pyramids.move_to_end(pyramid_id)
+            return pyramid
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _get_pyramid_id(self, url):
+        return url[len(self.url):].split('/')[1] if url.startswith(self.url + '/') else None
+
+
+def get_tile_server():
+    global _tile_server
+    with _tile_server_lock:
+        if _tile_server is None:
+            _tile_server = TileServer()
+    return _tile_server
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _TileRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        match = _TILE_PATH.match(self.path.split('?')[0])
+        pyramid = self.server.tile_server.get_pyramid(match.group('pyramid_id')) if match else None
+
+        if pyramid is None:
+            self.send_error(404)
+            return
+
+        try:
+            tile = pyramid.get_tile(int(match.group('z')), int(match.group('x')), int(match.group('y')))
+        except Exception as e:
+            log.debug('Error encoding the tile %s: %s', self.path, e)
+            self.send_error(500)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', MVT_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(tile)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(tile)
+
+    def log_message(self, format, *args):
+        pass
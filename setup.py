@@ -42,6 +42,11 @@ EXTRAS_REQUIRES_TESTS = [
 ]
 
 
+EXTRAS_REQUIRES_PARQUET = [
+    'pyarrow'
+]
+
+
 PACKAGE_DATA = {
     '': [
         'LICENSE',
@@ -95,8 +100,9 @@ setup(
     include_package_data=True,
 
     install_requires=REQUIRES,
-    extras_requires={
-        'tests': EXTRAS_REQUIRES_TESTS
+    extras_require={
+        'tests': EXTRAS_REQUIRES_TESTS,
+        'parquet': EXTRAS_REQUIRES_PARQUET
     },
     python_requires='>=3.5'
 )
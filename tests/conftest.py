@@ -1,4 +1,17 @@
+import pytest
+
+from cartoframes.io.managers import context_manager
 from cartoframes.utils import setup_metrics
+from cartoframes.viz.html import templates
+from cartoframes.viz import source
+
+
+@pytest.fixture(autouse=True)
+def clear_viz_cache():
+    """Clear the caches of the process shared by the visualizations, which are mocked in each test"""
+    source.clear_cache()
+    templates.clear_cache()
+    context_manager.clear_cache()
 
 
 def pytest_configure(config):
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import logging
+import numpy as np
+
+from pathlib import Path
+from geopandas import read_file
+
+from cartoframes.auth import Credentials
+from cartoframes.data.observatory import Dataset, Enrichment, Geography, LocalEnrichment, Variable
+
+# Geographic areas (remote) vs planar areas (local)
+RELATIVE_TOLERANCE = 0.05
+
+public_variable1 = Variable.get('poverty_a86da569')   # FLOAT, AVG
+public_variable2 = Variable.get('one_car_f7f299a7')   # FLOAT, SUM
+
+
+def file_path(path):
+    return '{}/{}'.format(Path(__file__).parent.absolute(), path)
+
+
+class TestLocalEnrichment(object):
+    """Benchmark of the local enrichment against the remote one, with the same fixture data.
+    Run pytest with options --log-level=info --log-cli-level=info to see the times measured.
+    """
+    def setup_method(self):
+        if (os.environ.get('APIKEY') and os.environ.get('USERNAME') and os.environ.get('USERURL')):
+            self.apikey = os.environ['APIKEY']
+            self.username = os.environ['USERNAME']
+            self.base_url = os.environ['USERURL']
+        else:
+            creds = json.loads(open('tests/e2e/secret.json').read())
+            self.apikey = creds['APIKEY']
+            self.username = creds['USERNAME']
+            self.base_url = creds['USERURL']
+
+        self.credentials = Credentials(self.username, self.apikey, self.base_url)
+        self.polygons_gdf = read_file(file_path('files/polygon.geojson'))
+        self.variables = [public_variable1, public_variable2]
+
+    def _download_do_dataframe(self):
+        dataset = Dataset.get(public_variable1.dataset)
+        geography = Geography.get(dataset.geography)
+        wkt = self.polygons_gdf.geometry.unary_union.wkt
+
+        geography_gdf = geography.to_dataframe(
+            self.credentials,
+            sql_query="select geoid, geom from {{geography}} where ST_INTERSECTS(geom, ST_GEOGFROMTEXT('{}'))".format(
+                wkt)
+        )
+        dataset_df = dataset.to_dataframe(
+            self.credentials,
+            sql_query='select * from {{dataset}} where geoid in ({})'.format(
+                ','.join("'{}'".format(geoid) for geoid in geography_gdf['geoid']))
+        )
+        return geography_gdf.merge(dataset_df, on='geoid')
+
+    def test_polygons_local_and_remote(self):
+        start = time.time()
+        remote_gdf = Enrichment(self.credentials).enrich_polygons(self.polygons_gdf, variables=self.variables)
+        remote_time = time.time() - start
+
+        start = time.time()
+        do_gdf = self._download_do_dataframe()
+        download_time = time.time() - start
+
+        start = time.time()
+        local_gdf = LocalEnrichment().enrich_polygons(self.polygons_gdf, do_gdf, variables=self.variables)
+        local_time = time.time() - start
+
+        logging.info('Remote enrichment: %.3fs. Download: %.3fs. Local enrichment: %.3fs',
+                     remote_time, download_time, local_time)
+
+        for variable in self.variables:
+            assert np.isclose(
+                local_gdf[variable.column_name].values,
+                remote_gdf[variable.column_name].values,
+                rtol=RELATIVE_TOLERANCE
+            ).all()
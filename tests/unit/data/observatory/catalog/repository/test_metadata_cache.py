@@ -0,0 +1,85 @@
+import pytest
+
+from unittest.mock import Mock
+from carto.exceptions import CartoException
+
+from cartoframes.data.observatory.catalog.repository.metadata_cache import DAY_IN_SECONDS, MetadataCache
+
+
+def _response(status_code, value=None, etag=None):
+    response = Mock()
+    response.status_code = status_code
+    response.json.return_value = value
+    response.headers = {'ETag': etag} if etag else {}
+    return response
+
+
+def _auth_client(*responses):
+    auth_client = Mock()
+    auth_client.base_url = 'https://user.carto.com'
+    auth_client.api_key = 'fake_api_key'
+    auth_client.send.side_effect = list(responses)
+    return auth_client
+
+
+@pytest.fixture
+def time_mock(mocker):
+    time_mock = mocker.patch('cartoframes.data.observatory.catalog.repository.metadata_cache.time')
+    time_mock.time.return_value = 0
+    return time_mock
+
+
+class TestMetadataCache(object):
+
+    def test_fetch_caches_by_entity_and_filters(self, tmp_path, time_mock):
+        auth_client = _auth_client(_response(200, [{'id': 'a'}]), _response(200, [{'id': 'b'}]))
+        cache = MetadataCache(str(tmp_path / 'cache.sqlite'))
+
+        assert cache.fetch(auth_client, 'datasets', {'country_id': 'usa'}) == [{'id': 'a'}]
+        assert cache.fetch(auth_client, 'datasets', {'country_id': 'usa'}) == [{'id': 'a'}]
+        assert cache.fetch(auth_client, 'datasets', {'country_id': 'esp'}) == [{'id': 'b'}]
+        assert auth_client.send.call_count == 2
+
+        # Another instance with the same file reuses the metadata
+        assert MetadataCache(cache.filepath).fetch(auth_client, 'datasets', {'country_id': 'usa'}) == [{'id': 'a'}]
+        assert auth_client.send.call_count == 2
+
+    def test_fetch_revalidates_expired_metadata(self, tmp_path, time_mock):
+        auth_client = _auth_client(_response(200, {'id': 'a'}, etag='v1'), _response(304))
+        cache = MetadataCache(str(tmp_path / 'cache.sqlite'))
+        cache.fetch(auth_client, 'datasets/a')
+
+        time_mock.time.return_value = DAY_IN_SECONDS
+        assert cache.fetch(auth_client, 'datasets/a') == {'id': 'a'}
+
+        _, kwargs = auth_client.send.call_args
+        assert kwargs['headers'] == {'If-None-Match': 'v1'}
+
+        # The revalidated metadata is valid for another TTL
+        assert cache.fetch(auth_client, 'datasets/a') == {'id': 'a'}
+        assert auth_client.send.call_count == 2
+
+    def test_expire(self, tmp_path, time_mock):
+        auth_client = _auth_client(_response(200, {'id': 'a'}), _response(200, {'id': 'a', 'name': 'A'}))
+        cache = MetadataCache(str(tmp_path / 'cache.sqlite'))
+        cache.fetch(auth_client, 'countries/usa')
+
+        cache.expire()
+
+        assert cache.fetch(auth_client, 'countries/usa') == {'id': 'a', 'name': 'A'}
+        _, kwargs = auth_client.send.call_args
+        assert kwargs['headers'] == {}
+
+    def test_ttl_by_entity_type(self, tmp_path):
+        cache = MetadataCache(str(tmp_path / 'cache.sqlite'), ttls={'datasets': 60})
+
+        assert cache.ttl('countries') == 7 * DAY_IN_SECONDS
+        assert cache.ttl('datasets/a') == 60
+        assert cache.ttl('datasets/a/variables') == DAY_IN_SECONDS
+
+    def test_fetch_client_error(self, tmp_path):
+        auth_client = _auth_client(_response(404, {'errors': ['Not found']}))
+        cache = MetadataCache(str(tmp_path / 'cache.sqlite'))
+
+        with pytest.raises(CartoException, match='404 Client Error: Not found'):
+            cache.fetch(auth_client, 'datasets/x')
@@ -1,3 +1,5 @@
+import time
+
 from unittest.mock import patch
 
 from cartoframes.data.observatory.catalog.repository.repo_client import RepoClient
@@ -157,3 +159,28 @@ class TestRepoClient:
         fetch_entity_mock.assert_any_call('datasets/c')
         fetch_entity_mock.assert_any_call('datasets/x')
         assert datasets == ['datasets/a', 'datasets/b', 'datasets/c']
+
+    @patch.object(RepoClient, '_fetch_entity')
+    def test_fetch_entity_id_list_keeps_order(self, fetch_entity_mock):
+        def fetch_entity(entity_id):
+            # The first ids take longer to be fetched
+            time.sleep(0.01 * (5 - int(entity_id[-1])))
+            return {'id': entity_id}
+
+        fetch_entity_mock.side_effect = fetch_entity
+        repo = RepoClient()
+        filters = {'id': ['id_1', 'id_2', 'id_3', 'id_4']}
+        datasets = repo.get_datasets(filters)
+
+        assert datasets == [{'id': 'datasets/id_1'}, {'id': 'datasets/id_2'},
+                            {'id': 'datasets/id_3'}, {'id': 'datasets/id_4'}]
+
+    @patch.object(RepoClient, '_fetch_entity')
+    def test_fetch_entity_id_list_unique_by_id(self, fetch_entity_mock):
+        fetch_entity_mock.side_effect = lambda _id: {'id': 'id_1', 'slug': 'slug_1'} if _id.endswith('_1') else None
+        repo = RepoClient()
+        filters = {'id': ['id_1', 'slug_1', 'id_1', 'x']}
+        datasets = repo._fetch_entity_id('datasets', filters['id'])
+
+        assert fetch_entity_mock.call_count == 3
+        assert datasets == [{'id': 'id_1', 'slug': 'slug_1'}]
@@ -279,3 +279,18 @@ class TestCatalog(object):
         assert str(e.value) == ('Credentials attribute is required. '
                                 'Please pass a `Credentials` instance '
                                 'or use the `set_default_credentials` function.')
+
+    @patch('cartoframes.data.observatory.catalog.catalog.reset_coverage_index')
+    @patch('cartoframes.data.observatory.catalog.catalog.reset_catalog_index')
+    @patch('cartoframes.data.observatory.catalog.catalog.get_metadata_cache')
+    def test_refresh(self, mocked_cache, mocked_reset_index, mocked_reset_coverage):
+        # Given
+        catalog = Catalog()
+
+        # When
+        catalog.refresh()
+
+        # Then
+        mocked_cache.return_value.expire.assert_called_once_with()
+        mocked_reset_index.assert_called_once_with()
+        mocked_reset_coverage.assert_called_once_with()
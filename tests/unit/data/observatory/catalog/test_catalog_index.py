@@ -0,0 +1,122 @@
+import pytest
+
+from unittest.mock import patch
+
+from cartoframes.data.observatory.catalog import catalog_index
+from cartoframes.data.observatory.catalog.catalog import Catalog
+from cartoframes.data.observatory.catalog.catalog_index import CatalogIndex, get_catalog_index
+from cartoframes.data.observatory.catalog.dataset import Dataset
+from cartoframes.data.observatory.catalog.geography import Geography
+from cartoframes.data.observatory.catalog.variable import Variable
+from cartoframes.data.observatory.catalog.repository.dataset_repo import DatasetRepository
+from cartoframes.data.observatory.catalog.repository.geography_repo import GeographyRepository
+from cartoframes.data.observatory.catalog.repository.variable_repo import VariableRepository
+from .examples import db_dataset1, db_dataset2, db_geography1, db_geography2, db_variable1, db_variable2
+
+variable1 = dict(db_variable1, dataset_id=db_dataset1['id'])
+variable2 = dict(db_variable2, dataset_id=db_dataset2['id'])
+geography1 = dict(db_geography1, id=db_dataset1['geography_id'])
+
+
+def _catalog_index():
+    return CatalogIndex({'datasets': [db_dataset1, db_dataset2], 'geographies': [geography1, db_geography2]})
+
+
+@pytest.fixture(autouse=True)
+def reset_index():
+    catalog_index._catalog_index = None
+    yield
+    catalog_index._catalog_index = None
+
+
+class TestCatalogIndex(object):
+
+    def test_get_with_filters(self):
+        index = _catalog_index()
+
+        assert index.get('datasets', {'country': 'esp'}) == [Dataset(db_dataset1), Dataset(db_dataset2)]
+        assert index.get('datasets', {'country': 'esp', 'public': 'true'}) == [Dataset(db_dataset1)]
+        assert index.get('datasets', {'country': 'usa'}) == []
+        assert index.get('geographies', {'public': 'false'}) == [Geography(db_geography2)]
+        assert index.get('datasets', {'geography': db_dataset2['geography_id']}) == [Dataset(db_dataset2)]
+
+    def test_get_geographies_by_category(self):
+        index = _catalog_index()
+
+        assert index.get('geographies', {'category': 'demographics', 'public': 'true'}) == [Geography(geography1)]
+        assert index.get('geographies', {'category': 'financial'}) == []
+
+    def test_get_with_text(self):
+        index = _catalog_index()
+
+        assert index.get('datasets', text='municipalities') == [Dataset(db_dataset2)]
+        assert index.get('datasets', text='Stats CENS') == [Dataset(db_dataset1)]
+        assert index.get('datasets', text='stats') == [Dataset(db_dataset1), Dataset(db_dataset2)]
+        assert index.get('datasets', text='stats usa') == []
+
+    def test_table(self):
+        table = _catalog_index().table('datasets')
+
+        assert list(table['id']) == [db_dataset1['id'], db_dataset2['id']]
+
+    @patch.object(VariableRepository, 'get_all')
+    def test_add_variables(self, mocked_variables):
+        mocked_variables.side_effect = lambda filters: {
+            db_dataset1['id']: [Variable(variable1)],
+            db_dataset2['id']: [Variable(variable2)]
+        }[filters['dataset']]
+        index = _catalog_index()
+
+        assert index.add_variables([db_dataset1['id'], db_dataset2['id']]) is True
+        assert index.add_variables([db_dataset1['id']]) is False
+        assert mocked_variables.call_count == 2
+        assert index.get('variables', text='people') == [Variable(variable1)]
+        assert index.get('variables', {'dataset': [db_dataset2['id']]}) == [Variable(variable2)]
+
+    def test_save_and_load(self, tmp_path):
+        index = _catalog_index()
+        filepath = str(tmp_path / 'index.json')
+        index.save(filepath)
+
+        loaded_index = CatalogIndex.load(filepath)
+
+        assert loaded_index.built_at == index.built_at
+        assert loaded_index.get('datasets', {'public': 'false'}) == [Dataset(db_dataset2)]
+
+    @patch.object(GeographyRepository, 'get_all')
+    @patch.object(DatasetRepository, 'get_all')
+    def test_get_catalog_index_snapshot(self, mocked_datasets, mocked_geographies, tmp_path):
+        mocked_datasets.return_value = [Dataset(db_dataset1)]
+        mocked_geographies.return_value = [Geography(db_geography1)]
+        filepath = str(tmp_path / 'index.json')
+
+        index = get_catalog_index(filepath)
+        assert get_catalog_index(filepath) is index
+
+        # A new process loads the snapshot
+        catalog_index._catalog_index = None
+        assert get_catalog_index(filepath).get('datasets') == [Dataset(db_dataset1)]
+        assert mocked_datasets.call_count == 1
+
+
+class TestCatalogLocal(object):
+
+    @patch.object(Dataset, 'get_all')
+    @patch('cartoframes.data.observatory.catalog.catalog.get_catalog_index')
+    def test_local_datasets(self, mocked_index, mocked_datasets):
+        mocked_index.return_value = _catalog_index()
+
+        datasets = Catalog(local=True).country('esp').public(False).datasets
+
+        assert datasets == [Dataset(db_dataset2)]
+        mocked_datasets.assert_not_called()
+
+    @patch('cartoframes.data.observatory.catalog.catalog.get_catalog_index')
+    def test_search(self, mocked_index):
+        mocked_index.return_value = _catalog_index()
+
+        assert Catalog().public().search('basic') == [Dataset(db_dataset1)]
+        assert Catalog().search('municipalities', entity_type='geographies') == [Geography(db_geography2)]
+
+        with pytest.raises(ValueError):
+            Catalog().search('basic', entity_type='providers')
@@ -0,0 +1,94 @@
+import pytest
+
+from geopandas import GeoDataFrame
+from shapely.geometry import Point, Polygon, box
+from unittest.mock import patch
+
+from cartoframes.data.observatory.catalog import coverage_index
+from cartoframes.data.observatory.catalog.coverage_index import CoverageIndex, CoverageIndexStore, get_coverage_index
+from cartoframes.data.observatory.catalog.dataset import Dataset
+from cartoframes.data.observatory.catalog.repository.dataset_repo import DatasetRepository
+from cartoframes.data.observatory.catalog.repository.geography_repo import GeographyRepository
+
+# An L-shaped coverage whose bounding box contains the point (3, 3)
+L_COVERAGE = Polygon([(0, 0), (4, 0), (4, 1), (1, 1), (1, 4), (0, 4)])
+
+
+def _coverage_index():
+    return CoverageIndex(['geo_l', 'geo_box', 'geo_none'], [L_COVERAGE, box(10, 10, 12, 12), None])
+
+
+@pytest.fixture(autouse=True)
+def reset_index():
+    coverage_index._coverage_index = None
+    yield
+    coverage_index._coverage_index = None
+
+
+class TestCoverageIndex(object):
+
+    def test_simplified_levels_contain_coverages(self):
+        index = _coverage_index()
+
+        assert len(index.levels) == len(coverage_index.COVERAGE_TOLERANCES) + 1
+        for level in index.levels[:-1]:
+            assert level[0].contains(L_COVERAGE)
+
+    def test_query(self):
+        index = _coverage_index()
+
+        assert index.query([Point(0.5, 3)]) == ['geo_l']
+        assert index.query([Point(3, 3)]) == []
+        assert index.query([box(11, 11, 20, 20), Point(2, 0.5)]) == ['geo_l', 'geo_box']
+        assert index.query([Point(50, 50)]) == []
+
+    def test_save_and_load(self, tmp_path):
+        index = _coverage_index()
+        store = CoverageIndexStore(str(tmp_path / 'coverages.sqlite'))
+        store.save(index)
+
+        loaded_index = store.load()
+
+        assert list(loaded_index.ids) == ['geo_l', 'geo_box', 'geo_none']
+        assert loaded_index.built_at == index.built_at
+        assert loaded_index.levels[-1][0].equals(L_COVERAGE)
+        assert loaded_index.query([Point(11, 11)]) == ['geo_box']
+
+        store.clear()
+        assert store.load() is None
+
+    @patch.object(GeographyRepository, 'get_geographies_gdf')
+    def test_get_coverage_index_stored(self, mocked_geographies, tmp_path):
+        mocked_geographies.return_value = GeoDataFrame(
+            {'id': ['geo_l'], 'geom_coverage': [L_COVERAGE]}, geometry='geom_coverage', crs='epsg:4326')
+        store = CoverageIndexStore(str(tmp_path / 'coverages.sqlite'))
+
+        index = get_coverage_index(store)
+        assert get_coverage_index(store) is index
+
+        # A new process loads the stored coverages
+        coverage_index._coverage_index = None
+        assert get_coverage_index(store).query([Point(0.5, 0.5)]) == ['geo_l']
+        assert mocked_geographies.call_count == 1
+
+
+class TestDatasetSpatialFilter(object):
+
+    @patch.object(DatasetRepository, 'get_all')
+    @patch('cartoframes.data.observatory.catalog.dataset.get_coverage_index')
+    def test_get_datasets_spatial_filtered(self, mocked_index, mocked_datasets):
+        mocked_index.return_value = _coverage_index()
+
+        Dataset.get_datasets_spatial_filtered('POINT (11 11)')
+
+        mocked_datasets.assert_called_once_with({'geography_id': ['geo_box']})
+
+    @patch.object(DatasetRepository, 'get_all')
+    @patch('cartoframes.data.observatory.catalog.dataset.get_coverage_index')
+    def test_get_datasets_spatial_filtered_reprojects(self, mocked_index, mocked_datasets):
+        mocked_index.return_value = _coverage_index()
+        user_gdf = GeoDataFrame({'geometry': [Point(0.5, 0.5)]}, crs='epsg:4326').to_crs('epsg:3857')
+
+        Dataset.get_datasets_spatial_filtered(user_gdf)
+
+        mocked_datasets.assert_called_once_with({'geography_id': ['geo_l']})
@@ -2,12 +2,14 @@ import os
 
 import pytest
 import pandas as pd
+import geopandas as gpd
 
-from unittest.mock import patch
+from unittest.mock import Mock, patch
+from shapely.geometry import Point
 from pyrestcli.exceptions import ServerErrorException
 
 from cartoframes.auth import Credentials
-from cartoframes.data.observatory.catalog.entity import CatalogList
+from cartoframes.data.observatory.catalog.entity import CatalogList, _ChunksReader
 from cartoframes.data.observatory.catalog.dataset import Dataset
 from cartoframes.data.observatory.catalog.repository.variable_repo import VariableRepository
 from cartoframes.data.observatory.catalog.repository.variable_group_repo import VariableGroupRepository
@@ -19,6 +21,15 @@ from .examples import (
     db_dataset2, test_subscription_info
 )
 from carto.do_dataset import DODataset
+from carto.utils import ResponseStream
+
+CSV_CONTENT = b'geoid,name,geom\n1,a,POINT (1 2)\n2,,POINT (3 4)\n3,c,\n'
+
+
+def _response_stream(content, chunk_size=8):
+    response = Mock()
+    response.iter_content.return_value = (content[i:i + chunk_size] for i in range(0, len(content), chunk_size))
+    return ResponseStream(response)
 
 
 class TestDataset(object):
@@ -361,6 +372,97 @@ class TestDataset(object):
             'Please contact your customer success manager or send an email to '
             'sales@carto.com to request access to it.')
 
+    @patch.object(DatasetRepository, 'get_by_id')
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_stream_to_csv(self, mock_download_stream, mock_get_by_id, tmp_path):
+        # Given
+        mock_get_by_id.return_value = test_dataset1
+        dataset = Dataset.get(test_dataset1.id)
+        mock_download_stream.return_value = _response_stream(CSV_CONTENT)
+        file_path = str(tmp_path / 'dataset.csv')
+
+        # When
+        dataset.to_csv(file_path, Credentials('fake_user', '1234'))
+
+        # Then
+        with open(file_path, 'rb') as csvfile:
+            assert csvfile.read() == CSV_CONTENT
+
+    @patch.object(DatasetRepository, 'get_by_id')
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_stream_to_dataframe(self, mock_download_stream, mock_get_by_id):
+        # Given
+        mock_get_by_id.return_value = test_dataset1
+        dataset = Dataset.get(test_dataset1.id)
+        mock_download_stream.return_value = _response_stream(CSV_CONTENT)
+
+        # When
+        gdf = dataset.to_dataframe(Credentials('fake_user', '1234'))
+
+        # Then
+        assert list(gdf['geoid']) == [1, 2, 3]
+        assert gdf.geometry.name == 'geom'
+        assert gdf.geometry[0].equals(Point(1, 2))
+
+    @patch.object(DatasetRepository, 'get_by_id')
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_chunks_to_dataframe(self, mock_download_stream, mock_get_by_id):
+        # Given
+        mock_get_by_id.return_value = test_dataset1
+        dataset = Dataset.get(test_dataset1.id)
+        mock_download_stream.return_value = (CSV_CONTENT[i:i + 8] for i in range(0, len(CSV_CONTENT), 8))
+
+        # When
+        gdf = dataset.to_dataframe(Credentials('fake_user', '1234'))
+
+        # Then
+        assert list(gdf['geoid']) == [1, 2, 3]
+        assert gdf.geometry[1].equals(Point(3, 4))
+
+    def test_chunks_reader_pulls_chunks_when_read(self):
+        # Given
+        pulled = []
+
+        def chunks():
+            for chunk in [b'geoid', b'', b',name\n']:
+                pulled.append(chunk)
+                yield chunk
+
+        reader = _ChunksReader(chunks())
+        buffer = bytearray(3)
+
+        # When / Then
+        assert reader.readinto(buffer) == 3 and bytes(buffer) == b'geo'
+        assert pulled == [b'geoid']
+        assert reader.readinto(buffer) == 2 and bytes(buffer[:2]) == b'id'
+        assert reader.read() == b',name\n'
+        assert reader.readinto(buffer) == 0
+
+    @patch.object(DatasetRepository, 'get_by_id')
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_to_parquet(self, mock_download_stream, mock_get_by_id, tmp_path):
+        pytest.importorskip('pyarrow')
+
+        # Given
+        mock_get_by_id.return_value = test_dataset1
+        dataset = Dataset.get(test_dataset1.id)
+        mock_download_stream.return_value = _response_stream(CSV_CONTENT)
+        file_path = str(tmp_path / 'dataset.parquet')
+
+        # When
+        dataset.to_parquet(file_path, Credentials('fake_user', '1234'), batch_rows=2)
+
+        # Then
+        import pyarrow.parquet
+        assert pyarrow.parquet.ParquetFile(file_path).num_row_groups == 2
+
+        gdf = gpd.read_parquet(file_path)
+        assert list(gdf['geoid']) == [1, 2, 3]
+        assert list(gdf['name']) == ['a', None, 'c']
+        assert gdf.geometry.name == 'geom'
+        assert gdf.geometry[2] is None
+        assert gdf.geometry[1].equals(Point(3, 4))
+
     @patch('cartoframes.data.observatory.catalog.subscriptions.get_subscription_ids')
     @patch('cartoframes.data.observatory.catalog.utils.display_subscription_form')
     @patch('cartoframes.data.observatory.catalog.utils.display_existing_subscription_message')
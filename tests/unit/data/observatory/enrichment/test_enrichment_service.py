@@ -0,0 +1,367 @@
+import io
+import pytest
+
+from pandas import DataFrame
+from geopandas import GeoDataFrame
+from shapely.geometry import Point
+
+from cartoframes.auth import Credentials
+from cartoframes.data.observatory import Variable
+from cartoframes.exceptions import EnrichmentError
+from cartoframes.data.observatory.enrichment import enrichment_service
+from cartoframes.data.observatory.enrichment.enrichment_cache import EnrichmentCache, geometry_fingerprint
+from cartoframes.data.observatory.enrichment.enrichment_service import (
+    EnrichmentService, _ENRICHMENT_ID, _quadkeys, _shard_data
+)
+
+CREDENTIALS = Credentials('fake_user', 'fake_api_key')
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    enrichment_service._enrichment_cache.clear()
+
+
+def _points():
+    return GeoDataFrame({'name': ['a', 'b']}, geometry=[Point(0, 0), Point(1, 1)])
+
+
+def _fake_enrichment(dataset, temp_table_name, geom_type, variables, filters, aggregation, column_types=None,
+                     enrichment_ids=None):
+    data = {_ENRICHMENT_ID: [0, 1]}
+    for variable in variables:
+        data[variable] = [len(variable), len(variable) + 1]
+    return DataFrame(data)
+
+
+def test_geometry_fingerprint():
+    assert geometry_fingerprint([Point(0, 0), Point(1, 1)]) == geometry_fingerprint([Point(0, 0), Point(1, 1)])
+    assert geometry_fingerprint([Point(0, 0), Point(1, 1)]) != geometry_fingerprint([Point(1, 1), Point(0, 0)])
+    assert geometry_fingerprint([Point(0, 0), None]) != geometry_fingerprint([Point(0, 0)])
+    assert geometry_fingerprint([Point(0, 0)], [0]) != geometry_fingerprint([Point(0, 0)], [1])
+
+
+def test_enrichment_cache_expires(mocker):
+    time_mock = mocker.patch('cartoframes.data.observatory.enrichment.enrichment_cache.time')
+    time_mock.time.return_value = 0
+    cache = EnrichmentCache(ttl_seconds=10)
+    cache.set_upload('key', 'table', 'dataset')
+
+    time_mock.time.return_value = 9
+    assert cache.get_upload('key') == ('table', 'dataset')
+
+    time_mock.time.return_value = 10
+    assert cache.get_upload('key') is None
+
+
+def test_enrich_reuses_upload_and_results(mocker):
+    upload_mock = mocker.patch.object(EnrichmentService, '_upload_data', return_value='dataset')
+    enrichment_mock = mocker.patch.object(EnrichmentService, '_execute_enrichment', side_effect=_fake_enrichment)
+    service = EnrichmentService(credentials=CREDENTIALS)
+
+    first = service._enrich('points', _points(), ['var_a', 'var_bb'])
+    second = service._enrich('points', _points(), ['var_a', 'var_bb', 'var_ccc'])
+
+    assert upload_mock.call_count == 1
+    assert enrichment_mock.call_count == 2
+    assert enrichment_mock.call_args[0][3] == ['var_ccc']
+    assert list(first['var_a']) == [5, 6]
+    assert list(second['var_a']) == [5, 6]
+    assert list(second['var_ccc']) == [7, 8]
+    assert _ENRICHMENT_ID not in second
+
+    service._enrich('points', _points(), ['var_a', 'var_bb'])
+    assert enrichment_mock.call_count == 2
+
+
+def test_enrichment_cache_limits(mocker):
+    cache = EnrichmentCache(ttl_seconds=10, max_entries=2, max_bytes=1000)
+    for key in ['a', 'b', 'c']:
+        cache.set_upload(key, 'table_' + key, 'dataset')
+
+    assert cache.get_upload('a') is None
+    assert cache.get_upload('b') == ('table_b', 'dataset')
+
+    cache.add_results('b', 'points', ['var'], DataFrame({_ENRICHMENT_ID: range(100)}))
+    cache.add_results('c', 'points', ['var'], DataFrame({_ENRICHMENT_ID: range(10)}))
+
+    assert cache.get_results('b', 'points', ['var']) == ([], ['var'])
+    assert len(cache.get_results('c', 'points', ['var'])[0]) == 1
+
+    cache.add_results('c', 'points', ['other'], DataFrame({_ENRICHMENT_ID: range(90)}))
+
+    assert cache.get_upload('c') is None
+
+
+def test_enrichment_cache_purges_expired(mocker):
+    time_mock = mocker.patch('cartoframes.data.observatory.enrichment.enrichment_cache.time')
+    time_mock.time.return_value = 0
+    cache = EnrichmentCache(ttl_seconds=10)
+    cache.set_upload('a', 'table_a', 'dataset')
+
+    time_mock.time.return_value = 10
+    cache.set_upload('b', 'table_b', 'dataset')
+
+    assert list(cache._uploads) == ['b']
+
+
+def test_enrichment_cache_copies_frames():
+    cache = EnrichmentCache(ttl_seconds=10)
+    cache.set_upload('key', 'table', 'dataset')
+    frame = DataFrame({_ENRICHMENT_ID: [0, 1], 'var': [1, 2]})
+    cache.add_results('key', 'points', ['var'], frame)
+
+    frame['var'] = [10, 20]
+    result = cache.get_results('key', 'points', ['var'])[0][0]
+    result['var'] = [30, 40]
+
+    assert list(cache.get_results('key', 'points', ['var'])[0][0]['var']) == [1, 2]
+
+
+def test_enrich_data_does_not_reuse_upload_with_other_ids(mocker):
+    def fake_enrichment(dataset, temp_table_name, geom_type, variables, filters, aggregation, column_types=None,
+                        enrichment_ids=None):
+        return DataFrame({_ENRICHMENT_ID: enrichment_ids, 'var': enrichment_ids * 10})
+
+    upload_mock = mocker.patch.object(EnrichmentService, '_upload_data', return_value='dataset')
+    mocker.patch.object(EnrichmentService, '_execute_enrichment', side_effect=fake_enrichment)
+    service = EnrichmentService(credentials=CREDENTIALS)
+    gdf = service._prepare_data(_points(), None)
+
+    first = service._enrich_data(gdf, 'points', ['var'], {}, None)
+    second = service._enrich_data(gdf.assign(**{_ENRICHMENT_ID: [2, 3]}), 'points', ['var'], {}, None)
+
+    assert upload_mock.call_count == 2
+    assert list(first[_ENRICHMENT_ID]) == [0, 1]
+    assert list(second[_ENRICHMENT_ID]) == [2, 3]
+    assert list(second['var']) == [20, 30]
+
+
+def test_enrich_does_not_join_results_with_repeated_ids(mocker):
+    def fake_enrichment(dataset, temp_table_name, geom_type, variables, filters, aggregation, column_types=None,
+                        enrichment_ids=None):
+        # Two geographies for the second point
+        data = {_ENRICHMENT_ID: [0, 1, 1]}
+        for variable in variables:
+            data[variable] = [len(variable), len(variable) + 1, len(variable) + 2]
+        return DataFrame(data)
+
+    mocker.patch.object(EnrichmentService, '_upload_data', return_value='dataset')
+    enrichment_mock = mocker.patch.object(EnrichmentService, '_execute_enrichment', side_effect=fake_enrichment)
+    service = EnrichmentService(credentials=CREDENTIALS)
+
+    service._enrich('points', _points(), ['var_a'], aggregation=None)
+    result = service._enrich('points', _points(), ['var_a', 'var_bb'], aggregation=None)
+
+    assert enrichment_mock.call_count == 2
+    assert enrichment_mock.call_args[0][3] == ['var_a', 'var_bb']
+    assert list(result['name']) == ['a', 'b', 'b']
+    assert list(result['var_a']) == [5, 6, 7]
+    assert list(result['var_bb']) == [6, 7, 8]
+
+
+def test_enrich_does_not_reuse_results_with_other_aggregation_or_filters(mocker):
+    upload_mock = mocker.patch.object(EnrichmentService, '_upload_data', return_value='dataset')
+    enrichment_mock = mocker.patch.object(EnrichmentService, '_execute_enrichment', side_effect=_fake_enrichment)
+    service = EnrichmentService(credentials=CREDENTIALS)
+
+    service._enrich('polygons', _points(), ['var_a'], aggregation='SUM')
+    service._enrich('polygons', _points(), ['var_a'], aggregation={'var_a': 'AVG'})
+    service._enrich('polygons', _points(), ['var_a'], aggregation='SUM', filters={'var_a': '> 1'})
+    service._enrich('polygons', _points().iloc[::-1], ['var_a'], aggregation='SUM')
+
+    assert upload_mock.call_count == 2
+    assert enrichment_mock.call_count == 4
+
+
+def test_quadkeys():
+    # Quadkeys "0", "1", "2" and "3" at zoom 1
+    assert list(_quadkeys([-90, 90, -90, 90], [45, 45, -45, -45], zoom=1)) == [0, 1, 2, 3]
+    # Quadkey "30" at zoom 2
+    assert list(_quadkeys([0.1], [-0.1], zoom=2)) == [12]
+
+
+def test_shard_data():
+    gdf = GeoDataFrame({'name': list('abcd')}, geometry=[
+        Point(90, -45), Point(-90, 45), Point(91, -45), Point(-91, 45)
+    ])
+
+    shards = _shard_data(gdf, 3)
+
+    assert [list(shard['name']) for shard in shards] == [['d', 'b', 'a'], ['c']]
+
+
+def test_enrich_shards(mocker):
+    def enrich_data(geodataframe, *args):
+        # The shard with the third point fails twice
+        if list(geodataframe[_ENRICHMENT_ID]) == [2] and enrich_mock.call_count < 3:
+            raise Exception('Shard failed')
+        return DataFrame({_ENRICHMENT_ID: geodataframe[_ENRICHMENT_ID], 'var': geodataframe[_ENRICHMENT_ID] * 10})
+
+    enrich_mock = mocker.patch.object(EnrichmentService, '_enrich_data', side_effect=enrich_data)
+    progress = []
+    service = EnrichmentService(credentials=CREDENTIALS)
+    gdf = GeoDataFrame({'name': list('abc')}, geometry=[Point(0, 0), Point(100, 0), Point(-100, 0)])
+
+    result = service._enrich('points', gdf, ['var'], shard_size=1, max_workers=1,
+                             progress_callback=lambda done, total: progress.append((done, total)))
+
+    assert enrich_mock.call_count == 5
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert list(result['name']) == ['a', 'b', 'c']
+    assert list(result['var']) == [0, 10, 20]
+
+
+def test_enrich_shards_with_repeated_geometries(mocker):
+    def fake_enrichment(dataset, temp_table_name, geom_type, variables, filters, aggregation, column_types=None,
+                        enrichment_ids=None):
+        return DataFrame({_ENRICHMENT_ID: enrichment_ids, 'var': enrichment_ids + 100})
+
+    upload_mock = mocker.patch.object(EnrichmentService, '_upload_data', return_value='dataset')
+    mocker.patch.object(EnrichmentService, '_execute_enrichment', side_effect=fake_enrichment)
+    service = EnrichmentService(credentials=CREDENTIALS)
+    gdf = GeoDataFrame({'name': list('abc')}, geometry=[Point(0, 0), Point(0, 0), Point(1, 1)])
+
+    result = service._enrich('points', gdf, ['var'], shard_size=1, max_workers=1)
+
+    assert upload_mock.call_count == 3
+    assert len(result) == 3
+    assert list(result['name']) == ['a', 'b', 'c']
+    assert list(result['var']) == [100, 101, 102]
+
+
+def test_enrich_shards_fails(mocker):
+    mocker.patch.object(EnrichmentService, '_enrich_data', side_effect=Exception('Shard failed'))
+    service = EnrichmentService(credentials=CREDENTIALS)
+
+    with pytest.raises(EnrichmentError, match='Shard failed'):
+        service._enrich('points', _points(), ['var'], shard_size=1, retry_times=2)
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'retry_times': 0}, 'retry_times must be at least 1'),
+    ({'shard_size': 0}, 'shard_size must be at least 1'),
+    ({'shard_size': -10}, 'shard_size must be at least 1')
+])
+def test_enrich_invalid_shard_options(mocker, kwargs, message):
+    enrich_mock = mocker.patch.object(EnrichmentService, '_enrich_data')
+    service = EnrichmentService(credentials=CREDENTIALS)
+
+    with pytest.raises(ValueError, match=message):
+        service._enrich('points', _points(), ['var'], **kwargs)
+
+    enrich_mock.assert_not_called()
+
+
+def test_execute_enrichment_reads_typed_chunks(mocker):
+    mocker.patch.object(enrichment_service, '_READ_CHUNK_SIZE', 1)
+    do_dataset_mock = mocker.patch.object(enrichment_service, 'DODataset')
+    do_dataset_mock.return_value.name.return_value.download_stream.return_value = io.StringIO(
+        '__enrichment_id,pop,name\n1,10,x\n0,20,y\n')
+    dataset = mocker.MagicMock()
+    dataset.enrichment.return_value = 'success'
+    service = EnrichmentService(credentials=CREDENTIALS)
+    column_types = service._prepare_column_types([Variable({'column_name': 'pop', 'db_type': 'Numeric'}), 'id'])
+
+    result = service._execute_enrichment(dataset, 'table', 'points', ['pop'], {}, None, column_types)
+
+    assert column_types == {'pop': 'float64'}
+    assert list(result[_ENRICHMENT_ID]) == [1, 0]
+    assert str(result['pop'].dtype) == 'float64'
+    assert list(result['name']) == ['x', 'y']
+
+
+def test_execute_enrichment_aligns_chunks(mocker):
+    mocker.patch.object(enrichment_service, '_READ_CHUNK_SIZE', 1)
+    do_dataset_mock = mocker.patch.object(enrichment_service, 'DODataset')
+    do_dataset_mock.return_value.name.return_value.download_stream.return_value = io.StringIO(
+        '__enrichment_id,pop,count,name\n12,10.5,1,x\n10,20.5,2,y\n')
+    dataset = mocker.MagicMock()
+    dataset.enrichment.return_value = 'success'
+    service = EnrichmentService(credentials=CREDENTIALS)
+
+    result = service._execute_enrichment(dataset, 'table', 'points', ['pop'], {}, None, None, [10, 11, 12])
+
+    assert list(result[_ENRICHMENT_ID]) == [10, 11, 12]
+    assert list(result['pop'].fillna(-1)) == [20.5, -1, 10.5]
+    assert list(result['count'].fillna(-1)) == [2, -1, 1]
+    assert list(result['name'].fillna('')) == ['y', '', 'x']
+
+
+def test_execute_enrichment_aligns_chunks_with_repeated_ids(mocker):
+    mocker.patch.object(enrichment_service, '_READ_CHUNK_SIZE', 2)
+    do_dataset_mock = mocker.patch.object(enrichment_service, 'DODataset')
+    do_dataset_mock.return_value.name.return_value.download_stream.return_value = io.StringIO(
+        '__enrichment_id,count\n1,10\n0,20\n1,11\n')
+    dataset = mocker.MagicMock()
+    dataset.enrichment.return_value = 'success'
+    service = EnrichmentService(credentials=CREDENTIALS)
+
+    result = service._execute_enrichment(dataset, 'table', 'points', ['count'], {}, None, None, [0, 1])
+
+    assert list(result[_ENRICHMENT_ID]) == [0, 1, 1]
+    assert list(result['count']) == [20, 10, 11]
+
+
+def test_merge_aligns_by_position():
+    service = EnrichmentService(credentials=CREDENTIALS)
+    gdf = service._prepare_data(GeoDataFrame({'name': list('abc')}, geometry=[Point(0, 0)] * 3, index=[5, 6, 7]),
+                                None)
+    enriched = DataFrame({_ENRICHMENT_ID: [2, 0], 'var': [30.0, 10.0]})
+
+    result = service._merge(gdf, enriched)
+
+    assert isinstance(result, GeoDataFrame)
+    assert list(result.columns) == ['name', 'geometry', 'var']
+    assert list(result.index) == [0, 1, 2]
+    assert list(result['var'].fillna(-1)) == [10.0, -1, 30.0]
+
+
+def test_merge_with_repeated_ids():
+    service = EnrichmentService(credentials=CREDENTIALS)
+    gdf = service._prepare_data(GeoDataFrame({'name': list('ab')}, geometry=[Point(0, 0)] * 2), None)
+    enriched = DataFrame({_ENRICHMENT_ID: [1, 0, 1], 'var': [20, 10, 21]})
+
+    result = service._merge(gdf, enriched)
+
+    assert list(result['name']) == ['a', 'b', 'b']
+    assert list(result['var']) == [10, 20, 21]
+    assert _ENRICHMENT_ID not in result
+
+
+def test_enrich_deduplicate(mocker):
+    uploaded = []
+
+    def upload_data(temp_table_name, geodataframe):
+        uploaded.append(geodataframe)
+        return 'dataset'
+
+    def execute_enrichment(dataset, *args):
+        return DataFrame({_ENRICHMENT_ID: [1, 0], 'var': [20, 10]})
+
+    mocker.patch.object(EnrichmentService, '_upload_data', side_effect=upload_data)
+    mocker.patch.object(EnrichmentService, '_execute_enrichment', side_effect=execute_enrichment)
+    service = EnrichmentService(credentials=CREDENTIALS)
+    gdf = GeoDataFrame({'name': list('abcd')}, geometry=[Point(0, 0), Point(1, 1), Point(0, 0), Point(1, 1)])
+
+    result = service._enrich('points', gdf, ['var'], deduplicate=True)
+
+    assert len(uploaded) == 1
+    assert list(uploaded[0][_ENRICHMENT_ID]) == [0, 1]
+    assert list(uploaded[0].geometry) == [Point(0, 0), Point(1, 1)]
+    assert list(result['name']) == ['a', 'b', 'c', 'd']
+    assert list(result['var']) == [10, 20, 10, 20]
+
+
+def test_enrich_deduplicate_with_repeated_results(mocker):
+    mocker.patch.object(EnrichmentService, '_upload_data', return_value='dataset')
+    mocker.patch.object(EnrichmentService, '_execute_enrichment', return_value=DataFrame({
+        _ENRICHMENT_ID: [0, 0, 1], 'var': [10, 11, 20]
+    }))
+    service = EnrichmentService(credentials=CREDENTIALS)
+    gdf = GeoDataFrame({'name': list('abc')}, geometry=[Point(0, 0), Point(1, 1), Point(0, 0)])
+
+    result = service._enrich('points', gdf, ['var'], deduplicate=True)
+
+    assert list(result['name']) == ['a', 'a', 'b', 'c', 'c']
+    assert list(result['var']) == [10, 11, 20, 10, 11]
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from pandas import DataFrame
+from geopandas import GeoDataFrame
+from shapely.geometry import Point, box
+
+from cartoframes.data.observatory import Geography, LocalEnrichment, Variable
+from cartoframes.data.observatory.enrichment.geography_index import GeographyIndexStore
+
+POPULATION = Variable({'id': 'carto-do.variable.pop', 'column_name': 'pop', 'agg_method': 'SUM'})
+INCOME = Variable({'id': 'carto-do.variable.income', 'column_name': 'income', 'agg_method': 'AVG'})
+GEOID = Variable({'id': 'carto-do.variable.geoid', 'column_name': 'geoid', 'agg_method': None})
+
+
+def _do_geodataframe():
+    return GeoDataFrame({
+        'geoid': ['a', 'b'],
+        'pop': [10.0, 20.0],
+        'income': [100.0, 200.0]
+    }, geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)])
+
+
+def _polygons():
+    return GeoDataFrame({'name': ['half', 'inside', 'outside']},
+                        geometry=[box(0.5, 0, 1.5, 1), box(0, 0, 0.5, 0.5), box(10, 10, 11, 11)])
+
+
+def test_enrich_polygons_default_aggregation():
+    result = LocalEnrichment().enrich_polygons(_polygons(), _do_geodataframe(), [POPULATION, INCOME, GEOID])
+
+    assert list(result.columns) == ['name', 'geometry', 'pop', 'income']
+    assert list(result['name']) == ['half', 'inside', 'outside']
+    assert np.allclose(result['pop'].values[:2], [15.0, 2.5])
+    assert np.allclose(result['income'].values[:2], [150.0, 100.0])
+    assert result[['pop', 'income']].iloc[2].isnull().all()
+
+
+def test_enrich_polygons_aggregation_by_variable():
+    aggregation = {POPULATION.id: 'max', 'income': 'MIN', GEOID.id: 'STRING_AGG'}
+    result = LocalEnrichment().enrich_polygons(_polygons(), _do_geodataframe(), [POPULATION, 'income', GEOID],
+                                               aggregation=aggregation)
+
+    assert list(result['pop'].values[:2]) == [20.0, 10.0]
+    assert list(result['income'].values[:2]) == [100.0, 100.0]
+    assert list(result['geoid'].values[:2]) == ['a,b', 'a']
+
+
+def test_enrich_polygons_count():
+    result = LocalEnrichment().enrich_polygons(_polygons(), _do_geodataframe(), [POPULATION], aggregation='COUNT')
+
+    assert list(result['pop'].values[:2]) == [2, 1]
+
+
+def test_enrich_polygons_without_aggregation():
+    result = LocalEnrichment().enrich_polygons(_polygons(), _do_geodataframe(), [POPULATION, GEOID],
+                                               aggregation=None)
+
+    assert list(result['name']) == ['half', 'half', 'inside', 'outside']
+    assert list(result['geoid'].values[:3]) == ['a', 'b', 'a']
+    assert list(result['pop'].values[:3]) == [10.0, 20.0, 10.0]
+
+
+def test_enrich_polygons_with_geometry_column():
+    polygons = _polygons()
+    polygons['the_geom'] = polygons.geometry.to_wkt()
+    do_dataframe = _do_geodataframe()
+    do_dataframe['geom'] = do_dataframe.geometry.to_wkt()
+    do_dataframe = do_dataframe.drop(columns='geometry')
+
+    result = LocalEnrichment().enrich_polygons(polygons.drop(columns='geometry'), do_dataframe, POPULATION,
+                                               geom_col='the_geom')
+
+    assert np.allclose(result['pop'].values[:2], [15.0, 2.5])
+
+
+def test_enrich_polygons_errors():
+    with pytest.raises(ValueError, match='not found'):
+        LocalEnrichment().enrich_polygons(_polygons(), _do_geodataframe(), ['unknown'])
+
+    with pytest.raises(ValueError, match='not valid'):
+        LocalEnrichment().enrich_polygons(_polygons(), _do_geodataframe(), [POPULATION], aggregation='MEDIAN')
+
+    with pytest.raises(ValueError, match='only one aggregation by variable'):
+        LocalEnrichment().enrich_polygons(_polygons(), _do_geodataframe(), [POPULATION],
+                                          aggregation={'pop': ['SUM', 'AVG']})
+
+
+def _points():
+    return GeoDataFrame({'name': ['a', 'b', 'boundary', 'outside']},
+                        geometry=[Point(0.5, 0.5), Point(1.5, 0.5), Point(1, 0.5), Point(10, 10)])
+
+
+def test_enrich_points_with_do_geometries():
+    result = LocalEnrichment().enrich_points(_points(), _do_geodataframe(), [POPULATION, 'geoid'])
+
+    assert list(result['name']) == ['a', 'b', 'boundary', 'boundary', 'outside']
+    assert list(result['geoid'].values[:4]) == ['a', 'b', 'a', 'b']
+    assert list(result['pop'].values[:4]) == [10.0, 20.0, 10.0, 20.0]
+
+
+def test_enrich_points_with_geography(mocker, tmp_path):
+    store = GeographyIndexStore(str(tmp_path / 'index.sqlite'))
+    mocker.patch('cartoframes.data.observatory.enrichment.local_enrichment.get_geography_index_store',
+                 return_value=store)
+    download_mock = mocker.patch.object(Geography, 'to_dataframe', return_value=GeoDataFrame(
+        {'geoid': [1, 2]}, geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)]))
+    geography = Geography({'id': 'carto-do.geography.geo1'})
+    do_dataframe = DataFrame({'geoid': [2, 1], 'pop': [20.0, 10.0]})
+    points = _points()[_points()['name'] != 'boundary']
+
+    result = LocalEnrichment().enrich_points(points, do_dataframe, [POPULATION], geography=geography)
+
+    assert download_mock.call_count == 1
+    assert list(result.columns) == ['name', 'geometry', 'pop']
+    assert list(result['pop'].values[:2]) == [10.0, 20.0]
+    assert np.isnan(result['pop'].values[2])
+
+    # A new store with the same file doesn't download the geography again
+    new_store = GeographyIndexStore(store.filepath)
+    index = new_store.get('carto-do.geography.geo1')
+
+    assert download_mock.call_count == 1
+    assert list(index.geoids) == ['1', '2']
+
+    new_store.clear('carto-do.geography.geo1')
+    assert new_store.load('carto-do.geography.geo1') is None
+
+
+def test_enrich_points_with_geography_without_geoid():
+    with pytest.raises(ValueError, match='geoid'):
+        LocalEnrichment().enrich_points(_points(), DataFrame({'pop': [1.0]}), ['pop'], geography='geo1')
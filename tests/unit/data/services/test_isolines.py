@@ -0,0 +1,219 @@
+import pytest
+
+from geopandas import GeoDataFrame
+from shapely.geometry import Point
+
+from cartoframes.auth import Credentials
+from cartoframes.data.services import Isolines
+from cartoframes.data.services.utils import IsolinesCache
+
+CREDENTIALS = Credentials('fake_user', 'fake_api_key')
+
+
+def _fake_local_iso_areas(source_gdf, source_col, ranges, iso_function, mode, options, exclusive=False):
+    records = [
+        (source_id, data_range, geom.buffer(data_range / 100))
+        for source_id, geom in zip(source_gdf[source_col], source_gdf.geometry)
+        for data_range in ranges
+    ]
+    gdf = GeoDataFrame(records, columns=['source_id', 'data_range', 'the_geom'])
+    gdf.set_geometry('the_geom', inplace=True)
+    return gdf
+
+
+@pytest.fixture
+def isolines(mocker, tmp_path):
+    mocker.patch.object(Isolines, 'available_quota', return_value=1000)
+    service = Isolines(credentials=CREDENTIALS)
+    service._cache = IsolinesCache(str(tmp_path / 'isolines_cache.sqlite'))
+    return service
+
+
+def _source():
+    return GeoDataFrame({'name': ['a', 'b']}, geometry=[Point(0, 0), Point(1, 1)])
+
+
+def test_isolines_cache_key_rounds_coordinates(tmp_path):
+    cache = IsolinesCache(str(tmp_path / 'cache.sqlite'), precision=3)
+    options = {'mode_type': 'shortest', 'quality': None}
+
+    assert cache.key(Point(1.00001, 2), 'isochrone', 'car', 300, options) == \
+        cache.key(Point(1, 2), 'isochrone', 'car', 300, {'mode_type': 'shortest'})
+    assert cache.key(Point(1, 2), 'isochrone', 'car', 300, options) != \
+        cache.key(Point(1, 2), 'isochrone', 'walk', 300, options)
+    assert cache.key(Point(1, 2), 'isochrone', 'car', 300, options) != \
+        cache.key(Point(1, 2), 'isochrone', 'car', 300, {'mode_type': 'fastest'})
+
+
+def test_isolines_cache_get_set(tmp_path):
+    cache = IsolinesCache(str(tmp_path / 'cache.sqlite'))
+    polygon = Point(0, 0).buffer(1)
+
+    cache.set([('a', polygon)])
+
+    result = cache.get(['a', 'b'])
+    assert list(result.keys()) == ['a']
+    assert result['a'].equals(polygon)
+
+    cache.clear()
+    assert cache.get(['a']) == {}
+
+
+def test_isochrones_cached_only_computes_misses(mocker, isolines):
+    local_mock = mocker.patch.object(Isolines, '_local_iso_areas', side_effect=_fake_local_iso_areas)
+
+    first = isolines.isochrones(_source(), [100, 200], cached=True)
+    assert first.metadata['required_quota'] == 4
+    assert local_mock.call_count == 1
+
+    dry = isolines.isochrones(_source(), [100, 200, 300], cached=True, dry_run=True)
+    assert dry.metadata['required_quota'] == 2
+
+    second = isolines.isochrones(_source(), [100, 200, 300], cached=True)
+    assert second.metadata['required_quota'] == 2
+    assert local_mock.call_count == 2
+    assert list(local_mock.call_args[0][2]) == [300]
+
+    data = second.data
+    assert list(data['source_id']) == [0, 0, 0, 1, 1, 1]
+    assert list(data['data_range']) == [100, 200, 300] * 2
+    assert data.geometry[1].equals(first.data.geometry[1])
+
+
+def test_isochrones_cached_exclusive(mocker, isolines):
+    mocker.patch.object(Isolines, '_local_iso_areas', side_effect=_fake_local_iso_areas)
+
+    data = isolines.isochrones(_source(), [100, 200], cached=True, exclusive=True).data
+
+    assert list(data['lower_data_range']) == [0, 100, 0, 100]
+    assert data.geometry[0].equals(Point(0, 0).buffer(1))
+    assert data.geometry[1].area == pytest.approx(Point(0, 0).buffer(2).area - Point(0, 0).buffer(1).area)
+
+
+def test_isochrones_cached_remote_source_fails(mocker, isolines):
+    mocker.patch('cartoframes.io.managers.source_manager.ContextManager')
+
+    with pytest.raises(ValueError):
+        isolines.isochrones('table_name', [100], cached=True)
+
+
+def test_isochrones_cached_not_point_source_fails(mocker, isolines):
+    cache_mock = mocker.patch.object(IsolinesCache, 'key')
+    source = GeoDataFrame({'name': ['a', 'b']}, geometry=[Point(0, 0), Point(1, 1).buffer(1)])
+
+    with pytest.raises(ValueError, match='only available for point geometries, found: Polygon'):
+        isolines.isochrones(source, [100], cached=True)
+
+    cache_mock.assert_not_called()
+
+
+def test_isolines_rings():
+    inclusive = GeoDataFrame({
+        'source_id': [2, 1, 2, 1],
+        'data_range': [600, 600, 300, 300],
+        'the_geom': [Point(5, 5).buffer(2), Point(0, 0).buffer(2), Point(5, 5).buffer(1), Point(0, 0).buffer(1)]
+    }, geometry='the_geom')
+
+    rings = Isolines.rings(inclusive)
+
+    assert list(rings['source_id']) == [1, 1, 2, 2]
+    assert list(rings['data_range']) == [300, 600, 300, 600]
+    assert list(rings['lower_data_range']) == [0, 300, 0, 300]
+    assert list(rings['range_label']) == ['5 min.', '10 min.', '5 min.', '10 min.']
+    assert rings.geometry.iloc[0].equals(Point(0, 0).buffer(1))
+    assert rings.geometry.iloc[1].equals(Point(0, 0).buffer(2).difference(Point(0, 0).buffer(1)))
+    assert 'lower_data_range' not in inclusive
+
+    with pytest.raises(ValueError):
+        Isolines.rings(rings)
+
+
+def test_isochrones_chunks_keep_partial_results(mocker, isolines):
+    def local_iso_areas(source_gdf, source_col, *args, **kwargs):
+        if 2 in source_gdf.index:
+            raise Exception('chunk failed')
+        source_gdf = source_gdf.assign(cartodb_id=source_gdf.index)
+        return _fake_local_iso_areas(source_gdf, 'cartodb_id', *args, **kwargs)
+
+    local_mock = mocker.patch.object(Isolines, '_local_iso_areas', side_effect=local_iso_areas)
+    source = GeoDataFrame(geometry=[Point(i, i) for i in range(5)])
+
+    result = isolines.isochrones(source, [100], chunk_size=2, max_workers=2)
+
+    assert local_mock.call_count == 3
+    assert list(result.data['source_id']) == [0, 1, 4]
+    chunks = result.metadata['chunks']
+    assert [chunk['num_rows'] for chunk in chunks] == [2, 2, 1]
+    assert [chunk['error'] for chunk in chunks] == [None, 'chunk failed', None]
+    assert all(chunk['time'] >= 0 for chunk in chunks)
+
+
+def test_isochrones_chunks_all_failed(mocker, isolines):
+    mocker.patch.object(Isolines, '_local_iso_areas', side_effect=Exception('chunk failed'))
+
+    with pytest.raises(Exception, match='chunk failed'):
+        isolines.isochrones(_source(), [100], chunk_size=1)
+
+
+def test_isochrones_remote_chunks(mocker, isolines):
+    cm_mock = mocker.patch('cartoframes.io.managers.source_manager.ContextManager')
+    cm_mock.return_value.compute_query.return_value = 'SELECT * FROM table_name'
+    cm_mock.return_value.get_num_rows.return_value = 3
+    remote_mock = mocker.patch.object(Isolines, '_remote_iso_areas', return_value=_fake_local_iso_areas(
+        _source().assign(cartodb_id=[1, 2]), 'cartodb_id', [100], None, None, None))
+
+    result = isolines.isochrones('table_name', [100], chunk_size=2)
+
+    assert [call[0][0] for call in remote_mock.call_args_list] == [
+        'SELECT * FROM (SELECT * FROM table_name) _source_chunk ORDER BY cartodb_id LIMIT 2 OFFSET 0',
+        'SELECT * FROM (SELECT * FROM table_name) _source_chunk ORDER BY cartodb_id LIMIT 1 OFFSET 2'
+    ]
+    assert list(result.data['source_id']) == [1, 2, 1, 2]
+
+
+def test_isochrones_remote_chunks_source_col(mocker, isolines):
+    cm_mock = mocker.patch('cartoframes.io.managers.source_manager.ContextManager')
+    cm_mock.return_value.compute_query.return_value = 'SELECT * FROM table_name'
+    cm_mock.return_value.get_num_rows.return_value = 3
+    cm_mock.return_value.get_column_names.return_value = ['cartodb_id', 'the_geom', 'name']
+    remote_mock = mocker.patch.object(Isolines, '_remote_iso_areas', return_value=_fake_local_iso_areas(
+        _source().assign(name=['a', 'a']), 'name', [100], None, None, None))
+
+    isolines.isochrones('table_name', [100], source_col='name', chunk_size=2)
+
+    assert [call[0][0] for call in remote_mock.call_args_list] == [
+        'SELECT * FROM (SELECT * FROM table_name) _source_chunk ORDER BY cartodb_id, name LIMIT 2 OFFSET 0',
+        'SELECT * FROM (SELECT * FROM table_name) _source_chunk ORDER BY cartodb_id, name LIMIT 1 OFFSET 2'
+    ]
+
+
+def test_isochrones_remote_chunks_without_cartodb_id_fails(mocker, isolines):
+    cm_mock = mocker.patch('cartoframes.io.managers.source_manager.ContextManager')
+    cm_mock.return_value.compute_query.return_value = 'SELECT * FROM table_name'
+    cm_mock.return_value.get_num_rows.return_value = 3
+    cm_mock.return_value.get_column_names.return_value = ['the_geom', 'name']
+
+    with pytest.raises(ValueError, match='need a "cartodb_id" column'):
+        isolines.isochrones('table_name', [100], source_col='name', chunk_size=2)
+
+
+def test_isochrones_inline_points(mocker, isolines):
+    to_carto_mock = mocker.patch('cartoframes.data.services.isolines.to_carto')
+    query_mock = mocker.patch.object(Isolines, '_execute_query', return_value={
+        'fields': {'cartodb_id': {}, 'source_id': {}, 'data_range': {}, 'the_geom': {}},
+        'rows': [
+            {'cartodb_id': 1, 'source_id': 0, 'data_range': 100, 'the_geom': Point(0, 0).buffer(1).wkb_hex},
+            {'cartodb_id': 2, 'source_id': 1, 'data_range': 100, 'the_geom': Point(1, 1).buffer(1).wkb_hex}
+        ]
+    })
+    source = GeoDataFrame({'name': ['a', 'b']}, geometry=[Point(0, 0), Point(1.5, 2.25)])
+
+    result = isolines.isochrones(source, [100], source_col='name')
+
+    to_carto_mock.assert_not_called()
+    sql = query_mock.call_args[0][0]
+    assert 'ARRAY[0,1]::integer[]' in sql
+    assert 'ARRAY[0.0,1.5]::double precision[]' in sql
+    assert 'ARRAY[0.0,2.25]::double precision[]' in sql
+    assert list(result.data['source_id']) == ['a', 'b']
+    assert result.data.geometry[1].equals(Point(1, 1).buffer(1))
@@ -57,6 +57,18 @@ class TestContextManager(object):
         # Then
         mock.assert_called_once_with('SELECT "A" FROM (__query__) _q', columns, 3)
 
+    def test_compute_query_schema(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mock = mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+
+        # When
+        queries = [ContextManager(self.credentials).compute_query(table) for table in ['table_a', 'table_b']]
+
+        # Then
+        assert queries == ['SELECT * FROM "schema"."table_a"', 'SELECT * FROM "schema"."table_b"']
+        mock.assert_called_once_with()
+
     def test_copy_from(self, mocker):
         # Given
         mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
@@ -261,6 +273,24 @@ class TestContextManager(object):
         # Then
         assert DataFrame(columns=['tables']).equals(tables)
 
+    def test_get_numeric_column_names(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mock = mocker.patch.object(SQLClient, 'send', return_value={'fields': {
+            'cartodb_id': {'type': 'number', 'pgtype': 'int4'},
+            'pop': {'type': 'number', 'pgtype': 'float8'},
+            'name': {'type': 'string', 'pgtype': 'text'},
+            'the_geom': {'type': 'geometry', 'wkbtype': 'Point'}
+        }})
+
+        # When
+        cm = ContextManager(self.credentials)
+        columns = cm.get_numeric_column_names('query')
+
+        # Then
+        assert columns == ['cartodb_id', 'pop']
+        mock.assert_called_once_with('SELECT * FROM (query) _q LIMIT 0', True, True, None)
+
     def test_retry_copy_decorator(self):
         @retry_copy
         def test_function(retry_times):
@@ -0,0 +1,115 @@
+import gzip
+import json
+import base64
+import struct
+import numpy as np
+import geopandas as gpd
+
+from shapely.geometry import LineString, MultiLineString, MultiPoint, MultiPolygon, Point, box, shape
+
+from cartoframes.utils.binary_data import encode_geodataframe_binary
+from cartoframes.utils.utils import get_geodataframe_data
+
+GEOMETRIES = [
+    Point(1.1234567, 2),
+    MultiPoint([(0, 0), (1, 1)]),
+    LineString([(0, 0), (1, -1), (2, 2)]),
+    MultiLineString([[(0, 0), (1, 1)], [(2, 2), (3, 3)]]),
+    box(0, 0, 2, 2).difference(box(0.5, 0.5, 1, 1)),
+    MultiPolygon([box(0, 0, 1, 1), box(3, 3, 4, 4)])
+]
+
+
+def _gdf():
+    return gpd.GeoDataFrame({
+        'number': [1, 2.5, None, 4, 5, 6],
+        'category': ['a', None, 'c', 'd', 'e', 'f']
+    }, geometry=GEOMETRIES)
+
+
+def _decode(data):
+    """Decode the data as the JS SourceFactory does."""
+    header_length = struct.unpack('<I', data[:4])[0]
+    header = json.loads(data[4:4 + header_length].decode('utf-8'))
+    buffers = data[4 + header_length + (-(4 + header_length) % 8):]
+
+    def array(dtype, reference):
+        offset, length = reference
+        return np.frombuffer(buffers, dtype=dtype, count=length, offset=offset)
+
+    geometry = header['geometry']
+    types = array('<u1', geometry['types'])
+    geometry_parts = array('<u4', geometry['geometryParts'])
+    part_rings = array('<u4', geometry['partRings'])
+    ring_coords = array('<u4', geometry['ringCoords'])
+    if header['scale'] is None:
+        coords = array('<f8', geometry['coords']).reshape(-1, 2)
+    else:
+        coords = np.cumsum(array('<i4', geometry['coords']).reshape(-1, 2), axis=0) / header['scale']
+
+    features = []
+    for index in range(header['count']):
+        parts = [[coords[ring_coords[ring]:ring_coords[ring + 1]].tolist()
+                  for ring in range(part_rings[part], part_rings[part + 1])]
+                 for part in range(geometry_parts[index], geometry_parts[index + 1])]
+        geojson = {
+            1: lambda: {'type': 'Point', 'coordinates': parts[0][0][0]},
+            2: lambda: {'type': 'MultiPoint', 'coordinates': [part[0][0] for part in parts]},
+            3: lambda: {'type': 'LineString', 'coordinates': parts[0][0]},
+            4: lambda: {'type': 'MultiLineString', 'coordinates': [part[0] for part in parts]},
+            5: lambda: {'type': 'Polygon', 'coordinates': parts[0]},
+            6: lambda: {'type': 'MultiPolygon', 'coordinates': parts}
+        }[types[index]]()
+        properties = {column['name']: _property(column, array, index) for column in header['columns']}
+        features.append((shape(geojson), properties))
+
+    return features
+
+
+def _property(column, array, index):
+    if 'buffer' not in column:
+        return column['values'][index]
+
+    value = array(column['type'], column['buffer'])[index]
+    if 'categories' in column:
+        return column['categories'][value] if value >= 0 else None
+    return value
+
+
+class TestBinaryData(object):
+
+    def test_encode_geodataframe_binary(self):
+        features = _decode(encode_geodataframe_binary(_gdf()))
+
+        assert [geom.equals(expected) for (geom, _), expected in zip(features, GEOMETRIES)] == [True] * 6
+        assert [properties['category'] for _, properties in features] == ['a', None, 'c', 'd', 'e', 'f']
+        assert np.isnan(features[2][1]['number'])
+        assert features[1][1]['number'] == 2.5
+
+    def test_encode_geodataframe_binary_precision(self):
+        features = _decode(encode_geodataframe_binary(_gdf(), precision=3))
+
+        assert features[0][0].equals(Point(1.123, 2))
+        assert features[4][0].equals(GEOMETRIES[4])
+
+    def test_encode_geodataframe_binary_types(self):
+        gdf = _gdf()
+        gdf['number'] = gdf['number'].astype('float32')
+        gdf['integer'] = np.arange(6, dtype='int16') - 3
+        gdf['category'] = gdf['category'].astype('category')
+
+        features = _decode(encode_geodataframe_binary(gdf))
+
+        assert [properties['integer'] for _, properties in features] == [-3, -2, -1, 0, 1, 2]
+        assert [properties['category'] for _, properties in features] == ['a', None, 'c', 'd', 'e', 'f']
+        assert features[1][1]['number'] == 2.5
+
+    def test_get_geodataframe_data_binary(self):
+        gdf = gpd.GeoDataFrame({'number': range(1000)}, geometry=gpd.points_from_xy(
+            np.random.RandomState(0).uniform(-50, 50, 1000), np.random.RandomState(1).uniform(-50, 50, 1000)))
+
+        data = get_geodataframe_data(gdf.copy(), 'binary', precision=6)
+
+        features = _decode(gzip.decompress(base64.b64decode(data)))
+        assert len(features) == 1000
+        assert len(data) < len(get_geodataframe_data(gdf.copy(), True)) * 0.75
@@ -4,11 +4,12 @@ import pandas as pd
 import geopandas as gpd
 
 from shapely.geos import lgeos
-from shapely.geometry import Point
+from shapely.geometry import LineString, Point
 
 from cartoframes.utils.geom_utils import (ENC_EWKT, ENC_SHAPELY, ENC_WKB,
                                           ENC_WKB_BHEX, ENC_WKB_HEX, ENC_WKT,
-                                          decode_geometry, decode_geometry_item, detect_encoding_type)
+                                          decode_geometry, decode_geometry_item, detect_encoding_type,
+                                          quantize_geometries, simplify_geometries)
 
 
 class TestGeomUtils(object):
@@ -127,3 +128,21 @@ class TestGeomUtils(object):
         geom = decode_geometry_item('SRID=4326;POINT (1234 5789)', ENC_EWKT)  # ext
         assert lgeos.GEOSGetSRID(geom._geom) == 4326
         assert geom.wkt == 'POINT (1234 5789)'
+
+    def test_quantize_geometries(self):
+        geometries = gpd.GeoSeries([Point(1.23456, 2.34567), LineString([(0.111, 0.999), (1.555, 2)]), None])
+
+        result = quantize_geometries(geometries, 2)
+
+        assert result[0].equals(Point(1.23, 2.35))
+        assert result[1].equals(LineString([(0.11, 1), (1.56, 2)]))
+        assert result[2] is None
+
+    def test_simplify_geometries(self):
+        geometries = gpd.GeoSeries([Point(0, 0), LineString([(0, 0), (1, 0.01), (2, 0)]), None])
+
+        result = simplify_geometries(geometries, 0.1)
+
+        assert result[0].equals(Point(0, 0))
+        assert result[1].equals(LineString([(0, 0), (2, 0)]))
+        assert result[2] is None
@@ -0,0 +1,29 @@
+from shapely.geometry import Point, box
+
+from cartoframes.utils.spatial_index import SpatialIndex
+
+
+def test_spatial_index_query():
+    index = SpatialIndex([box(0, 0, 1, 1), None, box(1, 0, 2, 1), box(5, 5, 6, 6)])
+
+    positions, tree_positions = index.query([Point(1.5, 0.5), box(0.5, 0.5, 1.5, 0.6), Point(9, 9)])
+
+    assert list(positions) == [0, 1, 1]
+    assert list(tree_positions) == [2, 0, 2]
+
+
+def test_spatial_index_query_predicate():
+    index = SpatialIndex([box(0, 0, 2, 2), box(1, 1, 3, 3)])
+
+    positions, tree_positions = index.query([box(0.5, 0.5, 0.6, 0.6)], predicate='within')
+
+    assert list(positions) == [0]
+    assert list(tree_positions) == [0]
+
+
+def test_spatial_index_query_bounding_boxes():
+    index = SpatialIndex([Point(0, 0).buffer(1)])
+
+    positions, _ = index.query([Point(0.9, 0.9), Point(0.5, 0.5)], predicate=None)
+
+    assert list(positions) == [0, 1]
@@ -7,10 +7,12 @@ from collections import OrderedDict
 
 import requests
 import numpy as np
+import geopandas as gpd
 
 from cartoframes.utils.utils import (camel_dictionary, cssify, debug_print, dict_items,
                                      importify_params, snake_to_camel, dtypes2pg, pg2dtypes,
-                                     encode_row, extract_viz_columns, remove_comments, deprecated)
+                                     encode_row, extract_viz_columns, remove_comments, deprecated,
+                                     plan_geodataframe_data, get_geodataframe_hash)
 
 
 class TestUtils(unittest.TestCase):
@@ -216,6 +218,53 @@ class TestUtils(unittest.TestCase):
         assert 'hello' in extract_viz_columns(viz)
         assert 'A_0123' in extract_viz_columns(viz)
 
+    def test_plan_geodataframe_data(self):
+        gdf = gpd.GeoDataFrame({
+            'int': [1, 2, 300, 4],
+            'negative': [1, -2, 3, 4],
+            'float32': [0.5, np.nan, 2.25, 1.0],
+            'float64': [0.1, 0.2, 0.3, 0.4],
+            'integral': [1.0, 2.0, 3.0, 4.0],
+            'category': ['a', 'a', None, 'a'],
+            'string': ['a', 'b', 'c', 'd'],
+            'bool': [True, False, True, False]
+        }, geometry=gpd.points_from_xy([0, 1, 2, 3], [0, 1, 2, 3]))
+
+        data = plan_geodataframe_data(gdf)
+
+        assert data.dtypes.astype(str).to_dict() == {
+            'int': 'uint16', 'negative': 'int8', 'float32': 'float32', 'float64': 'float64',
+            'integral': 'uint8', 'category': 'category', 'string': 'object', 'bool': 'bool',
+            'geometry': 'geometry'
+        }
+        assert data['category'].tolist()[:2] == ['a', 'a']
+        assert np.isnan(data['category'].tolist()[2])
+        assert gdf['int'].dtype == 'int64'
+
+    def test_plan_geodataframe_data_columns(self):
+        gdf = gpd.GeoDataFrame({'a': [1.5], 'b': [2.5], 'c': [3.5]}, geometry=gpd.points_from_xy([0], [0]))
+
+        data = plan_geodataframe_data(gdf, ['c', 'a'])
+
+        assert list(data.columns) == ['c', 'a', 'geometry']
+        assert data.geometry.name == 'geometry'
+
+    def test_get_geodataframe_hash(self):
+        gdf = gpd.GeoDataFrame({'a': [1, 2], 'b': ['x', 'y']}, geometry=gpd.points_from_xy([0, 1], [0, 1]))
+        other_gdf = gdf.copy()
+        other_gdf.loc[1, 'geometry'] = gpd.points_from_xy([1], [2])[0]
+
+        assert get_geodataframe_hash(gdf) == get_geodataframe_hash(gdf.copy())
+        assert get_geodataframe_hash(gdf) != get_geodataframe_hash(other_gdf)
+        assert get_geodataframe_hash(gdf) != get_geodataframe_hash(gdf.astype({'a': 'float64'}))
+        assert get_geodataframe_hash(gdf) != get_geodataframe_hash(gdf.rename(columns={'b': 'c'}))
+        assert get_geodataframe_hash(gdf.assign(c=[{}, {}])) is None
+
+        missing_gdf = gdf.copy()
+        missing_gdf.loc[1, 'geometry'] = None
+        assert get_geodataframe_hash(missing_gdf) == get_geodataframe_hash(missing_gdf.copy())
+        assert get_geodataframe_hash(missing_gdf) != get_geodataframe_hash(gdf)
+
     def test_remove_comments(self):
         viz = """
         color: blue // This is a line comment
@@ -0,0 +1,91 @@
+from jinja2 import Template
+
+from cartoframes.viz.html import HTMLMap, templates
+from cartoframes.viz.html.templates import get_environment, render_template
+from cartoframes.viz.html.utils import get_asset_paths, get_layer_sources
+
+
+class TestTemplates(object):
+
+    def setup_method(self):
+        templates.clear_cache()
+
+    def test_get_environment(self):
+        assert get_environment() is get_environment()
+        assert get_environment().auto_reload is False
+        assert get_environment(dev=True).auto_reload is True
+        assert 'quot' in get_environment().filters
+
+    def test_render_template_cache(self, mocker):
+        render = mocker.spy(Template, 'render')
+
+        html = _render_map()
+        cached_html = _render_map()
+
+        assert html == cached_html
+        assert render.call_count == 1
+
+        _render_map(title='Other title')
+
+        assert render.call_count == 2
+
+    def test_render_template_dev(self, mocker):
+        render = mocker.spy(Template, 'render')
+
+        _render_map(_carto_vl_path='http://localhost:8080')
+        _render_map(_carto_vl_path='http://localhost:8080')
+
+        assert render.call_count == 2
+
+    def test_render_template_cache_size(self):
+        for index in range(templates.HTML_CACHE_SIZE + 1):
+            _render_map(title=str(index))
+
+        assert len(templates._html_cache) == templates.HTML_CACHE_SIZE
+
+    def test_render_template_not_serializable(self, mocker):
+        render = mocker.spy(Template, 'render')
+
+        render_template('templates/error/basic.html.j2', error=object())
+        render_template('templates/error/basic.html.j2', error=object())
+
+        assert render.call_count == 2
+        assert len(templates._html_cache) == 0
+
+    def test_get_asset_paths(self):
+        assert get_asset_paths()['carto_vl_path'].startswith('https://libs.cartocdn.com/carto-vl/')
+        assert get_asset_paths('http://localhost:8080', 'http://localhost:5000') == {
+            'carto_vl_path': 'http://localhost:8080/dist/carto-vl.js',
+            'airship_components_path': 'http://localhost:5000/packages/components/dist/airship.js',
+            'airship_bridge_path': 'http://localhost:5000/packages/bridge/dist/asbridge.js',
+            'airship_module_path': 'http://localhost:5000/packages/components/dist/airship/airship.esm.js',
+            'airship_styles_path': 'http://localhost:5000/packages/styles/dist/airship.css',
+            'airship_icons_path': 'http://localhost:5000/packages/icons/dist/icons.css'
+        }
+
+    def test_get_layer_sources(self):
+        layers = [
+            {'type': 'GeoJSON', 'data': 'abc', 'source': 'abc'},
+            {'type': 'GeoJSON', 'data': 'abc', 'source': 'abc'},
+            {'type': 'GeoJSON', 'data': 'def', 'source': 'def'},
+            {'type': 'Query', 'data': 'select * from fake_table', 'source': 'select * from fake_table'}
+        ]
+
+        layer_sources, sources = get_layer_sources(layers)
+
+        assert len(sources) == 2
+        assert layer_sources[0]['source_id'] == layer_sources[1]['source_id']
+        assert layer_sources[0]['source_id'] != layer_sources[2]['source_id']
+        assert sources[layer_sources[0]['source_id']] == 'abc'
+        assert sources[layer_sources[2]['source_id']] == 'def'
+        assert layer_sources[0]['data'] is None
+        assert layer_sources[0]['source'] is None
+        assert layer_sources[3] == layers[3]
+        assert layers[0]['data'] == 'abc'
+
+
+def _render_map(title='CARTOframes', _carto_vl_path=None):
+    html_map = HTMLMap()
+    html_map.set_content(size=None, layers=[], bounds=[[-180, -90], [180, 90]], title=title,
+                         _carto_vl_path=_carto_vl_path)
+    return html_map.html
@@ -0,0 +1,42 @@
+import pytest
+
+from cartoframes.viz.aggregation import check_aggregation, get_aggregation_query
+
+
+class TestAggregation(object):
+
+    def test_check_aggregation(self):
+        check_aggregation('quadgrid', 32)
+        check_aggregation('cluster', 0.5)
+
+        with pytest.raises(ValueError) as e:
+            check_aggregation('hexagons', 32)
+        assert str(e.value) == '"hexagons" is not a valid aggregation. Valid aggregations are quadgrid, cluster'
+
+        with pytest.raises(ValueError):
+            check_aggregation('quadgrid', 0)
+
+        with pytest.raises(ValueError):
+            check_aggregation('quadgrid', 512)
+
+    def test_get_aggregation_query_quadgrid(self):
+        query = get_aggregation_query('SELECT * FROM "public"."table"', 'quadgrid', 16,
+                                      ['pop', 'name', 'cartodb_id'], ['pop'])
+
+        assert 'FROM (SELECT * FROM "public"."table") _cdb_source' in query
+        assert 'WHERE the_geom_webmercator && !bbox!' in query
+        assert 'Floor(ST_X(_cdb_point) / (!pixel_width! * 16)) AS _cdb_gx' in query
+        assert 'ST_MakeEnvelope(_cdb_gx * (!pixel_width! * 16)' in query
+        assert 'count(*) AS _cdb_feature_count' in query
+        assert 'sum("pop") AS "pop"' in query
+        assert 'mode() WITHIN GROUP (ORDER BY "name") AS "name"' in query
+        assert '"cartodb_id"' not in query
+        assert 'GROUP BY _cdb_gx, _cdb_gy' in query
+
+    def test_get_aggregation_query_cluster(self):
+        query = get_aggregation_query('SELECT * FROM "public"."table"', 'cluster')
+
+        assert 'ST_SetSRID(ST_MakePoint(avg(ST_X(_cdb_point)), avg(ST_Y(_cdb_point))), 3857) ' \
+               'AS the_geom_webmercator' in query
+        assert '(!pixel_width! * 32)' in query
+        assert 'sum(' not in query
@@ -5,6 +5,7 @@ from collections import namedtuple
 import pytest
 
 from cartoframes.auth import Credentials
+from cartoframes.exceptions import PublishError
 from cartoframes.viz import all_publications, delete_publication, Layer, Map
 from cartoframes.viz.source import Source
 from cartoframes.viz.kuviz import KuvizPublisher, DEFAULT_PUBLIC, kuviz_to_dict
@@ -50,6 +51,18 @@ class TestKuvizPublisher(object):
         assert isinstance(kuviz_publisher, KuvizPublisher)
         assert kuviz_publisher._layers == []
 
+    def test_kuviz_publisher_set_layers_with_tiles(self, mocker):
+        setup_mocks(mocker, self.credentials)
+        mocker.patch('cartoframes.viz.source.get_tile_server')
+
+        layer = Layer(build_geodataframe([-10, 0], [-10, 0]), tiles=True)
+        kuviz_publisher = KuvizPublisher(None)
+
+        with pytest.raises(PublishError) as e:
+            kuviz_publisher.set_layers([layer])
+
+        assert str(e.value).startswith('Layers with local tiles can not be published.')
+
     def test_kuviz_publisher_set_layers(self, mocker):
         setup_mocks(mocker, self.credentials)
 
@@ -101,6 +114,18 @@ class TestKuvizPublisher(object):
             'api_key': DEFAULT_PUBLIC,
             'base_url': 'https://fakeuser.carto.com'})
 
+    def test_kuviz_publisher_check_privacy_once(self, mocker):
+        setup_mocks(mocker, self.credentials, is_public=False, token='1234')
+        mock_is_public = ContextManager.is_public
+
+        layers = [Layer('fake_table_{}'.format(i), credentials=self.credentials) for i in range(3)]
+
+        kuviz_publisher = KuvizPublisher(None)
+        kuviz_publisher.set_layers(layers)
+
+        assert mock_is_public.call_count == 3
+        assert all(layer.credentials['api_key'] == '1234' for layer in kuviz_publisher.get_layers())
+
     def test_kuviz_publisher_create_new_apikey(self, mocker):
         token = '1234'
         setup_mocks(mocker, self.credentials, is_public=False, token=token)
@@ -1,10 +1,12 @@
+import geopandas as gpd
+
 from cartoframes.auth import Credentials
 from cartoframes.viz.legend_list import LegendList
 from cartoframes.viz.widget_list import WidgetList
 from cartoframes.viz.popup_list import PopupList
 from cartoframes.viz.source import Source
 from cartoframes.viz.style import Style
-from cartoframes.viz import Layer
+from cartoframes.viz import Layer, color_bins_style, popup_element
 from cartoframes.io.managers.context_manager import ContextManager
 
 
@@ -34,6 +36,26 @@ class TestLayer(object):
         assert isinstance(layer.widgets, WidgetList)
         assert layer.interactivity == []
 
+    def test_initialization_aggregate(self, mocker):
+        """Layer should aggregate the columns used by the style, widgets and popups"""
+        setup_mocks(mocker, 'layer_source')
+        mocker.patch.object(ContextManager, 'get_numeric_column_names', return_value=['pop'])
+        layer = Layer('layer_source', 'color: ramp(prop(\'pop\'), sunset)', popup_hover=popup_element('name'),
+                      credentials=Credentials('fakeuser'), aggregate='cluster')
+
+        assert layer.geom_type == 'point'
+        assert 'sum("pop") AS "pop"' in layer.source_data
+        assert 'mode() WITHIN GROUP (ORDER BY "name") AS "name"' in layer.source_data
+
+    def test_initialization_precompute_breaks(self):
+        """Layer should set the precomputed breaks in the style"""
+        gdf = gpd.GeoDataFrame({'pop': [1, 2, 3, 4]}, geometry=gpd.points_from_xy([0, 1, 2, 3], [0, 1, 2, 3]))
+
+        layer = Layer(gdf, color_bins_style('pop', bins=2, precompute=True))
+
+        assert "ramp(buckets(prop('pop'), [2.0]), purpor)" in layer.viz
+        assert 'globalQuantiles' in Layer(gdf, color_bins_style('pop', bins=2)).viz
+
     def test_initialization_simple(self, mocker):
         """Layer should initialize layer attributes"""
         setup_mocks(mocker, 'layer_source')
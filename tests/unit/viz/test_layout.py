@@ -1,3 +1,4 @@
+import re
 import pytest
 
 from cartoframes.auth import Credentials
@@ -115,6 +116,24 @@ class TestLayoutSettings(object):
         assert layout._layout[0].get('is_static') is True
         assert layout._layout[1].get('is_static') is True
 
+    def test_shared_sources(self):
+        """Layout should embed the data shared by several maps once"""
+        layout = Layout([
+            Map(Layer(Source(SOURCE))),
+            Map([Layer(Source(SOURCE)), Layer(Source(SOURCE), 'color: red')])
+        ])
+        data = Layer(Source(SOURCE)).source_data
+
+        html = layout._repr_html_()
+
+        source_ids = re.findall(r'&quot;source_id&quot;: &quot;(\w+)&quot;', html)
+
+        assert html.count(data) == 1
+        assert len(source_ids) == 3
+        assert len(set(source_ids)) == 1
+        assert '&quot;{}&quot;: &quot;{}&quot;'.format(source_ids[0], data) in html
+        assert 'setLayerSources(settings.sources)' in html
+
 
 class TestLayoutPublication:
     def setup_method(self):
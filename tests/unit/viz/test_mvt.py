@@ -0,0 +1,139 @@
+import os
+import geopandas as gpd
+
+from urllib.error import HTTPError
+from urllib.request import urlopen
+from shapely.geometry import LineString, MultiPoint, Point, Polygon, box
+
+from cartoframes.viz.mvt import TilePyramid, _encode_geometry
+from cartoframes.viz.tile_server import MVT_CONTENT_TYPE, TileServer
+
+
+def _gdf():
+    return gpd.GeoDataFrame({
+        'value': [1, 2],
+        'name': ['a', None]
+    }, geometry=[Point(1, 1), box(-10, -10, 10, 10)], crs='epsg:4326')
+
+
+class TestEncodeGeometry(object):
+    # Examples of the Mapbox Vector Tile specification 2.1
+
+    def test_point(self):
+        assert _encode_geometry(Point(25, 17)) == (1, [9, 50, 34])
+
+    def test_multipoint(self):
+        assert _encode_geometry(MultiPoint([(5, 7), (3, 2)])) == (1, [17, 10, 14, 3, 9])
+
+    def test_linestring(self):
+        assert _encode_geometry(LineString([(2, 2), (2, 10), (10, 10)])) == (2, [9, 4, 4, 18, 0, 16, 16, 0])
+
+    def test_polygon(self):
+        assert _encode_geometry(Polygon([(3, 6), (8, 12), (20, 34)])) == (3, [9, 6, 12, 18, 10, 12, 24, 44, 15])
+
+    def test_polygon_winding_order(self):
+        # The exterior ring is reversed to have a positive area in tile coordinates
+        assert _encode_geometry(Polygon([(3, 6), (20, 34), (8, 12)])) == (3, [9, 6, 12, 18, 10, 12, 24, 44, 15])
+
+    def test_polygon_without_area(self):
+        assert _encode_geometry(Polygon([(0, 0), (0.1, 0.1), (0.2, 0)])) == (3, [])
+
+
+class TestTilePyramid(object):
+
+    def test_metadata(self):
+        pyramid = TilePyramid(_gdf())
+
+        assert pyramid.metadata == {
+            'idProperty': 'cartodb_id',
+            'properties': {
+                'value': {'type': 'number'},
+                'name': {'type': 'category'},
+                'cartodb_id': {'type': 'number'}
+            }
+        }
+
+    def test_without_crs(self):
+        gdf = _gdf()
+        gdf.crs = None
+
+        pyramid = TilePyramid(gdf)
+
+        assert gdf.crs is None
+        assert pyramid.get_tile(0, 0, 0) == TilePyramid(_gdf()).get_tile(0, 0, 0)
+
+    def test_get_tile(self):
+        pyramid = TilePyramid(_gdf())
+
+        tile = pyramid.get_tile(0, 0, 0)
+
+        assert b'layer0' in tile
+        assert b'cartodb_id' in tile
+        assert pyramid.get_tile(0, 0, 0) is tile
+
+    def test_get_tile_cache_size(self):
+        pyramid = TilePyramid(_gdf(), max_tiles=2)
+
+        tile = pyramid.get_tile(0, 0, 0)
+        pyramid.get_tile(1, 0, 0)
+        pyramid.get_tile(1, 1, 0)
+
+        assert list(pyramid._tiles) == [(1, 0, 0), (1, 1, 0)]
+        assert pyramid.get_tile(0, 0, 0) == tile
+
+    def test_get_empty_tile(self):
+        pyramid = TilePyramid(_gdf())
+
+        # The layer is encoded without features
+        assert b'cartodb_id' not in pyramid.get_tile(4, 0, 0)
+        assert b'layer0' in pyramid.get_tile(4, 0, 0)
+
+    def test_write(self, tmp_path):
+        pyramid = TilePyramid(_gdf())
+
+        count = pyramid.write(str(tmp_path), max_zoom=2)
+
+        assert count == 1 + 4 + 4
+        assert os.path.exists(os.path.join(str(tmp_path), '2', '1', '1.mvt'))
+        assert not os.path.exists(os.path.join(str(tmp_path), '2', '0', '0.mvt'))
+
+
+class TestTileServer(object):
+
+    def test_serve_tiles(self):
+        server = TileServer()
+        pyramid = TilePyramid(_gdf())
+
+        try:
+            url = server.register(pyramid)
+
+            with urlopen(url.format(z=0, x=0, y=0)) as response:
+                assert response.headers['Content-Type'] == MVT_CONTENT_TYPE
+                assert response.read() == pyramid.get_tile(0, 0, 0)
+
+            try:
+                urlopen('{}/unknown/0/0/0.mvt'.format(server.url))
+                assert False
+            except HTTPError as e:
+                assert e.code == 404
+        finally:
+            server.shutdown()
+
+    def test_unregister(self):
+        server = TileServer(max_pyramids=2)
+
+        try:
+            urls = [server.register(TilePyramid(_gdf())) for _ in range(3)]
+
+            assert [server.is_registered(url) for url in urls] == [False, True, True]
+
+            server.unregister(urls[1])
+
+            assert not server.is_registered(urls[1])
+            try:
+                urlopen(urls[1].format(z=0, x=0, y=0))
+                assert False
+            except HTTPError as e:
+                assert e.code == 404
+        finally:
+            server.shutdown()
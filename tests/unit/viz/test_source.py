@@ -1,9 +1,13 @@
+import json
 import pytest
 import numpy as np
 import pandas as pd
 import geopandas as gpd
 
+from shapely.geometry import LineString, Point
+
 from cartoframes.auth import Credentials
+from cartoframes.viz import source as source_module
 from cartoframes.viz.source import Source
 from cartoframes.io.managers.context_manager import ContextManager
 
@@ -134,6 +138,103 @@ class TestSource(object):
                                 'Please pass a `Credentials` instance or use '
                                 'the `set_default_credentials` function.')
 
+    def test_source_aggregate(self, mocker):
+        setup_mocks(mocker)
+        mocker.patch.object(ContextManager, 'compute_query', return_value='SELECT * FROM "public"."table"')
+        mocker.patch.object(ContextManager, 'get_bounds')
+        mock_geom_type = mocker.patch.object(ContextManager, 'get_geom_type')
+        mock_numeric = mocker.patch.object(ContextManager, 'get_numeric_column_names', return_value=['pop'])
+
+        source = Source('table', credentials=Credentials('fakeuser'), aggregate='quadgrid', resolution=16)
+        source.compute_metadata(['pop', 'name'])
+
+        assert source.get_geom_type() == 'polygon'
+        assert source.query == 'SELECT * FROM "public"."table"'
+        assert 'sum("pop") AS "pop"' in source.data
+        assert 'mode() WITHIN GROUP (ORDER BY "name") AS "name"' in source.data
+        assert '(!pixel_width! * 16)' in source.data
+        mock_numeric.assert_called_once_with('SELECT * FROM "public"."table"')
+        mock_geom_type.assert_not_called()
+
+    def test_source_compute_breaks(self, mocker):
+        setup_mocks(mocker)
+        mocker.patch.object(ContextManager, 'compute_query', return_value='SELECT * FROM "public"."breaks"')
+        mock_query = mocker.patch.object(ContextManager, 'execute_query', return_value={
+            'rows': [{'min': 0, 'max': 10}]})
+
+        breaks = Source('breaks', credentials=Credentials('fakeuser')).compute_breaks('pop', 'equal', 4)
+        cached_breaks = Source('breaks', credentials=Credentials('fakeuser')).compute_breaks('pop', 'equal', 4)
+
+        assert breaks == cached_breaks == [2.5, 5, 7.5]
+        mock_query.assert_called_once_with(
+            'SELECT min("pop") AS min, max("pop") AS max FROM (SELECT * FROM "public"."breaks") _q '
+            'WHERE "pop" IS NOT NULL', do_post=False)
+
+    def test_source_compute_breaks_dataframe(self):
+        gdf = gpd.GeoDataFrame({'prop0': [1, 2, 3, 4]}, geometry=gpd.points_from_xy([0, 1, 2, 3], [0, 1, 2, 3]))
+
+        source = Source(gdf)
+
+        assert source.compute_breaks('prop0', 'quantiles', 2) == [2]
+
+    def test_source_data_cache(self, mocker):
+        spy = mocker.spy(source_module, 'get_geodataframe_data')
+        gdf = gpd.GeoDataFrame({'prop0': [1, 2], 'prop1': ['a', 'b']}, geometry=gpd.points_from_xy([0, 1], [0, 1]))
+
+        source = Source(gdf)
+        source.compute_metadata(['prop0'])
+        assert spy.call_count == 0
+
+        data = source.data
+        same_source = Source(gdf.copy())
+        same_source.compute_metadata(['prop0'])
+        other_source = Source(gdf)
+        other_source.compute_metadata(['prop1'])
+
+        assert source.data == same_source.data == data
+        assert other_source.data != data
+        assert spy.call_count == 2
+
+    def test_source_remote_metadata_cache(self, mocker):
+        setup_mocks(mocker)
+        mock_bounds = mocker.patch.object(ContextManager, 'get_bounds', return_value=[[0, 0], [1, 1]])
+        mock_geom_type = mocker.patch.object(ContextManager, 'get_geom_type', return_value='line')
+
+        for _ in range(2):
+            source = Source('table', credentials=Credentials('fakeuser'))
+            source.compute_metadata()
+
+            assert source.bounds == [[0, 0], [1, 1]]
+            assert source.get_geom_type() == 'line'
+
+        assert mock_bounds.call_count == 1
+        assert mock_geom_type.call_count == 1
+
+    def test_source_remote_metadata_together(self, mocker):
+        setup_mocks(mocker)
+        mock_bounds = mocker.patch.object(ContextManager, 'get_bounds', return_value=[[0, 0], [1, 1]])
+        mock_geom_type = mocker.patch.object(ContextManager, 'get_geom_type', return_value='line')
+
+        source = Source('table', credentials=Credentials('fakeuser'))
+
+        assert source.get_geom_type() == 'line'
+        mock_bounds.assert_called_once_with(source.query)
+
+        source.compute_metadata()
+
+        assert source.bounds == [[0, 0], [1, 1]]
+        assert mock_bounds.call_count == 1
+        assert mock_geom_type.call_count == 1
+
+    def test_source_aggregate_dataframe(self):
+        gdf = gpd.GeoDataFrame({'prop0': ['a']}, geometry=gpd.points_from_xy([102.0], [0.5]))
+
+        with pytest.raises(ValueError) as e:
+            Source(gdf, aggregate='cluster')
+
+        assert str(e.value) == ('Aggregations are computed by the server, so they are only available '
+                                'for tables and SQL queries.')
+
     def test_dates_in_source(self):
         df = pd.DataFrame({
             'date_column': ['2019-11-10', '2019-11-11'],
@@ -228,3 +329,83 @@ class TestSource(object):
         source = Source(df, geom_col='geom')
 
         assert len(source.gdf) == 2
+
+    def test_source_tiles(self, mocker):
+        mock_server = mocker.patch('cartoframes.viz.source.get_tile_server')
+        mock_server.return_value.register.return_value = 'http://127.0.0.1:8000/id/{z}/{x}/{y}.mvt'
+        gdf = gpd.GeoDataFrame({'prop0': ['a']}, geometry=gpd.points_from_xy([102.0], [0.5]))
+
+        source = Source(gdf, tiles=True)
+        source.compute_metadata()
+
+        assert source.type == 'MVT'
+        assert source.is_local()
+        assert source.get_geom_type() == 'point'
+        assert source.data['file'] == 'http://127.0.0.1:8000/id/{z}/{x}/{y}.mvt'
+        assert json.loads(source.data['metadata'])['properties']['prop0'] == {'type': 'category'}
+        assert source.bounds == [[102.0, 0.5], [102.0, 0.5]]
+
+    def test_source_tiles_unregistered(self, mocker):
+        mock_server = mocker.patch('cartoframes.viz.source.get_tile_server')
+        mock_server.return_value.is_registered.return_value = False
+        gdf = gpd.GeoDataFrame({'prop0': ['a']}, geometry=gpd.points_from_xy([102.0], [0.5]))
+
+        for _ in range(2):
+            source = Source(gdf, tiles=True)
+            source.compute_metadata()
+            source.data
+
+        # The tiles of the first source are not served anymore: they are registered again
+        assert mock_server.return_value.register.call_count == 2
+
+    def test_source_columns(self):
+        gdf = gpd.GeoDataFrame({'prop0': [1.0, 2.0], 'prop1': ['a', 'b']},
+                               geometry=gpd.points_from_xy([102.0, 103.0], [0.5, 1.5]))
+
+        source = Source(gdf, encode_data=False)
+        source.compute_metadata(['prop0'])
+
+        assert [feature['properties'] for feature in json.loads(source.data)['features']] == [
+            {'prop0': 1}, {'prop0': 2}]
+
+    def test_source_precision(self):
+        gdf = gpd.GeoDataFrame({'prop0': ['a']}, geometry=gpd.points_from_xy([102.123456789], [0.5]))
+
+        source = Source(gdf, encode_data=False, precision=3)
+        source.compute_metadata()
+
+        assert json.loads(source.data)['features'][0]['geometry']['coordinates'] == [102.123, 0.5]
+
+    def test_source_full_precision(self):
+        gdf = gpd.GeoDataFrame({'prop0': ['a']}, geometry=gpd.points_from_xy([102.123456789], [0.5]))
+
+        source = Source(gdf, encode_data=False)
+        source.compute_metadata()
+
+        assert json.loads(source.data)['features'][0]['geometry']['coordinates'] == [102.123456789, 0.5]
+
+    def test_source_simplify(self):
+        line = LineString([(0, 0), (5, 0.0001), (10, 0)])
+        gdf = gpd.GeoDataFrame({'prop0': ['a']}, geometry=[line])
+
+        source = Source(gdf, encode_data=False, simplify='auto')
+        source.compute_metadata()
+
+        assert json.loads(source.data)['features'][0]['geometry']['coordinates'] == [[0, 0], [10, 0]]
+        assert source.gdf.geometry[0].equals(line)
+
+    @pytest.mark.parametrize('geometries,max_ratio', [
+        ([Point(x, y) for x, y in np.random.RandomState(0).uniform(-50, 50, (1000, 2))], 0.75),
+        ([LineString(np.cumsum(np.random.RandomState(i).uniform(-0.01, 0.01, (500, 2)), axis=0) + i)
+          for i in range(20)], 0.5),
+        ([Point(i, i).buffer(0.5, resolution=128) for i in range(20)], 0.1)
+    ], ids=['points', 'lines', 'polygons'])
+    def test_source_payload_size(self, geometries, max_ratio):
+        gdf = gpd.GeoDataFrame({'prop0': range(len(geometries))}, geometry=geometries)
+
+        full_source = Source(gdf)
+        full_source.compute_metadata()
+        source = Source(gdf, precision=6, simplify='auto')
+        source.compute_metadata()
+
+        assert len(source.data) < len(full_source.data) * max_ratio
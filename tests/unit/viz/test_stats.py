@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from cartoframes.viz.stats import compute_breaks, get_breaks_query, read_breaks
+
+
+class TestStats(object):
+
+    def test_compute_breaks_quantiles(self):
+        assert compute_breaks([np.nan, 4, 1, 2, 3, 5, 6, 7, 8, 9, 10], 'quantiles', 5) == [2, 4, 6, 8]
+
+    @pytest.mark.parametrize('values,bins,expected', [
+        (range(1, 11), 4, [3, 5, 8]),
+        (range(1, 11), 3, [4, 7]),
+        ([1, 1, 1, 2, 10], 2, [1]),
+        ([7], 4, [7, 7, 7])
+    ])
+    def test_compute_breaks_quantiles_percentile_disc(self, values, bins, expected):
+        # Breaks of the CARTO VL globalQuantiles classifier, computed with percentile_disc
+        assert compute_breaks(list(values), 'quantiles', bins) == expected
+
+    def test_compute_breaks_equal(self):
+        assert compute_breaks([0, 10, 2, np.nan], 'equal', 4) == [2.5, 5, 7.5]
+
+    @pytest.mark.parametrize('bins,expected', [
+        (2, [5]),
+        (3, [3.5, 6.5]),
+        (4, [2, 5, 8])
+    ])
+    def test_compute_breaks_stdev(self, bins, expected):
+        # Average 5 and sample standard deviation 3
+        values = [2, 8, 5, 5, 2, 8]
+        values = [5 + (value - 5) * 3 / np.std(values, ddof=1) for value in values]
+
+        assert compute_breaks(values, 'stdev', bins) == pytest.approx(expected)
+
+    def test_compute_breaks_empty(self):
+        assert compute_breaks([np.nan], 'quantiles', 5) is None
+
+    def test_get_breaks_query(self):
+        assert get_breaks_query('SELECT * FROM t', 'pop', 'quantiles', 4) == (
+            'SELECT percentile_disc(ARRAY[0.25, 0.5, 0.75]) WITHIN GROUP (ORDER BY "pop") AS breaks '
+            'FROM (SELECT * FROM t) _q WHERE "pop" IS NOT NULL')
+        assert get_breaks_query('SELECT * FROM t', 'pop', 'equal', 4) == (
+            'SELECT min("pop") AS min, max("pop") AS max FROM (SELECT * FROM t) _q WHERE "pop" IS NOT NULL')
+        assert get_breaks_query('SELECT * FROM t', 'pop', 'stdev', 4) == (
+            'SELECT avg("pop") AS avg, stddev_samp("pop") AS stdev FROM (SELECT * FROM t) _q '
+            'WHERE "pop" IS NOT NULL')
+
+    def test_read_breaks(self):
+        assert read_breaks({'breaks': [1, 2, 3]}, 'quantiles', 4) == [1, 2, 3]
+        assert read_breaks({'min': 0, 'max': 10}, 'equal', 4) == [2.5, 5, 7.5]
+        assert read_breaks({'avg': 5, 'stdev': 3}, 'stdev', 4) == [2, 5, 8]
+        assert read_breaks({'breaks': None}, 'quantiles', 4) is None
+        assert read_breaks({'min': None, 'max': None}, 'equal', 4) is None